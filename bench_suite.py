@@ -0,0 +1,369 @@
+"""Benchmarks for the pathfinding, catalog, and snapshot hot paths.
+
+Seeds a synthetic graph into a scratch directory, times each
+operation against it, and writes p50/p95/p99 latencies and tracemalloc peaks to
+JSON. When a stored baseline was measured on the same graph, any benchmark whose
+median latency or memory peak grew beyond the tolerance is reported as a regression
+and the run exits non-zero, so ``run_all_tests.py --bench`` can gate on it.
+
+Every module resolves ``movies.db`` relative to the working directory, so the run
+changes into the scratch directory instead of patching each module's DB_FILE, and
+points LEVELS_FILE at the scratch ``levels.json``.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ci_seed_db import DEGREE_DISTRIBUTIONS, build_synthetic_graph, seed_synthetic_db
+from synthetic_dataset import SCALE_PRESETS, generate_dataset
+
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = ROOT / "logs" / "bench-results.json"
+DEFAULT_BASELINE = ROOT / "bench_baseline.json"
+# Medians on shared CI runners swing by tens of percent; only flag a doubling by default.
+DEFAULT_TOLERANCE = 1.0
+# Differences below these floors are timer and allocator noise, never regressions.
+MIN_LATENCY_DELTA_MS = 1.0
+MIN_MEMORY_DELTA_KIB = 256
+HINT_BATCH_SIZE = 25
+LEVEL_COUNT = 10
+LEVEL_SOURCES = 5
+PERCENTILES = (50, 95, 99)
+
+
+def max_rss_kib():
+    """Peak resident set size of this process in KiB, or None where resource is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+
+
+def percentile(sorted_values, rank):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = max(0, min(len(sorted_values) - 1, -(-rank * len(sorted_values) // 100) - 1))
+    return sorted_values[position]
+
+
+def summarize_samples(samples_ms, peak_kib):
+    ordered = sorted(samples_ms)
+    summary = {f"p{rank}_ms": round(percentile(ordered, rank), 4) for rank in PERCENTILES}
+    summary["mean_ms"] = round(sum(ordered) / len(ordered), 4)
+    summary["samples"] = len(ordered)
+    summary["peak_kib"] = peak_kib
+    return summary
+
+
+def measure(function, inputs, repeat, setup=None):
+    """
+    Times function(*args) for each args tuple in inputs, cycling until repeat samples
+    are taken, after one untimed warm-up call. Like timeit, garbage collection is off
+    while timing. The memory peak comes from one extra traced call, so tracemalloc
+    overhead never skews the latencies.
+    """
+    inputs = list(inputs)
+
+    def call(position):
+        if setup is not None:
+            setup()
+        return function(*inputs[position % len(inputs)])
+
+    call(0)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for position in range(repeat):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            function(*inputs[position % len(inputs)])
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        call(0)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return summarize_samples(samples, round(peak / 1024))
+
+
+def _pick_pairs(graph, count, rng):
+    pairs = []
+    while len(pairs) < count:
+        start, end = rng.sample(graph.actor_ids, 2)
+        pairs.append((start, end))
+    return pairs
+
+
+def run_benchmarks(repeat, seed):
+    """Runs every benchmark against movies.db and levels.json in the current directory."""
+    # Imported here so the modules see the scratch directory's files on first use.
+    # levels.json resolves next to the code by default, so point LEVELS_FILE at the scratch copy.
+    os.environ["LEVELS_FILE"] = str(Path("levels.json").resolve())
+    from fastapi.testclient import TestClient
+
+    from fastapi_app.main import app, clear_frontend_snapshot_cache
+    from frontend_snapshot import build_frontend_manifest, build_frontend_snapshot
+    from graph_cache import get_graph, load_graph_cache, save_graph_cache, wait_for_background_writes
+    from graph_index import load_graph
+    from level_generator import iter_candidate_pairs, load_actor_rows
+    from levels_loader import load_levels
+    from path_utils import (
+        build_path_hint,
+        clear_path_cache,
+        generate_typed_path,
+        hydrate_node_labels,
+        validate_named_path,
+    )
+
+    levels = load_levels()
+    rng = random.Random(seed)
+    graph = get_graph("movies.db")
+    # Written here rather than waiting on get_graph's background write, so the warm run has a cache file.
+    wait_for_background_writes()
+    save_graph_cache(graph, "movies.db")
+    pairs = _pick_pairs(graph, 50, rng)
+
+    named_paths = []
+    for start, end in pairs:
+        path = generate_typed_path(start, "actor", end, "actor", use_cache=False)
+        if path != -1:
+            labels = hydrate_node_labels(path)
+            named_paths.append(([labels[node] for node in path],))
+
+    def hint_batch(source, targets):
+        for target in targets:
+            build_path_hint(source, "actor", target, "actor")
+
+    hint_batches = [
+        (source, [target for _source, target in rng.sample(pairs, min(HINT_BATCH_SIZE, len(pairs)))])
+        for source, _target in pairs[:10]
+    ]
+
+    actor_rows = load_actor_rows("movies.db")
+
+    def level_candidates(sources):
+        for _candidate in iter_candidate_pairs(graph, actor_rows, source_count=sources, seed=seed):
+            pass
+
+    client = TestClient(app)
+
+    def get_endpoint(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+    results = {
+        # A worker starting without a graph cache file, and one mapping the file a previous start wrote.
+        "graph_startup_cold": measure(load_graph, [("movies.db",)], repeat),
+        "graph_startup_warm": measure(load_graph_cache, [("movies.db",)], repeat),
+        "generate_typed_path": measure(
+            lambda start, end: generate_typed_path(start, "actor", end, "actor", use_cache=False),
+            pairs,
+            repeat,
+        ),
+        # Cleared before every batch so the batch pays for its searches instead of reading the cache.
+        "build_path_hint_batch": measure(hint_batch, hint_batches, repeat, setup=clear_path_cache),
+        "validate_named_path": measure(validate_named_path, named_paths or [(["", ""],)], repeat),
+        # Every candidate of LEVEL_SOURCES source BFSes, as level_generator.py streams them.
+        "level_candidates": measure(level_candidates, [(LEVEL_SOURCES,)], repeat),
+        "build_frontend_snapshot": measure(build_frontend_snapshot, [(levels,)], repeat),
+        "build_frontend_manifest": measure(build_frontend_manifest, [(levels,)], repeat),
+        "api_actors": measure(get_endpoint, [("/api/actors",)], repeat),
+        "api_movies": measure(get_endpoint, [("/api/movies",)], repeat),
+        "api_frontend_manifest": measure(get_endpoint, [("/api/export/frontend-manifest",)], repeat),
+        "api_frontend_snapshot_cold": measure(
+            get_endpoint, [("/api/export/frontend-snapshot",)], repeat, setup=clear_frontend_snapshot_cache
+        ),
+        "api_frontend_snapshot_cached": measure(get_endpoint, [("/api/export/frontend-snapshot",)], repeat),
+    }
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns (regressions, notes). A benchmark regresses when its median latency or memory
+    peak exceeds the baseline by more than ``tolerance`` and by more than the noise floor.
+    Baselines measured on a different graph are not compared.
+    """
+    if baseline is None:
+        return [], ["No baseline found; run with --write-baseline to store one."]
+    if baseline["meta"]["graph"] != results["meta"]["graph"]:
+        return [], ["Baseline was measured on a different synthetic graph; comparison skipped."]
+
+    regressions = []
+    notes = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            notes.append(f"{name}: not in baseline")
+            continue
+        checks = (
+            # Tail percentiles are reported but too noisy to gate on at a few dozen samples.
+            ("p50_ms", MIN_LATENCY_DELTA_MS, "ms"),
+            ("peak_kib", MIN_MEMORY_DELTA_KIB, "KiB"),
+        )
+        for field, floor, unit in checks:
+            before = previous[field]
+            after = current[field]
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append(f"{name}: {field} {before} {unit} -> {after} {unit}")
+    return regressions, notes
+
+
+def seed_scratch_db(args):
+    """
+    Writes movies.db and levels.json into the current directory. --scale uses the
+    full-schema synthetic_dataset generator; otherwise ci_seed_db's bare graph is used.
+    Returns the graph parameters recorded with the results.
+    """
+    if args.scale:
+        summary = generate_dataset("movies.db", SCALE_PRESETS[args.scale], seed=args.seed)
+        graph_params = {"scale": args.scale, "seed": args.seed}
+        counts = summary
+    else:
+        actors, movies, relationships = build_synthetic_graph(
+            args.actors, args.movies, args.cast_size, args.distribution, args.seed
+        )
+        seed_synthetic_db("movies.db", actors, movies, relationships)
+        graph_params = {
+            "actors": args.actors,
+            "movies": args.movies,
+            "cast_size": args.cast_size,
+            "distribution": args.distribution,
+            "seed": args.seed,
+        }
+        counts = {"actors": len(actors), "movies": len(movies), "links": len(relationships)}
+
+    conn = sqlite3.connect("movies.db")
+    cast_names = [row[0] for row in conn.execute(
+        "SELECT name FROM actors WHERE id IN (SELECT actor_id FROM movie_actors) ORDER BY id"
+    )]
+    conn.close()
+    level_rng = random.Random(args.seed)
+    levels = [
+        {"actor_a": first, "actor_b": second, "stars": 1 + position % 5}
+        for position, (first, second) in enumerate(level_rng.sample(cast_names, 2) for _ in range(LEVEL_COUNT))
+    ]
+    Path("levels.json").write_text(json.dumps(levels), encoding="utf-8")
+    return {**graph_params, **{key: counts[key] for key in ("actors", "movies", "links")}}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark pathfinding, catalog, and snapshot hot paths on a synthetic graph."
+    )
+    parser.add_argument(
+        "--scale",
+        choices=sorted(SCALE_PRESETS),
+        help="Use a full-schema synthetic_dataset of this many nodes instead of the bare graph below.",
+    )
+    parser.add_argument("--actors", type=int, default=5000, help="Synthetic actor count. Default: 5000")
+    parser.add_argument("--movies", type=int, default=2500, help="Synthetic movie count. Default: 2500")
+    parser.add_argument("--cast-size", type=int, default=8, help="Mean cast size. Default: 8")
+    parser.add_argument(
+        "--distribution",
+        choices=DEGREE_DISTRIBUTIONS,
+        default="powerlaw",
+        help="Cast size and filmography length distribution. Default: powerlaw",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the graph and the sampled pairs.")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed samples per benchmark. Default: 50")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Results JSON path. Default: logs/bench-results.json")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON to compare against.")
+    parser.add_argument("--write-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Allowed fractional growth over the baseline before flagging. Default: {DEFAULT_TOLERANCE}",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output_path = Path(args.output).resolve()
+    baseline_path = Path(args.baseline).resolve()
+    sys.path.insert(0, str(ROOT))
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            started = time.perf_counter()
+            graph = seed_scratch_db(args)
+            seed_ms = round((time.perf_counter() - started) * 1000, 2)
+            benchmarks = run_benchmarks(args.repeat, args.seed)
+        finally:
+            os.chdir(previous_cwd)
+
+    results = {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "graph": graph,
+            "repeat": args.repeat,
+            "seed_ms": seed_ms,
+            "max_rss_kib": max_rss_kib(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else None
+    regressions, notes = compare_to_baseline(results, baseline, args.tolerance)
+
+    print(f"{'benchmark':<30} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'peak KiB':>10}")
+    for name, summary in benchmarks.items():
+        print(
+            f"{name:<30} {summary['p50_ms']:>10.3f} {summary['p95_ms']:>10.3f} "
+            f"{summary['p99_ms']:>10.3f} {summary['peak_kib']:>10}"
+        )
+    print(
+        f"Graph: {graph['actors']} actors, {graph['movies']} movies, {graph['links']} links; "
+        f"max RSS {results['meta']['max_rss_kib']} KiB"
+    )
+    cold = benchmarks["graph_startup_cold"]["p50_ms"]
+    warm = benchmarks["graph_startup_warm"]["p50_ms"]
+    print(f"Graph startup: cold build {cold:.3f} ms, warm cache load {warm:.3f} ms ({cold / max(warm, 0.001):.0f}x)")
+    print(f"Wrote {output_path}")
+    for note in notes:
+        print(note)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if args.write_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Stored baseline at {baseline_path}")
+
+    regressed = {regression.split(":", 1)[0] for regression in regressions}
+    print(f"\nSummary: {len(benchmarks) - len(regressed)} passed, {len(regressed)} failed, {len(benchmarks)} total")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,16 @@
-"""Deterministic synthetic fixture data for CI and local tests only."""
+"""Deterministic synthetic fixture data for CI and local tests only.
 
-from db import init_db
+With no arguments this seeds the five-actor fixture the CI jobs expect. With
+--actors/--movies it bulk-writes a seeded synthetic bipartite graph instead,
+for benchmarks that need more than a handful of nodes.
+"""
+
+import argparse
+import itertools
+import random
+import sqlite3
+
+from db import DB_FILE, init_db, migrate
 from db_helper import insert_actor, insert_movie, insert_relationship
 
 
@@ -28,8 +38,103 @@ RELATIONSHIPS = [
     (910001, 8784),
 ]
 
+DEGREE_DISTRIBUTIONS = ("uniform", "powerlaw")
+# Pareto shape for power-law cast sizes; 2.0 keeps the mean finite while leaving a long tail of hub movies.
+POWERLAW_ALPHA = 2.0
+# Zipf exponent for how often an actor is cast, so filmography lengths are heavy-tailed as well.
+POWERLAW_CASTING_EXPONENT = 0.8
+
+
+def synthetic_cast_sizes(movie_count, mean_cast_size, distribution, rng, max_cast_size):
+    if distribution not in DEGREE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown degree distribution: {distribution}")
+    sizes = []
+    for _ in range(movie_count):
+        if distribution == "uniform":
+            size = rng.randint(max(1, mean_cast_size // 2), max(1, mean_cast_size + mean_cast_size // 2))
+        else:
+            minimum = mean_cast_size * (POWERLAW_ALPHA - 1) / POWERLAW_ALPHA
+            size = int(minimum * rng.paretovariate(POWERLAW_ALPHA))
+        sizes.append(min(max(size, 1), max_cast_size))
+    return sizes
+
+
+def build_synthetic_graph(actor_count, movie_count, mean_cast_size=8, distribution="powerlaw", seed=0):
+    """
+    Returns (actors, movies, relationships) rows shaped like the fixture lists above.
+    The same arguments always produce the same graph. Under "powerlaw" both cast sizes
+    and filmography lengths are heavy-tailed; under "uniform" neither is.
+    """
+    rng = random.Random(seed)
+    actor_ids = list(range(1, actor_count + 1))
+    actors = [
+        (actor_id, f"Synthetic Actor {actor_id}", round(100.0 / (1 + rank) ** 0.5, 3))
+        for rank, actor_id in enumerate(actor_ids)
+    ]
+    movies = [
+        (movie_id, f"Synthetic Movie {movie_id}", f"{1950 + rng.randrange(75)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+        for movie_id in range(1, movie_count + 1)
+    ]
+
+    cum_weights = None
+    if distribution == "powerlaw":
+        cum_weights = list(itertools.accumulate(1.0 / (1 + rank) ** POWERLAW_CASTING_EXPONENT for rank in range(actor_count)))
+
+    relationships = []
+    sizes = synthetic_cast_sizes(movie_count, mean_cast_size, distribution, rng, actor_count)
+    for (movie_id, _title, _release_date), size in zip(movies, sizes):
+        if cum_weights is None:
+            cast = rng.sample(actor_ids, size)
+        else:
+            cast = set()
+            while len(cast) < size:
+                cast.update(rng.choices(actor_ids, cum_weights=cum_weights, k=size - len(cast)))
+        relationships.extend((movie_id, actor_id) for actor_id in sorted(cast))
+    return actors, movies, relationships
+
+
+def seed_synthetic_db(db_file, actors, movies, relationships):
+    """Recreates db_file and bulk-inserts the rows in one transaction, bypassing the per-row db_helper writes."""
+    init_db(db_file, migrate_schema=False)
+    conn = sqlite3.connect(db_file)
+    conn.executemany("INSERT INTO actors (id, name, popularity) VALUES (?, ?, ?)", actors)
+    conn.executemany("INSERT INTO movies (id, title, release_date) VALUES (?, ?, ?)", movies)
+    conn.executemany("INSERT INTO movie_actors (movie_id, actor_id) VALUES (?, ?)", relationships)
+    conn.commit()
+    migrate(conn)
+    conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed the CI fixture database, or a synthetic graph for benchmarks.")
+    parser.add_argument("--db-file", default=DB_FILE, help=f"SQLite database to write. Default: {DB_FILE}")
+    parser.add_argument("--actors", type=int, help="Generate a synthetic graph with this many actors.")
+    parser.add_argument("--movies", type=int, help="Synthetic movie count. Default: actors / 2")
+    parser.add_argument("--cast-size", type=int, default=8, help="Mean synthetic cast size. Default: 8")
+    parser.add_argument(
+        "--distribution",
+        choices=DEGREE_DISTRIBUTIONS,
+        default="powerlaw",
+        help="Cast size and filmography length distribution. Default: powerlaw",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic graph.")
+    return parser.parse_args()
+
 
 def main():
+    args = parse_args()
+    if args.actors:
+        movie_count = args.movies or max(1, args.actors // 2)
+        actors, movies, relationships = build_synthetic_graph(
+            args.actors, movie_count, args.cast_size, args.distribution, args.seed
+        )
+        seed_synthetic_db(args.db_file, actors, movies, relationships)
+        print(
+            f"Seeded synthetic {args.distribution} graph into {args.db_file}: "
+            f"{len(actors)} actors, {len(movies)} movies, {len(relationships)} links."
+        )
+        return
+
     init_db()
 
     for actor_id, name, popularity in ACTORS:
@@ -45,4 +150,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,81 @@
+import threading
+
+from graph_cache import get_graph
+
+DB_FILE = "movies.db"
+
+_index_lock = threading.Lock()
+_index_cache = {}
+
+
+class ComponentIndex:
+    """
+    Connected-component lookups over one GraphIndex.
+
+    The graph labels its components when it is built, so a lookup is an index
+    into graph.component_ids. The index describes exactly the graph it was made
+    from: a database change produces a new graph, and with it a new index.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def component_of(self, node_key):
+        index = self.graph.node_index(*node_key)
+        return None if index is None else self.graph.component_ids[index]
+
+    def connected(self, start, end):
+        """True or False when both nodes are in the graph, None when either is unknown."""
+        start_component = self.component_of(start)
+        end_component = self.component_of(end)
+        if start_component is None or end_component is None:
+            return None
+        return start_component == end_component
+
+    def component_size(self, node_key):
+        component = self.component_of(node_key)
+        return None if component is None else self.graph.component_sizes[component]
+
+    def sizes(self):
+        return sorted(self.graph.component_sizes, reverse=True)
+
+    def stats(self, top=10):
+        sizes = self.sizes()
+        histogram = {}
+        for size in sizes:
+            histogram[str(size)] = histogram.get(str(size), 0) + 1
+        return {
+            "node_count": self.graph.node_count,
+            "component_count": len(sizes),
+            "largest_component_size": sizes[0] if sizes else 0,
+            "isolated_node_count": histogram.get("1", 0),
+            "top_component_sizes": sizes[:top],
+            "size_histogram": histogram,
+        }
+
+
+def get_component_index(db_file=None, graph=None):
+    """
+    Returns the shared ComponentIndex for graph, by default the current graph of
+    db_file. The cached index is reused only for that same graph instance.
+    """
+    db_file = db_file or DB_FILE
+    if graph is None:
+        graph = get_graph(db_file)
+    index = _index_cache.get(db_file)
+    if index is not None and index.graph is graph:
+        return index
+
+    with _index_lock:
+        index = _index_cache.get(db_file)
+        if index is None or index.graph is not graph:
+            index = ComponentIndex(graph)
+            # Only graphs loaded from db_file replace its shared index.
+            if graph.version is not None:
+                _index_cache[db_file] = index
+    return index
+
+
+def clear_component_index_cache():
+    with _index_lock:
+        _index_cache.clear()
@@ -0,0 +1,164 @@
+"""Reload data files without restarting the API.
+
+A DataWatcher polls cheap version tokens, such as a file's (inode, size, mtime)
+or ``db.get_content_version``, every DATA_WATCH_INTERVAL_SECONDS on a daemon
+thread. When a token changes, it loads the new value and runs the registered
+invalidation hooks. It then swaps in a new DataGeneration, an immutable,
+numbered set of every source's value and token.
+
+The request middleware pins the current generation in a ContextVar, so a request
+reads one set of values from start to finish even if a reload lands midway, and
+sync endpoints see the same pin in their worker thread. A value that fails to load,
+for example a levels.json caught mid-write, keeps the previous generation and is
+retried on the next poll.
+
+The database is watched without a loader, so the generation holds only its token.
+The in-memory indexes built from it (graph, search index, neighbor orders and
+sampler) are pinned per request instead: pinned() hands a request the object it
+first got for a key on every later call. SQL reads still see the live file.
+"""
+
+import os
+import sys
+import threading
+from contextvars import ContextVar
+
+DATA_WATCH_INTERVAL_SECONDS = float(os.getenv("DATA_WATCH_INTERVAL_SECONDS", "2"))
+
+# (generation, {key: object resolved by this request}) for the current request.
+_pinned = ContextVar("pinned_data", default=None)
+
+
+def file_token(path):
+    """(inode, size, mtime_ns) of path, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class DataGeneration:
+    __slots__ = ("number", "tokens", "values")
+
+    def __init__(self, number, tokens, values):
+        self.number = number
+        self.tokens = tokens
+        self.values = values
+
+    def get(self, name):
+        return self.values.get(name)
+
+
+class DataWatcher:
+    def __init__(self, interval=DATA_WATCH_INTERVAL_SECONDS):
+        self.interval = interval
+        self._sources = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._generation = DataGeneration(0, {}, {})
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.failures = 0
+
+    def watch(self, name, token, load=None):
+        """
+        Registers a source. token() returns its version token; load() returns its
+        value and runs now, so the current generation includes it. Sources without a
+        loader only bump the generation and run hooks when they change.
+        """
+        with self._lock:
+            self._sources[name] = (token, load)
+            generation = self._generation
+            tokens = dict(generation.tokens, **{name: token()})
+            values = dict(generation.values)
+            if load is not None:
+                values[name] = load()
+            self._generation = DataGeneration(generation.number, tokens, values)
+
+    def watching(self, name):
+        return name in self._sources
+
+    def on_change(self, hook):
+        """hook(changed_names) runs on the polling thread before the new generation is published."""
+        self._hooks.append(hook)
+        return hook
+
+    def current(self):
+        """The generation pinned to the current request, else the latest."""
+        pinned = _pinned.get()
+        return pinned[0] if pinned is not None else self._generation
+
+    def latest(self):
+        return self._generation
+
+    def pin(self):
+        return _pinned.set((self._generation, {}))
+
+    def unpin(self, token):
+        _pinned.reset(token)
+
+    def check(self):
+        """Reloads changed sources. Returns the new generation, or None when nothing changed."""
+        with self._lock:
+            generation = self._generation
+            tokens = dict(generation.tokens)
+            values = dict(generation.values)
+            changed = []
+            for name, (token, load) in self._sources.items():
+                current = token()
+                if current == generation.tokens.get(name):
+                    continue
+                if load is not None:
+                    try:
+                        values[name] = load()
+                    except Exception as exc:
+                        self.failures += 1
+                        print(f"Keeping the previous {name}: reload failed: {exc}", file=sys.stderr)
+                        continue
+                tokens[name] = current
+                changed.append(name)
+            if not changed:
+                return None
+            for hook in self._hooks:
+                hook(changed)
+            self._generation = DataGeneration(generation.number + 1, tokens, values)
+            self.reloads += 1
+            return self._generation
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:
+                print(f"Data watcher check failed: {exc}", file=sys.stderr)
+
+    def start(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def pinned(key, build):
+    """
+    Returns build(), memoized under key for the rest of the current request so that one
+    request never mixes two versions of a database-backed index. Outside a pinned
+    request it simply returns build().
+    """
+    pin = _pinned.get()
+    if pin is None:
+        return build()
+    resolved = pin[1]
+    value = resolved.get(key)
+    if value is None:
+        value = resolved.setdefault(key, build())
+    return value
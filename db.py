@@ -1,6 +1,12 @@
+import json
+import os
 import sqlite3
+import time
+from pathlib import Path
 
 DB_FILE = "movies.db"
+PUBLISHED_DB_DIR = os.getenv("PUBLISHED_DB_DIR", "published")
+PUBLISHED_POINTER = "CURRENT.json"
 
 MOVIE_EXTRA_COLUMNS = {
     "genres_json": "TEXT",
@@ -19,11 +25,95 @@ ACTOR_EXTRA_COLUMNS = {
     "known_for_department": "TEXT",
 }
 
+# movie_actors is keyed by (movie_id, actor_id) and stored WITHOUT ROWID, so the
+# primary key is the table itself and idx_movie_actors_actor_movie covers lookups
+# by actor_id without touching it.
+MOVIE_ACTORS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        movie_id INTEGER NOT NULL,
+        actor_id INTEGER NOT NULL,
+        PRIMARY KEY (movie_id, actor_id)
+    ) WITHOUT ROWID
+"""
+
+
+# Set by serve_published_db(). Only the API opts in; ingest scripts always use DB_FILE.
+_serving_published = False
+_published_db_dir = PUBLISHED_DB_DIR
+_pointer_cache = {}
+
 
 def get_connection():
     return sqlite3.connect(DB_FILE)
 
 
+def serve_published_db(enabled=True, publish_dir=None):
+    """
+    Makes reads of DB_FILE resolve to the current published copy (see publish_db.py),
+    opened immutable. Falls back to DB_FILE while nothing has been published.
+    """
+    global _serving_published, _published_db_dir
+    _serving_published = enabled
+    _published_db_dir = publish_dir or PUBLISHED_DB_DIR
+    _pointer_cache.clear()
+
+
+def get_published_db(publish_dir=None):
+    """
+    The CURRENT.json record of the published version in publish_dir, with "path"
+    added, or None. Re-read only when the pointer file changes.
+    """
+    directory = Path(publish_dir or _published_db_dir)
+    pointer = directory / PUBLISHED_POINTER
+    try:
+        stat = os.stat(pointer)
+    except FileNotFoundError:
+        return None
+    token = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    cached = _pointer_cache.get(str(directory))
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    with open(pointer, encoding="utf-8") as handle:
+        published = json.load(handle)
+    published["path"] = str(directory / published["file"])
+    _pointer_cache[str(directory)] = (token, published)
+    return published
+
+
+def get_serving_published_db(db_file=None):
+    """The published record that reads of db_file resolve to, or None when they use the file itself."""
+    if not _serving_published or (db_file or DB_FILE) != DB_FILE:
+        return None
+    return get_published_db()
+
+
+def connect(db_file=None, **kwargs):
+    """
+    sqlite3.connect for read paths. While serving published data, DB_FILE opens the
+    current published version read-only with immutable=1, so SQLite skips locking.
+    """
+    published = get_serving_published_db(db_file)
+    if published is None:
+        return sqlite3.connect(db_file or DB_FILE, **kwargs)
+    return sqlite3.connect(Path(published["path"]).resolve().as_uri() + "?immutable=1", uri=True, **kwargs)
+
+
+def get_content_version(db_file=None):
+    """
+    Cheap token that changes whenever the database file is rewritten, or whenever a
+    new version is published while serving published data. Returns None when the
+    database file does not exist yet.
+    """
+    published = get_serving_published_db(db_file)
+    if published is not None:
+        return ("published", published["version"])
+    try:
+        stat = os.stat(db_file or DB_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
 def _create_tables(cursor):
     cursor.execute(
         """
@@ -56,15 +146,8 @@ def _create_tables(cursor):
         """
     )
 
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS movie_actors (
-            movie_id INTEGER,
-            actor_id INTEGER,
-            PRIMARY KEY (movie_id, actor_id)
-        )
-        """
-    )
+    cursor.execute(MOVIE_ACTORS_TABLE_SQL.format(name="movie_actors"))
+
 
 
 def _get_existing_columns(cursor, table_name):
@@ -72,38 +155,115 @@ def _get_existing_columns(cursor, table_name):
     return {row[1] for row in cursor.fetchall()}
 
 
-def _add_missing_columns(cursor, table_name, columns):
-    existing_columns = _get_existing_columns(cursor, table_name)
-    for column_name, column_type in columns.items():
-        if column_name not in existing_columns:
-            cursor.execute(
-                f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"
-            )
+def _migrate_enrichment_columns(cursor):
+    for table_name, columns in (("movies", MOVIE_EXTRA_COLUMNS), ("actors", ACTOR_EXTRA_COLUMNS)):
+        existing_columns = _get_existing_columns(cursor, table_name)
+        for column_name, column_type in columns.items():
+            if column_name not in existing_columns:
+                cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
 
 
-def ensure_schema():
-    conn = get_connection()
-    cursor = conn.cursor()
+def _migrate_movie_actors_without_rowid(cursor):
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'movie_actors'")
+    if "WITHOUT ROWID" not in " ".join(cursor.fetchone()[0].upper().split()):
+        cursor.execute("DROP TABLE IF EXISTS movie_actors_rebuild")
+        cursor.execute(MOVIE_ACTORS_TABLE_SQL.format(name="movie_actors_rebuild"))
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO movie_actors_rebuild (movie_id, actor_id)
+            SELECT movie_id, actor_id FROM movie_actors
+            WHERE movie_id IS NOT NULL AND actor_id IS NOT NULL
+            ORDER BY movie_id, actor_id
+            """
+        )
+        cursor.execute("DROP TABLE movie_actors")
+        cursor.execute("ALTER TABLE movie_actors_rebuild RENAME TO movie_actors")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_actors_actor_movie ON movie_actors (actor_id, movie_id)")
 
-    _create_tables(cursor)
-    _add_missing_columns(cursor, "movies", MOVIE_EXTRA_COLUMNS)
-    _add_missing_columns(cursor, "actors", ACTOR_EXTRA_COLUMNS)
 
+def _migrate_name_title_indexes(cursor):
+    # Serve the COLLATE NOCASE lookups and ORDER BY clauses of db_helper and versus_game.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_actors_name_nocase ON actors (name COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_title_nocase ON movies (title COLLATE NOCASE)")
+
+
+# (version, name, function). Every function must be idempotent: databases created
+# by older releases may already have part of the change.
+MIGRATIONS = (
+    (1, "enrichment_columns", _migrate_enrichment_columns),
+    (2, "movie_actors_without_rowid", _migrate_movie_actors_without_rowid),
+    (3, "name_title_indexes", _migrate_name_title_indexes),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Applies the migrations newer than the database's PRAGMA user_version, each in
+    its own transaction. Returns [{"version", "name", "elapsed_ms"}] for the applied ones.
+    """
+    applied = []
+    cursor = conn.cursor()
+    _create_tables(cursor)
     conn.commit()
+    current = get_schema_version(conn)
+    for version, name, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        started = time.perf_counter()
+        try:
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            cursor.execute("COMMIT")
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append({"version": version, "name": name, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)})
+    if applied:
+        cursor.execute("ANALYZE")
+        conn.commit()
+    return applied
+
+
+def format_migrations(applied):
+    return [f"Applied migration {entry['version']} ({entry['name']}) in {entry['elapsed_ms']:.2f} ms" for entry in applied]
+
+
+def ensure_schema(db_file=None):
+    """Creates missing tables and applies pending migrations. Safe to run on every startup."""
+    conn = sqlite3.connect(db_file) if db_file else get_connection()
+    started = time.perf_counter()
+    applied = migrate(conn)
+    version = get_schema_version(conn)
     conn.close()
-    print("Database schema ensured.")
+    for line in format_migrations(applied):
+        print(line)
+    print(f"Database schema ensured at version {version} in {(time.perf_counter() - started) * 1000:.2f} ms.")
+    return applied
 
 
-def init_db():
-    conn = get_connection()
+def init_db(db_file=None, migrate_schema=True):
+    """
+    Drops and recreates the tables. Bulk loaders pass migrate_schema=False and call
+    ensure_schema() after inserting, so the indexes are built once over the loaded rows.
+    """
+    conn = sqlite3.connect(db_file) if db_file else get_connection()
     cursor = conn.cursor()
 
     cursor.execute("DROP TABLE IF EXISTS movie_actors")
     cursor.execute("DROP TABLE IF EXISTS actors")
     cursor.execute("DROP TABLE IF EXISTS movies")
+    cursor.execute("PRAGMA user_version = 0")
 
     _create_tables(cursor)
-
     conn.commit()
+    if migrate_schema:
+        migrate(conn)
+
     conn.close()
     print("Database initialized.")
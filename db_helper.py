@@ -1,8 +1,9 @@
-import sqlite3
-from db import DB_FILE
+from db import DB_FILE, get_content_version
+import metrics
+import neighbor_orders
 
 def get_connection():
-    return sqlite3.connect(DB_FILE)
+    return metrics.connect(DB_FILE)
 
 def insert_movie(
     movie_id,
@@ -14,6 +15,7 @@ def insert_movie(
     original_language=None,
     content_rating=None,
 ):
+    previous_version = get_content_version(DB_FILE)
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -48,6 +50,7 @@ def insert_movie(
     ))
     conn.commit()
     conn.close()
+    neighbor_orders.record_movie(DB_FILE, movie_id, previous_version)
 
 def insert_actor(
     actor_id,
@@ -60,6 +63,7 @@ def insert_actor(
     profile_path=None,
     known_for_department=None,
 ):
+    previous_version = get_content_version(DB_FILE)
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -97,8 +101,10 @@ def insert_actor(
     ))
     conn.commit()
     conn.close()
+    neighbor_orders.record_actor(DB_FILE, actor_id, previous_version)
 
 def insert_relationship(movie_id, actor_id):
+    previous_version = get_content_version(DB_FILE)
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -107,6 +113,8 @@ def insert_relationship(movie_id, actor_id):
     """, (movie_id, actor_id))
     conn.commit()
     conn.close()
+    # Keep the shared neighbor orders current so reads skip a rebuild.
+    neighbor_orders.record_relationship(DB_FILE, movie_id, actor_id, previous_version)
 
 def get_actor_by_id(actor_id):
     conn = get_connection()
@@ -225,41 +233,18 @@ def get_all_movie_actor_links():
     return result
 
 
-def get_actors_in_movie(movie_id, exclude_names=None):
-    conn = get_connection()
-    cursor = conn.cursor()
-    sql = """
-        SELECT a.id, a.name, a.popularity
-        FROM actors a
-        JOIN movie_actors ma ON a.id = ma.actor_id
-        WHERE ma.movie_id = ?
-    """
-    params = [movie_id]
-
-    if exclude_names:
-        placeholders = ",".join("?" * len(exclude_names))
-        sql += f" AND a.name NOT IN ({placeholders})"
-        params.extend(exclude_names)
-
-    sql += " ORDER BY a.name COLLATE NOCASE ASC"
-    cursor.execute(sql, tuple(params))
-    result = cursor.fetchall()
-    conn.close()
-    return result
+def get_actors_in_movie(movie_id, exclude_names=None, order="name", limit=None):
+    # Served from precomputed cast orders: order is "name" (case-insensitive) or "popularity".
+    return neighbor_orders.get_neighbor_orders(DB_FILE).movie_cast(
+        movie_id,
+        order=order,
+        limit=limit,
+        exclude_names=exclude_names,
+    )
 
-def get_movies_for_actor(actor_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT m.id, m.title, m.release_date
-        FROM movies m
-        JOIN movie_actors ma ON m.id = ma.movie_id
-        WHERE ma.actor_id = ?
-        ORDER BY m.title COLLATE NOCASE ASC
-    """, (actor_id,))
-    result = cursor.fetchall()
-    conn.close()
-    return result
+def get_movies_for_actor(actor_id, order="title", limit=None):
+    # Served from precomputed filmographies: order is "title" (case-insensitive) or "release_date".
+    return neighbor_orders.get_neighbor_orders(DB_FILE).actor_filmography(actor_id, order=order, limit=limit)
 
 
 def actor_exists(actor_id):
@@ -2,8 +2,18 @@ import argparse
 import json
 from pathlib import Path
 
-from fastapi_app.main import LEVELS
+# Loaded before the project modules below, which read their settings at import time.
+ENV_FILE = Path(__file__).resolve().parent / ".env"
+if ENV_FILE.exists():
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE)
+
+from db import DB_FILE
 from frontend_snapshot import build_frontend_manifest, build_frontend_snapshot
+from graph_index import load_graph
+from landmark_oracle import DEFAULT_LANDMARK_COUNT, build_landmark_oracle, save_landmark_oracle
+from levels_loader import load_levels
 
 
 def main():
@@ -23,9 +33,20 @@ def main():
         "--snapshot-endpoint",
         help="Override the manifest snapshot endpoint. Defaults to the snapshot file name when --manifest-output is used.",
     )
+    parser.add_argument(
+        "--landmarks-output",
+        help="Optional landmark oracle path (e.g. dist/landmarks.bin). When provided, builds the distance oracle used by distance-only path hints.",
+    )
+    parser.add_argument(
+        "--landmark-count",
+        type=int,
+        default=DEFAULT_LANDMARK_COUNT,
+        help=f"Number of landmarks in the distance oracle. Default: {DEFAULT_LANDMARK_COUNT}",
+    )
     args = parser.parse_args()
 
-    snapshot = build_frontend_snapshot(LEVELS)
+    levels = load_levels()
+    snapshot = build_frontend_snapshot(levels)
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text(json.dumps(snapshot, indent=2), encoding="utf-8")
@@ -35,10 +56,15 @@ def main():
         manifest_output_path = Path(args.manifest_output)
         manifest_output_path.parent.mkdir(parents=True, exist_ok=True)
         snapshot_endpoint = args.snapshot_endpoint or output_path.name
-        manifest = build_frontend_manifest(LEVELS, snapshot_endpoint=snapshot_endpoint)
+        manifest = build_frontend_manifest(levels, snapshot_endpoint=snapshot_endpoint)
         manifest_output_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
         print(f"Wrote frontend manifest to {manifest_output_path}")
 
+    if args.landmarks_output:
+        oracle = build_landmark_oracle(load_graph(DB_FILE), count=args.landmark_count)
+        save_landmark_oracle(oracle, args.landmarks_output)
+        print(f"Wrote {len(oracle.landmarks)} landmarks to {args.landmarks_output}")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
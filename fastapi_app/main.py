@@ -1,26 +1,45 @@
+from contextlib import asynccontextmanager
 from enum import Enum
+import math
 import os
 import sys
+import threading
+import time
 from pathlib import Path as FilePath
-from fastapi import FastAPI, HTTPException, Query, Body, Path
+from fastapi import FastAPI, HTTPException, Query, Body, Path, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from dotenv import load_dotenv
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
 ROOT_DIR = FilePath(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+# Loaded before the project modules below, which read their settings at import time.
+ENV_FILE = ROOT_DIR / ".env"
+if ENV_FILE.exists():
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE)
+
 from versus_game import (
     get_actor_by_name as vg_get_actor_by_name,
     get_actor_details_by_name as vg_get_actor_details_by_name,
     get_movie_by_title as vg_get_movie_by_title,
 )
 from path_utils import (
+    PathBudgetExceeded,
+    SearchBudget,
+    build_path_constraints,
     build_path_hint,
+    clear_path_cache,
+    enumerate_typed_shortest_paths,
     generate_typed_path,
+    get_component_stats,
+    get_path_cache_stats,
+    hydrate_node_labels,
+    iter_batch_typed_paths,
     normalize_path,
     pretty_print_path,
     serialize_typed_path,
@@ -36,12 +55,43 @@ from db_helper import (
     get_movies_for_actor as db_get_movies_for_actor,
     movie_exists,
 )
+from component_index import clear_component_index_cache, get_component_index
+import data_watcher
+from db import DB_FILE, ensure_schema, get_content_version, get_serving_published_db, serve_published_db
 from frontend_snapshot import build_frontend_manifest, build_frontend_snapshot
+from game_sessions import (
+    choose_option as game_choose_option,
+    end_session as game_end_session,
+    get_session as game_get_session,
+    get_session_stats as game_get_session_stats,
+    go_back as game_go_back,
+    shuffle_options as game_shuffle_options,
+    start_session as game_start_session,
+    write_in as game_write_in,
+)
+from graph_cache import clear_graph_cache, get_graph
+import metrics
+from neighbor_orders import clear_neighbor_orders_cache
+from neighbor_sampling import clear_neighbor_sampler_cache
+import profiling
+import query_log
+import rate_limit
 from project_version import get_project_version
-from tmdb_api import build_poster_url, build_profile_url
+from search_index import clear_search_index_cache, get_search_index
+from single_flight import SingleFlight
+from tmdb_images import build_poster_url, build_profile_url
 import json
+import levels_loader
+
+
+MAX_PATH_BATCH_PAIRS = int(os.getenv("MAX_PATH_BATCH_PAIRS", "500"))
+MAX_PATH_ALTERNATIVES = int(os.getenv("MAX_PATH_ALTERNATIVES", "25"))
+SERVE_PUBLISHED_DB = os.getenv("SERVE_PUBLISHED_DB", "").strip().lower() in ("1", "true", "yes")
+PREWARM_GRAPH = os.getenv("PREWARM_GRAPH", "").strip().lower() in ("1", "true", "yes")
 
-load_dotenv()
+if SERVE_PUBLISHED_DB:
+    # Read the version publish_db.py last published instead of the ingest database.
+    serve_published_db()
 
 
 def get_allowed_origins():
@@ -51,11 +101,30 @@ def get_allowed_origins():
     )
     return [origin.strip() for origin in raw_origins.split(",") if origin.strip()]
 
+@asynccontextmanager
+async def lifespan(_app):
+    started = time.perf_counter()
+    # Brings an existing database up to the current schema; applying nothing takes well under a millisecond.
+    # Published copies are migrated when they are published and are read-only.
+    if not SERVE_PUBLISHED_DB and os.path.exists(DB_FILE):
+        ensure_schema(DB_FILE)
+    watch_data_sources()
+    if PREWARM_GRAPH:
+        prewarm_caches()
+    DATA_WATCHER.start()
+    print(f"Startup finished in {(time.perf_counter() - started) * 1000:.2f} ms.")
+    yield
+    DATA_WATCHER.stop()
+
+
 app = FastAPI(
     title="Co-Stars API",
     description="A FastAPI backend for actor/movie game. All endpoints are documented and testable via the Swagger UI.",
     version=get_project_version(),
+    lifespan=lifespan,
 )
+# Lets PROFILING_ENABLED requests profile the endpoint inside the thread that runs it.
+app.router.route_class = profiling.ProfiledRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +134,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Times every request under its route template and reports per-request counters in Server-Timing."""
+    token = metrics.start_request()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        counts = metrics.finish_request(token)
+        # The router stores the matched route on the shared scope; templates keep label cardinality bounded.
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        metrics.METRICS.observe_latency(request.method, route_path, elapsed)
+        metrics.METRICS.increment(
+            "http_requests_total",
+            labels=(("method", request.method), ("route", route_path), ("status", str(status_code))),
+        )
+    if metrics.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = metrics.server_timing_header(elapsed, counts)
+    return response
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Runs the endpoint under cProfile or the stack sampler when PROFILING_ENABLED and the request asks for it."""
+    mode = profiling.requested_mode(request.headers, request.query_params)
+    if mode is None:
+        return await call_next(request)
+    session, token = profiling.start_request_profile(mode)
+    try:
+        response = await session.run_async(call_next, request)
+    finally:
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        path = profiling.finish_request_profile(session, token, f"{request.method} {route}")
+    response.headers["X-Profile-Path"] = str(path)
+    return response
+
+
+@app.middleware("http")
+async def pin_data_generation(request: Request, call_next):
+    """Serves the whole request from one data generation, even if a reload lands while it runs."""
+    token = DATA_WATCHER.pin()
+    try:
+        response = await call_next(request)
+        response.headers["X-Data-Generation"] = str(DATA_WATCHER.current().number)
+    finally:
+        DATA_WATCHER.unpin(token)
+    return response
+
 LEVELS_EXAMPLE = [
     {
         "actor_a": "Matt Damon",
@@ -271,6 +393,49 @@ PATH_NORMALIZE_RESPONSE_EXAMPLE = {
     ],
 }
 
+PATH_BATCH_REQUEST_EXAMPLE = {
+    "pairs": [
+        PATH_GENERATE_REQUEST_EXAMPLE,
+        {
+            "a": {"type": "actor", "value": "George Clooney"},
+            "b": {"type": "movie", "value": "The Departed"},
+        },
+    ],
+    "include_paths": False,
+    "stream": False,
+}
+
+PATH_BATCH_RESPONSE_EXAMPLE = {
+    "pair_count": 2,
+    "source_count": 1,
+    "results": [
+        {"index": 0, "reachable": True, "steps": 2, "nodes": [], "reason": None},
+        {"index": 1, "reachable": True, "steps": 3, "nodes": [], "reason": None},
+    ],
+}
+
+PATH_ALTERNATIVES_REQUEST_EXAMPLE = {
+    "a": {"type": "actor", "value": "Matt Damon"},
+    "b": {"type": "actor", "value": "Daniel Craig"},
+    "k": 3,
+    "mode": "first",
+}
+
+PATH_ALTERNATIVES_RESPONSE_EXAMPLE = {
+    "steps": 4,
+    "shortest_path_count": 1,
+    "paths": [
+        [
+            {"id": 1892, "type": "actor", "label": "Matt Damon"},
+            {"id": 1422, "type": "movie", "label": "The Departed"},
+            {"id": 13240, "type": "actor", "label": "Mark Wahlberg"},
+            {"id": 910001, "type": "movie", "label": "Fixture Bridge Line"},
+            {"id": 8784, "type": "actor", "label": "Daniel Craig"},
+        ]
+    ],
+    "reason": None,
+}
+
 NOT_FOUND_EXAMPLE = {"error": "Actor not found"}
 MOVIE_NOT_FOUND_EXAMPLE = {"error": "Movie not found"}
 
@@ -283,6 +448,19 @@ class PathGenRequest(BaseModel):
     b: PathNode
 
 
+class PathConstraints(BaseModel):
+    exclude: List[PathNode] = Field(default_factory=list, description="Actors or movies the path may not visit.")
+    min_year: Optional[int] = Field(None, description="Earliest release year allowed for movies on the path.")
+    max_year: Optional[int] = Field(None, description="Latest release year allowed for movies on the path.")
+    genres: List[str] = Field(default_factory=list, description="Movies on the path must have at least one of these genres.")
+    content_ratings: List[str] = Field(default_factory=list, description="Movies on the path must have one of these content ratings.")
+    languages: List[str] = Field(default_factory=list, description="Movies on the path must have one of these original languages.")
+
+
+class PathGenerateRequest(PathGenRequest):
+    constraints: Optional[PathConstraints] = None
+
+
 class NodeType(str, Enum):
     actor = "actor"
     movie = "movie"
@@ -303,6 +481,14 @@ class PathHint(BaseModel):
     reachable: bool
     steps_to_target: Optional[int] = None
     path: List[NodeSummary] = Field(default_factory=list)
+    budget_exceeded: bool = False
+
+
+class PathDistanceHint(PathHint):
+    """Hint returned for hint_mode=distance: steps_to_target is set only when the bounds meet."""
+
+    steps_lower_bound: Optional[int] = None
+    steps_upper_bound: Optional[int] = None
 
 
 class PathGenerateResponse(BaseModel):
@@ -310,9 +496,230 @@ class PathGenerateResponse(BaseModel):
     nodes: List[NodeSummary]
     steps: Optional[int] = None
     reason: Optional[str] = None
+    nodes_expanded: Optional[int] = Field(None, description="Graph nodes the search expanded.")
+    elapsed_ms: Optional[float] = Field(None, description="Time the search took, in milliseconds.")
+    budget_exceeded: bool = False
+
+
+class PathBatchRequest(BaseModel):
+    pairs: List[PathGenRequest] = Field(..., description=f"Node pairs to resolve. At most {MAX_PATH_BATCH_PAIRS} per request.")
+    include_paths: bool = Field(False, description="Attach the serialized shortest path to each result.")
+    stream: bool = Field(False, description="Stream results as NDJSON lines, one per pair, as each source group finishes.")
+
+
+class PathBatchResult(BaseModel):
+    index: int
+    reachable: bool
+    steps: Optional[int] = None
+    nodes: List[NodeSummary] = Field(default_factory=list)
+    reason: Optional[str] = None
+
+
+class PathBatchResponse(BaseModel):
+    pair_count: int
+    source_count: int
+    results: List[PathBatchResult]
+
+
+class PathHintMode(str, Enum):
+    path = "path"
+    distance = "distance"
+
+
+class CastOrder(str, Enum):
+    name = "name"
+    popularity = "popularity"
+
+
+class FilmographyOrder(str, Enum):
+    title = "title"
+    release_date = "release_date"
+
+
+def get_slice_options(order, limit):
+    """Only the ordering options that were set, so default requests keep their original call shape."""
+    options = {}
+    if order is not None:
+        options["order"] = order.value
+    if limit is not None:
+        options["limit"] = limit
+    return options
+
+
+class PathAlternativesMode(str, Enum):
+    first = "first"
+    sample = "sample"
+
+
+class PathAlternativesRequest(PathGenRequest):
+    k: int = Field(5, ge=1, description=f"Number of alternative shortest paths to return. At most {MAX_PATH_ALTERNATIVES}.")
+    mode: PathAlternativesMode = Field(
+        PathAlternativesMode.first,
+        description="first: deterministic enumeration order. sample: uniform random draw over all shortest paths.",
+    )
+    seed: Optional[int] = Field(None, description="Seed for reproducible sample mode results.")
+
+
+class PathAlternativesResponse(BaseModel):
+    steps: Optional[int] = None
+    shortest_path_count: int
+    paths: List[List[NodeSummary]]
+    reason: Optional[str] = None
+    nodes_expanded: Optional[int] = None
+    elapsed_ms: Optional[float] = None
+    budget_exceeded: bool = False
+
+
+class SearchResult(BaseModel):
+    id: int
+    type: NodeType
+    label: str
+    popularity: Optional[float] = None
+    score: float
+
+
+class GraphComponentStats(BaseModel):
+    node_count: int
+    component_count: int
+    largest_component_size: int
+    isolated_node_count: int
+    top_component_sizes: List[int]
+    size_histogram: Dict[str, int]
+
+
+class GameSessionStart(BaseModel):
+    start_actor: str = Field(..., description="Actor the player starts from.", examples=["Matt Damon"])
+    target_actor: str = Field(..., description="Actor the player must reach.", examples=["Daniel Craig"])
+    seed: Optional[int] = Field(None, description="Seed for reproducible option shuffles.")
+
+
+class GameMoveRequest(BaseModel):
+    id: int = Field(..., description="Id of the movie or actor to play, taken from the current options.")
+
+
+class GameWriteInRequest(BaseModel):
+    text: str = Field(..., min_length=1, description="Typed movie title or actor name; any legal next node may match.")
+
+
+class GameSessionState(BaseModel):
+    session_id: str
+    status: str
+    phase: Optional[NodeType] = None
+    start: NodeSummary
+    target: NodeSummary
+    current: NodeSummary
+    path: List[NodeSummary]
+    options: List[NodeSummary]
+    connections: int
+    turn_count: int
+    back_count: int
+    shuffle_count: int
+
+
+class GameSessionStats(BaseModel):
+    active: int
+    max_sessions: int
+    ttl_seconds: float
+    created: int
+    expired: int
+    evicted: int
+
+
+class PathCacheStats(BaseModel):
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    hits: int
+    reversed_hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class QueryStatsEntry(BaseModel):
+    sql: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow_count: int
+    sample_sql: str
+
+
+class QueryStatsReport(BaseModel):
+    enabled: bool
+    slow_query_ms: float
+    queries: List[QueryStatsEntry]
+
+
+def resolve_named_node(node):
+    if node.type == "actor":
+        actor = vg_get_actor_by_name(node.value)
+        return ("actor", actor[0]) if actor else (None, None)
+    elif node.type == "movie":
+        movie = vg_get_movie_by_title(node.value)
+        return ("movie", movie[0]) if movie else (None, None)
+    else:
+        return (None, None)
+
+
+def build_request_constraints(constraints):
+    if constraints is None:
+        return None
+
+    exclude_nodes = []
+    for node in constraints.exclude:
+        node_type, node_id = resolve_named_node(node)
+        # Unknown names cannot appear on any path, so there is nothing to exclude.
+        if node_type:
+            exclude_nodes.append((node_id, node_type))
+
+    return build_path_constraints(
+        exclude_nodes=exclude_nodes,
+        min_year=constraints.min_year,
+        max_year=constraints.max_year,
+        genres=constraints.genres,
+        content_ratings=constraints.content_ratings,
+        languages=constraints.languages,
+    )
+
+
+RATE_LIMITER = rate_limit.RateLimiter()
+REQUEST_FLIGHTS = SingleFlight()
+
+
+def enforce_rate_limit(request, scope):
+    allowed, retry_after = RATE_LIMITER.check(scope, rate_limit.client_id(request))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for {scope} requests",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def limit_path_requests(request: Request):
+    """Token-bucket limit shared by every /api/path/* endpoint."""
+    enforce_rate_limit(request, "path")
+
+
+def limit_hint_requests(request: Request):
+    """Limits suggestion requests that ask for path hints; plain listings are not limited."""
+    if "target_type" in request.query_params or "target_id" in request.query_params:
+        enforce_rate_limit(request, "hints")
+
+
+def coalesce(name, key, compute):
+    """
+    Runs compute once for concurrent requests with the same name and key against the
+    same data generation and database version; the others wait and share its result.
+    """
+    return REQUEST_FLIGHTS.do((name, DATA_WATCHER.current().number, get_content_version(DB_FILE), key), compute)
 
 @app.post(
     "/api/path/generate",
+    dependencies=[Depends(limit_path_requests)],
     response_model=PathGenerateResponse,
     summary="Generate a path between any two nodes",
     tags=["Pathfinding"],
@@ -324,7 +731,7 @@ class PathGenerateResponse(BaseModel):
     },
 )
 def generate_path_endpoint(
-    req: PathGenRequest = Body(
+    req: PathGenerateRequest = Body(
         ...,
         openapi_examples={
             "actorToActor": {
@@ -338,48 +745,494 @@ def generate_path_endpoint(
                     "b": {"type": "movie", "value": "Ocean's Eleven"},
                 },
             },
+            "constrained": {
+                "summary": "Path using only movies released in 2000 or later",
+                "value": {
+                    **PATH_GENERATE_REQUEST_EXAMPLE,
+                    "constraints": {"min_year": 2000, "exclude": [{"type": "actor", "value": "Brad Pitt"}]},
+                },
+            },
         },
     )
 ):
     """
     Generate a path between any two nodes (actor or movie).
     Input: {"a": {"type": "actor"|"movie", "value": str}, "b": {"type": "actor"|"movie", "value": str}}
+    Optional "constraints" exclude named nodes or restrict movies by year, genre, rating, and language.
     Returns the path as a pretty-printed string, or -1 if no path exists.
+    nodes_expanded and elapsed_ms describe the search; one that runs past PATH_MAX_EXPANDED_NODES
+    or PATH_TIME_BUDGET_MS stops early with budget_exceeded set.
+    Concurrent requests for the same pair and constraints share one search.
     """
     try:
-        def resolve(node):
-            if node.type == "actor":
-                actor = vg_get_actor_by_name(node.value)
-                return ("actor", actor[0]) if actor else (None, None)
-            elif node.type == "movie":
-                movie = vg_get_movie_by_title(node.value)
-                return ("movie", movie[0]) if movie else (None, None)
-            else:
-                return (None, None)
-
-        type_a, id_a = resolve(req.a)
-        type_b, id_b = resolve(req.b)
+        type_a, id_a = resolve_named_node(req.a)
+        type_b, id_b = resolve_named_node(req.b)
         if not type_a or not type_b:
             return {"path": "-1", "nodes": [], "steps": None, "reason": "Invalid actor/movie name"}
+        constraints = build_request_constraints(req.constraints)
+        return coalesce(
+            "path",
+            (id_a, type_a, id_b, type_b, json.dumps(constraints, sort_keys=True)),
+            lambda: build_generated_path(id_a, type_a, id_b, type_b, constraints),
+        )
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
-        typed_path = generate_typed_path(id_a, type_a, id_b, type_b)
-        if typed_path == -1:
-            return {"path": "-1", "nodes": [], "steps": None, "reason": "No path found"}
 
-        node_ids = [node_id for node_id, _node_type in typed_path]
+def build_generated_path(id_a, type_a, id_b, type_b, constraints):
+    budget = SearchBudget()
+    path_kwargs = {"constraints": constraints} if constraints else {}
+    try:
+        typed_path = generate_typed_path(id_a, type_a, id_b, type_b, budget=budget, **path_kwargs)
+    except PathBudgetExceeded:
         return {
-            "path": pretty_print_path(node_ids, start_type=type_a),
-            "nodes": serialize_typed_path(typed_path),
-            "steps": len(typed_path) - 1,
-            "reason": None,
+            "path": "-1",
+            "nodes": [],
+            "steps": None,
+            "reason": "Search budget exceeded",
+            "budget_exceeded": True,
+            **budget.stats(),
         }
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    if typed_path == -1:
+        return {"path": "-1", "nodes": [], "steps": None, "reason": "No path found", **budget.stats()}
+
+    node_ids = [node_id for node_id, _node_type in typed_path]
+    labels = hydrate_node_labels(typed_path)
+    return {
+        "path": pretty_print_path(node_ids, start_type=type_a, labels=labels),
+        "nodes": serialize_typed_path(typed_path, labels=labels),
+        "steps": len(typed_path) - 1,
+        "reason": None,
+        **budget.stats(),
+    }
+
+
+def build_batch_path_result(index, typed_path, include_paths, labels=None):
+    if typed_path is None:
+        return {"index": index, "reachable": False, "steps": None, "nodes": [], "reason": "Search budget exceeded"}
+    if typed_path == -1:
+        return {"index": index, "reachable": False, "steps": None, "nodes": [], "reason": "No path found"}
+
+    return {
+        "index": index,
+        "reachable": True,
+        "steps": len(typed_path) - 1,
+        "nodes": serialize_typed_path(typed_path, labels=labels) if include_paths else [],
+        "reason": None,
+    }
+
+
+@app.post(
+    "/api/path/batch",
+    dependencies=[Depends(limit_path_requests)],
+    response_model=PathBatchResponse,
+    summary="Generate shortest paths for many node pairs",
+    tags=["Pathfinding"],
+    responses={
+        200: {
+            "description": "Per-pair distances, optionally with paths. With stream=true the body is NDJSON, one result per line.",
+            "content": {"application/json": {"example": PATH_BATCH_RESPONSE_EXAMPLE}},
+        },
+        400: {"model": dict, "content": {"application/json": {"example": {"detail": "Too many pairs"}}}},
+    },
+)
+def batch_path_endpoint(
+    req: PathBatchRequest = Body(
+        ...,
+        openapi_examples={
+            "sharedSource": {
+                "summary": "Two targets from one source",
+                "value": PATH_BATCH_REQUEST_EXAMPLE,
+            },
+        },
+    )
+):
+    """
+    Resolves many (a, b) pairs in one request.
+    Pairs sharing the same source node are answered by a single BFS, so difficulty scoring
+    and level design tools can ask for hundreds of distances without hundreds of searches.
+    Identical concurrent non-streaming batches share one computation.
+    """
+    if len(req.pairs) > MAX_PATH_BATCH_PAIRS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many pairs: {len(req.pairs)} requested, limit is {MAX_PATH_BATCH_PAIRS}",
+        )
 
+    resolved_names = {}
+
+    def resolve_cached(node):
+        key = (node.type, node.value.casefold())
+        if key not in resolved_names:
+            resolved_names[key] = resolve_named_node(node)
+        return resolved_names[key]
+
+    invalid_results = []
+    pairs = []
+    pair_indexes = []
+    for index, pair in enumerate(req.pairs):
+        type_a, id_a = resolve_cached(pair.a)
+        type_b, id_b = resolve_cached(pair.b)
+        if not type_a or not type_b:
+            invalid_results.append(
+                {"index": index, "reachable": False, "steps": None, "nodes": [], "reason": "Invalid actor/movie name"}
+            )
+            continue
+        pairs.append(((id_a, type_a), (id_b, type_b)))
+        pair_indexes.append(index)
 
-# --- Load levels from file (as in Flask) ---
-with open("levels.json", "r") as f:
-    LEVELS = json.load(f)
+    source_count = len({source for source, _target in pairs})
+
+    def iter_results():
+        yield from invalid_results
+        for batch_index, typed_path in iter_batch_typed_paths(pairs):
+            yield build_batch_path_result(pair_indexes[batch_index], typed_path, req.include_paths)
+
+    if req.stream:
+        return StreamingResponse(
+            (json.dumps(result) + "\n" for result in iter_results()),
+            media_type="application/x-ndjson",
+        )
+
+    def build_response():
+        typed_paths = list(iter_batch_typed_paths(pairs))
+        labels = None
+        if req.include_paths:
+            labels = hydrate_node_labels(
+                node
+                for _batch_index, typed_path in typed_paths
+                if typed_path not in (-1, None)
+                for node in typed_path
+            )
+        results = invalid_results + [
+            build_batch_path_result(pair_indexes[batch_index], typed_path, req.include_paths, labels=labels)
+            for batch_index, typed_path in typed_paths
+        ]
+
+        return {
+            "pair_count": len(req.pairs),
+            "source_count": source_count,
+            "results": sorted(results, key=lambda result: result["index"]),
+        }
+
+    # The resolved pairs, their positions, and the pair count determine the whole response.
+    batch_key = (tuple(pairs), tuple(pair_indexes), len(req.pairs), req.include_paths)
+    return coalesce("path-batch", batch_key, build_response)
+
+
+@app.post(
+    "/api/path/alternatives",
+    dependencies=[Depends(limit_path_requests)],
+    response_model=PathAlternativesResponse,
+    summary="Count and list alternative shortest paths",
+    tags=["Pathfinding"],
+    responses={
+        200: {
+            "description": "Total shortest-path count plus up to k distinct shortest paths.",
+            "content": {"application/json": {"example": PATH_ALTERNATIVES_RESPONSE_EXAMPLE}},
+        },
+        400: {"model": dict, "content": {"application/json": {"example": {"detail": "k is too large"}}}},
+    },
+)
+def path_alternatives_endpoint(
+    req: PathAlternativesRequest = Body(
+        ...,
+        openapi_examples={
+            "actorToActor": {
+                "summary": "Top shortest paths between two actors",
+                "value": PATH_ALTERNATIVES_REQUEST_EXAMPLE,
+            },
+        },
+    )
+):
+    """
+    Counts every distinct shortest path between two named nodes and returns up to k of them.
+    The count comes from a layered BFS, so it stays cheap even when millions of shortest paths exist.
+    The BFS shares the per-query traversal budget of /api/path/generate.
+    """
+    if req.k > MAX_PATH_ALTERNATIVES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"k is too large: {req.k} requested, limit is {MAX_PATH_ALTERNATIVES}",
+        )
+
+    type_a, id_a = resolve_named_node(req.a)
+    type_b, id_b = resolve_named_node(req.b)
+    if not type_a or not type_b:
+        return {"steps": None, "shortest_path_count": 0, "paths": [], "reason": "Invalid actor/movie name"}
+
+    budget = SearchBudget()
+    try:
+        result = enumerate_typed_shortest_paths(
+            id_a,
+            type_a,
+            id_b,
+            type_b,
+            k=req.k,
+            mode=req.mode.value,
+            seed=req.seed,
+            budget=budget,
+        )
+    except PathBudgetExceeded:
+        return {
+            "steps": None,
+            "shortest_path_count": 0,
+            "paths": [],
+            "reason": "Search budget exceeded",
+            "budget_exceeded": True,
+            **budget.stats(),
+        }
+    if result["steps"] is None:
+        return {"steps": None, "shortest_path_count": 0, "paths": [], "reason": "No path found", **budget.stats()}
+
+    labels = hydrate_node_labels(node for typed_path in result["paths"] for node in typed_path)
+    return {
+        "steps": result["steps"],
+        "shortest_path_count": result["count"],
+        "paths": [serialize_typed_path(typed_path, labels=labels) for typed_path in result["paths"]],
+        "reason": None,
+        **budget.stats(),
+    }
+
+
+@app.get(
+    "/api/path/cache-stats",
+    dependencies=[Depends(limit_path_requests)],
+    response_model=PathCacheStats,
+    summary="Shortest-path cache counters",
+    tags=["Pathfinding"],
+)
+def path_cache_stats():
+    """Returns hit, miss, and eviction counters plus current size of the shortest-path LRU cache."""
+    return get_path_cache_stats()
+
+
+@app.get(
+    "/api/graph/components",
+    response_model=GraphComponentStats,
+    summary="Connected component sizes",
+    tags=["Pathfinding"],
+)
+def graph_component_stats(top: int = Query(10, ge=1, le=100, description="How many of the largest component sizes to list.")):
+    """
+    Returns connected component counts and sizes for the actor/movie graph.
+    Nodes in different components can never be linked, so path requests between them
+    return "No path found" without searching.
+    """
+    return get_component_stats(top=top)
+
+
+SESSION_NOT_FOUND = {"error": "Session not found or expired"}
+
+
+def run_game_action(action, *args):
+    try:
+        state = action(*args)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if state is None:
+        return JSONResponse(status_code=404, content=SESSION_NOT_FOUND)
+    return state
+
+
+@app.post(
+    "/api/game/sessions",
+    response_model=GameSessionState,
+    status_code=201,
+    summary="Start a versus game session",
+    tags=["Gameplay"],
+)
+def start_game_session(req: GameSessionStart):
+    """
+    Starts a server-side versus game between two actors. The response carries the
+    session id and the first movie options; sessions expire after a period of inactivity.
+    """
+    start = vg_get_actor_by_name(req.start_actor)
+    target = vg_get_actor_by_name(req.target_actor)
+    if not start or not target:
+        return JSONResponse(status_code=404, content={"error": "Actor not found"})
+    return run_game_action(game_start_session, start[0], target[0], req.seed)
+
+
+@app.get(
+    "/api/game/sessions/stats",
+    response_model=GameSessionStats,
+    summary="Game session store counters",
+    tags=["Gameplay"],
+)
+def game_session_stats():
+    return game_get_session_stats()
+
+
+@app.get(
+    "/api/game/sessions/{session_id}",
+    response_model=GameSessionState,
+    summary="Get game session state",
+    tags=["Gameplay"],
+)
+def get_game_session(session_id: str = Path(..., description="Session id returned when the game started.")):
+    return run_game_action(game_get_session, session_id)
+
+
+@app.delete(
+    "/api/game/sessions/{session_id}",
+    status_code=204,
+    summary="End a game session",
+    tags=["Gameplay"],
+)
+def end_game_session(session_id: str = Path(..., description="Session id returned when the game started.")):
+    if not game_end_session(session_id):
+        return JSONResponse(status_code=404, content=SESSION_NOT_FOUND)
+    return None
+
+
+@app.post(
+    "/api/game/sessions/{session_id}/move",
+    response_model=GameSessionState,
+    summary="Play one of the offered options",
+    tags=["Gameplay"],
+)
+def move_game_session(req: GameMoveRequest, session_id: str = Path(..., description="Session id.")):
+    """
+    Plays a movie (while choosing movies) or a costar (while choosing costars) from the
+    current options. Replaying a movie already on the path rewinds to where it was first played.
+    """
+    return run_game_action(game_choose_option, session_id, req.id)
+
+
+@app.post(
+    "/api/game/sessions/{session_id}/shuffle",
+    response_model=GameSessionState,
+    summary="Draw new options",
+    tags=["Gameplay"],
+)
+def shuffle_game_session(session_id: str = Path(..., description="Session id.")):
+    return run_game_action(game_shuffle_options, session_id)
+
+
+@app.post(
+    "/api/game/sessions/{session_id}/back",
+    response_model=GameSessionState,
+    summary="Undo the last step",
+    tags=["Gameplay"],
+)
+def back_game_session(session_id: str = Path(..., description="Session id.")):
+    return run_game_action(game_go_back, session_id)
+
+
+@app.post(
+    "/api/game/sessions/{session_id}/write-in",
+    response_model=GameSessionState,
+    summary="Play a typed movie title or actor name",
+    tags=["Gameplay"],
+)
+def write_in_game_session(req: GameWriteInRequest, session_id: str = Path(..., description="Session id.")):
+    """Fuzzy-matches the text against every legal next node, not only the offered options."""
+    return run_game_action(game_write_in, session_id, req.text)
+
+
+DATA_WATCHER = data_watcher.DataWatcher()
+_watch_lock = threading.Lock()
+
+
+def watch_data_sources():
+    """
+    Loads levels.json and registers it and the database with DATA_WATCHER. The lifespan
+    calls this at startup; without one (a bare TestClient), the first current_levels() does.
+    """
+    with _watch_lock:
+        if DATA_WATCHER.watching("levels"):
+            return
+        DATA_WATCHER.watch("database", lambda: get_content_version(DB_FILE))
+        DATA_WATCHER.watch(
+            "levels",
+            lambda: data_watcher.file_token(levels_loader.LEVELS_FILE),
+            levels_loader.load_levels,
+        )
+
+
+def current_levels():
+    levels = DATA_WATCHER.current().get("levels")
+    if levels is None:
+        # The pinned generation predates the first load, so read the one just registered.
+        watch_data_sources()
+        levels = DATA_WATCHER.latest().get("levels")
+    return levels
+
+
+def prewarm_caches():
+    """
+    Builds the graph, component and search indexes before the first request, which
+    would otherwise pay for them. Returns each build's time in milliseconds.
+    """
+    if get_content_version(DB_FILE) is None:
+        print(f"Skipping prewarm: {DB_FILE} does not exist.")
+        return {}
+    timings = {}
+    started = time.perf_counter()
+    graph = get_graph(DB_FILE)
+    timings["graph"] = (time.perf_counter() - started) * 1000
+    step = time.perf_counter()
+    get_component_index(DB_FILE, graph)
+    timings["components"] = (time.perf_counter() - step) * 1000
+    step = time.perf_counter()
+    get_search_index(DB_FILE)
+    timings["search"] = (time.perf_counter() - step) * 1000
+    print(
+        f"Prewarmed graph ({len(graph.actor_ids)} actors) in {timings['graph']:.2f} ms, "
+        f"components in {timings['components']:.2f} ms, search index in {timings['search']:.2f} ms."
+    )
+    return timings
+
+_snapshot_cache_lock = threading.Lock()
+_snapshot_cache = {}
+
+
+def get_frontend_snapshot(levels):
+    """
+    Returns the frontend snapshot, rebuilding it only when the database content version
+    or the levels change. Without a database version nothing is cached. Requests that
+    arrive while a rebuild is running wait for it instead of starting their own.
+    """
+    version = get_content_version(DB_FILE)
+    key = (version, json.dumps(levels, sort_keys=True))
+    if version is not None:
+        with _snapshot_cache_lock:
+            if _snapshot_cache.get("key") == key:
+                metrics.increment("snapshot_cache_hits_total")
+                return _snapshot_cache["snapshot"]
+
+    def build():
+        metrics.increment("snapshot_cache_misses_total")
+        snapshot = build_frontend_snapshot(levels)
+        if version is not None:
+            with _snapshot_cache_lock:
+                _snapshot_cache.clear()
+                _snapshot_cache.update(key=key, snapshot=snapshot)
+        return snapshot
+
+    return REQUEST_FLIGHTS.do(("snapshot", key), build)
+
+
+def clear_frontend_snapshot_cache():
+    with _snapshot_cache_lock:
+        _snapshot_cache.clear()
+
+
+@DATA_WATCHER.on_change
+def invalidate_data_caches(changed):
+    """
+    Drops caches built from a replaced source. The version-keyed caches would rebuild on
+    their next use anyway; clearing them here releases the old data right away.
+    """
+    if "database" in changed:
+        clear_graph_cache()
+        clear_component_index_cache()
+        clear_path_cache()
+        clear_search_index_cache()
+        clear_neighbor_orders_cache()
+        clear_neighbor_sampler_cache()
+    clear_frontend_snapshot_cache()
 
 # --- Pydantic Models ---
 class Level(BaseModel):
@@ -404,7 +1257,7 @@ class ActorCatalog(Actor):
 
 
 class ActorSuggestion(Actor):
-    path_hint: Optional[PathHint] = None
+    path_hint: Optional[Union[PathHint, PathDistanceHint]] = None
 
 class Movie(BaseModel):
     id: int
@@ -422,7 +1275,7 @@ class MovieCatalog(Movie):
 
 
 class MovieSuggestion(Movie):
-    path_hint: Optional[PathHint] = None
+    path_hint: Optional[Union[PathHint, PathDistanceHint]] = None
 
 
 class MovieActorLink(BaseModel):
@@ -467,6 +1320,7 @@ class FrontendManifest(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     version: str
+    data_version: Optional[str] = Field(None, description="Published database version, when serving published data.")
 
 class PathValidateRequest(BaseModel):
     start_type: NodeType = NodeType.actor
@@ -504,7 +1358,46 @@ def resolve_target_node(target_type: Optional[NodeType], target_id: Optional[int
     return (target_type.value, target_id)
 
 
-def serialize_actor_rows(actor_rows, target_node=None):
+def get_hint_constraints(
+    min_year: Optional[int] = Query(None, description="Path hints may only use movies released in or after this year."),
+    max_year: Optional[int] = Query(None, description="Path hints may only use movies released in or before this year."),
+    genre: Optional[List[str]] = Query(None, description="Path hints may only use movies with one of these genres."),
+    content_rating: Optional[List[str]] = Query(None, description="Path hints may only use movies with one of these ratings."),
+    language: Optional[List[str]] = Query(None, description="Path hints may only use movies in one of these original languages."),
+    hint_exclude_actor_id: Optional[List[int]] = Query(None, description="Actor ids path hints may not pass through."),
+    hint_exclude_movie_id: Optional[List[int]] = Query(None, description="Movie ids path hints may not pass through."),
+):
+    exclude_nodes = [(actor_id, "actor") for actor_id in hint_exclude_actor_id or []]
+    exclude_nodes.extend((movie_id, "movie") for movie_id in hint_exclude_movie_id or [])
+    return build_path_constraints(
+        exclude_nodes=exclude_nodes,
+        min_year=min_year,
+        max_year=max_year,
+        genres=genre,
+        content_ratings=content_rating,
+        languages=language,
+    )
+
+
+def get_hint_options(
+    hint_constraints: Optional[dict] = Depends(get_hint_constraints),
+    hint_mode: PathHintMode = Query(
+        PathHintMode.path,
+        description="'distance' returns only reachability and step bounds from the landmark oracle, without the path.",
+    ),
+):
+    """Keyword arguments for build_path_hint, containing only the options that are set."""
+    hint_options = {}
+    if hint_constraints:
+        hint_options["constraints"] = hint_constraints
+    if hint_mode == PathHintMode.distance:
+        hint_options["distance_only"] = True
+    return hint_options
+
+
+def serialize_actor_rows(actor_rows, target_node=None, hint_options=None):
+    # Every hint of one response draws on a single traversal budget.
+    budget = SearchBudget()
     serialized = []
     for row in actor_rows:
         actor_id, name, popularity = row[:3]
@@ -526,7 +1419,9 @@ def serialize_actor_rows(actor_rows, target_node=None):
             )
         if target_node is not None:
             target_type, target_id = target_node
-            actor["path_hint"] = build_path_hint(actor_id, "actor", target_id, target_type)
+            actor["path_hint"] = build_path_hint(
+                actor_id, "actor", target_id, target_type, budget=budget, **(hint_options or {})
+            )
         serialized.append(actor)
     return serialized
 
@@ -552,7 +1447,8 @@ def serialize_actor_catalog_rows(actor_rows):
     return serialized
 
 
-def serialize_movie_rows(movie_rows, target_node=None):
+def serialize_movie_rows(movie_rows, target_node=None, hint_options=None):
+    budget = SearchBudget()
     serialized = []
     for row in movie_rows:
         movie_id, title, release_date = row[:3]
@@ -563,7 +1459,9 @@ def serialize_movie_rows(movie_rows, target_node=None):
         }
         if target_node is not None:
             target_type, target_id = target_node
-            movie["path_hint"] = build_path_hint(movie_id, "movie", target_id, target_type)
+            movie["path_hint"] = build_path_hint(
+                movie_id, "movie", target_id, target_type, budget=budget, **(hint_options or {})
+            )
         serialized.append(movie)
     return serialized
 
@@ -607,7 +1505,51 @@ def serialize_movie_catalog_rows(movie_rows):
     },
 )
 def health_check():
-    return {"status": "ok", "version": get_project_version()}
+    published = get_serving_published_db()
+    return {
+        "status": "ok",
+        "version": get_project_version(),
+        "data_version": published["version"] if published else None,
+    }
+
+
+@app.get(
+    "/api/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    tags=["System"],
+)
+def export_metrics():
+    """Request latency histograms and work counters in the Prometheus text exposition format."""
+    path_cache = get_path_cache_stats()
+    gauges = {
+        "path_cache_entries": ("Entries in the shortest-path LRU cache.", path_cache["entries"]),
+        "path_cache_hits": ("Shortest-path cache hits since startup.", path_cache["hits"]),
+        "path_cache_misses": ("Shortest-path cache misses since startup.", path_cache["misses"]),
+        "game_sessions_active": ("Versus game sessions currently held in memory.", game_get_session_stats()["active"]),
+        "data_generation": ("Data generation serving new requests; bumps when levels or the database reload.", DATA_WATCHER.latest().number),
+        "data_reload_failures": ("Reloads skipped because a changed source failed to load.", DATA_WATCHER.failures),
+    }
+    return PlainTextResponse(metrics.METRICS.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get(
+    "/api/metrics/queries",
+    response_model=QueryStatsReport,
+    summary="Per-statement SQL timings",
+    tags=["System"],
+)
+def export_query_stats():
+    """
+    SQL statements aggregated by normalized text, heaviest first. Statements are only
+    timed with QUERY_LOG_ENABLED=1; save this response and pass it to
+    `python query_log.py --stats` for query plans and full-scan flags.
+    """
+    return {
+        "enabled": query_log.QUERY_LOG_ENABLED,
+        "slow_query_ms": query_log.SLOW_QUERY_MS,
+        "queries": query_log.QUERY_STATS.snapshot(),
+    }
 
 
 @app.get(
@@ -624,7 +1566,7 @@ def health_check():
 )
 def get_levels():
     """Returns all available levels."""
-    return LEVELS
+    return current_levels()
 
 
 @app.get(
@@ -678,7 +1620,8 @@ def export_frontend_manifest():
 
     TODO(frontend-refactor): Use this endpoint as the default freshness check before downloading a new snapshot.
     """
-    return build_frontend_manifest(LEVELS)
+    levels = current_levels()
+    return coalesce("manifest", None, lambda: build_frontend_manifest(levels))
 
 
 @app.get(
@@ -699,7 +1642,7 @@ def export_frontend_snapshot():
     TODO(frontend-refactor): Make this export contract the long-term frontend sync surface.
     TODO(frontend-refactor): Move legacy gameplay-specific lookup endpoints behind a compatibility namespace once the frontend owns graph traversal.
     """
-    return build_frontend_snapshot(LEVELS)
+    return get_frontend_snapshot(current_levels())
 
 @app.get(
     "/api/actor/{name}",
@@ -720,8 +1663,27 @@ def get_actor_by_name(
         return JSONResponse(status_code=404, content={"error": "Actor not found"})
     return {"id": actor[0], "name": actor[1], "popularity": actor[2]}
 
+@app.get(
+    "/api/search",
+    response_model=List[SearchResult],
+    summary="Fuzzy search and autocomplete for actors and movies",
+    tags=["Catalog"],
+)
+def search_catalog(
+    q: str = Query(..., min_length=1, description="Partial or misspelled actor name or movie title.", examples=["george cloony"]),
+    type: Optional[NodeType] = Query(None, description="Restrict results to actors or movies."),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results."),
+):
+    """
+    Returns the best matching actors and movies from a trigram index with prefix
+    autocomplete, ranked by similarity with popularity as a boost.
+    """
+    node_type = type.value if type else None
+    return get_search_index().search(q, node_type=node_type, limit=limit)
+
 @app.get(
     "/api/actor/{actor_id}/movies",
+    dependencies=[Depends(limit_hint_requests)],
     response_model=List[MovieSuggestion],
     summary="Get movies for actor",
     tags=["Actors"],
@@ -742,18 +1704,37 @@ def get_movies_for_actor(
         description="Optional target node id used to attach shortest-path hint metadata.",
         examples=[1892],
     ),
+    order: Optional[FilmographyOrder] = Query(
+        None,
+        description="title (default, case-insensitive) or release_date (oldest first, undated last).",
+    ),
+    limit: Optional[int] = Query(None, ge=1, description="Return only the first N movies in this order."),
+    hint_options: dict = Depends(get_hint_options),
 ):
-    """Returns all movies for a given actor ID with optional target-aware path hints."""
+    """
+    Returns all movies for a given actor ID with optional target-aware path hints.
+    Filmographies are kept pre-sorted, so order and limit return a slice without sorting.
+    Identical concurrent hint requests share one computation and are rate limited per client.
+    """
     if not actor_exists(actor_id):
         return JSONResponse(status_code=404, content={"error": "Actor not found"})
 
     target_node = resolve_target_node(target_type, target_id)
-    movies = db_get_movies_for_actor(actor_id)
-    return serialize_movie_rows(movies, target_node=target_node)
+    slice_options = get_slice_options(order, limit)
+
+    def build():
+        movies = db_get_movies_for_actor(actor_id, **slice_options)
+        return serialize_movie_rows(movies, target_node=target_node, hint_options=hint_options)
+
+    if target_node is None:
+        return build()
+    hint_key = json.dumps([actor_id, target_node, slice_options, hint_options], sort_keys=True)
+    return coalesce("actor-movie-hints", hint_key, build)
 
 
 @app.get(
     "/api/movie/{movie_id}/costars",
+    dependencies=[Depends(limit_hint_requests)],
     response_model=List[ActorSuggestion],
     responses={
         200: {"content": {"application/json": {"example": ACTOR_SUGGESTIONS_EXAMPLE}}},
@@ -779,18 +1760,37 @@ def get_costars_for_movie(
         description="Optional target node id used to attach shortest-path hint metadata.",
         examples=[1892],
     ),
+    order: Optional[CastOrder] = Query(
+        None,
+        description="name (default, case-insensitive) or popularity (most popular first).",
+    ),
+    limit: Optional[int] = Query(None, ge=1, description="Return only the first N actors in this order."),
+    hint_options: dict = Depends(get_hint_options),
 ):
-    """Returns all costars for a given movie ID with optional target-aware path hints."""
+    """
+    Returns all costars for a given movie ID with optional target-aware path hints.
+    Casts are kept pre-sorted, so order and limit return a slice without sorting.
+    Identical concurrent hint requests share one computation and are rate limited per client.
+    """
     if not movie_exists(movie_id):
         return JSONResponse(status_code=404, content={"error": "Movie not found"})
 
     target_node = resolve_target_node(target_type, target_id)
     excluded_names = exclude or []
-    costars = get_actors_in_movie(movie_id, excluded_names)
-    return serialize_actor_rows(costars, target_node=target_node)
+    slice_options = get_slice_options(order, limit)
+
+    def build():
+        costars = get_actors_in_movie(movie_id, excluded_names, **slice_options)
+        return serialize_actor_rows(costars, target_node=target_node, hint_options=hint_options)
+
+    if target_node is None:
+        return build()
+    hint_key = json.dumps([movie_id, excluded_names, target_node, slice_options, hint_options], sort_keys=True)
+    return coalesce("costar-hints", hint_key, build)
 
 @app.post(
     "/api/path/validate",
+    dependencies=[Depends(limit_path_requests)],
     response_model=PathValidateResponse,
     response_model_exclude_none=True,
     summary="Validate a path",
@@ -853,6 +1853,7 @@ def validate_path(
 
 @app.post(
     "/api/path/normalize",
+    dependencies=[Depends(limit_path_requests)],
     response_model=PathNormalizeResponse,
     summary="Normalize repeated nodes in a path",
     tags=["Gameplay"],
@@ -7,13 +7,13 @@ from db_helper import (
     get_all_movie_actor_links,
     get_all_movies_with_metadata,
 )
-from db import DB_FILE
+from db import DB_FILE, get_serving_published_db
+from levels_loader import LEVELS_FILE
 from project_version import get_project_version
-from tmdb_api import build_poster_url, build_profile_url
+from tmdb_images import build_poster_url, build_profile_url
 
 
 ROOT = Path(__file__).resolve().parent
-LEVELS_FILE = ROOT / "levels.json"
 
 
 def _isoformat_from_timestamp(timestamp):
@@ -23,8 +23,12 @@ def _isoformat_from_timestamp(timestamp):
 def _get_source_updated_at():
     timestamps = []
 
+    published = get_serving_published_db()
     db_path = ROOT / DB_FILE
-    if db_path.exists():
+    if published is not None:
+        # A published version's data changes only when it is published, whatever its file mtime says.
+        timestamps.append(datetime.fromisoformat(published["published_at"]).timestamp())
+    elif db_path.exists():
         timestamps.append(db_path.stat().st_mtime)
 
     if LEVELS_FILE.exists():
@@ -0,0 +1,361 @@
+"""Server-side versus game sessions.
+
+A session holds one player's path through the actor/movie graph as (id, type)
+nodes plus the options currently on offer. Every move is checked against the
+shared GraphIndex adjacency, so a session never needs SQL to validate a path,
+and options are drawn from the node's neighbor row by neighbor_sampling.
+
+Sessions live in memory only. They expire after GAME_SESSION_TTL_SECONDS without
+a request, and the store never holds more than GAME_SESSION_MAX_SESSIONS; the
+least recently used session is evicted first. Each session keeps a few ints and
+two short lists, so thousands of concurrent games fit in a few megabytes.
+"""
+
+import os
+import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from neighbor_sampling import get_neighbor_sampler
+from path_utils import fallback_node_label
+from search_index import get_search_index
+from versus_game import WRITE_IN_MIN_SCORE
+
+DB_FILE = "movies.db"
+DEFAULT_TTL_SECONDS = float(os.getenv("GAME_SESSION_TTL_SECONDS", "1800"))
+DEFAULT_MAX_SESSIONS = int(os.getenv("GAME_SESSION_MAX_SESSIONS", "10000"))
+# Match the CLI game: six options per turn, costars drawn by popularity.
+OPTION_COUNT = 6
+
+
+class GameSession:
+    """
+    One versus game. ``path`` alternates actor and movie (id, type) nodes starting
+    from the start actor; the last node decides the phase. Randomness is derived
+    from (seed, draws) on demand instead of keeping a Random instance per session.
+    """
+
+    __slots__ = (
+        "session_id",
+        "seed",
+        "draws",
+        "start_id",
+        "target_id",
+        "path",
+        "options",
+        "status",
+        "turn_count",
+        "back_count",
+        "shuffle_count",
+        "expires_at",
+        "lock",
+    )
+
+    def __init__(self, session_id, start_id, target_id, seed):
+        self.session_id = session_id
+        self.seed = seed
+        self.draws = 0
+        self.start_id = start_id
+        self.target_id = target_id
+        self.path = [(start_id, "actor")]
+        self.options = []
+        self.status = "playing"
+        self.turn_count = 0
+        self.back_count = 0
+        self.shuffle_count = 0
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def phase(self):
+        """"movie" while choosing a movie for the current actor, "actor" while choosing a costar."""
+        if self.status != "playing":
+            return None
+        return "movie" if self.path[-1][1] == "actor" else "actor"
+
+    def next_rng(self):
+        self.draws += 1
+        return random.Random(self.seed * 1000003 + self.draws)
+
+
+class SessionStore:
+    """
+    LRU of GameSession objects with a sliding TTL. Every access moves a session to
+    the back, so expired sessions always sit at the front and are dropped in order.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_sessions=DEFAULT_MAX_SESSIONS, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _drop_expired(self, now):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def add(self, session):
+        now = self._clock()
+        session.expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._drop_expired(now)
+            self._sessions[session.session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    def get(self, session_id):
+        now = self._clock()
+        with self._lock:
+            self._drop_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.expires_at = now + self.ttl_seconds
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self):
+        with self._lock:
+            self._drop_expired(self._clock())
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+SESSION_STORE = SessionStore()
+
+
+def _node_label(index, node_id, node_type):
+    entry = index.lookup(node_id, node_type)
+    return entry[0] if entry else fallback_node_label(node_id, node_type)
+
+
+def _graph_node(graph, node_id, node_type):
+    node = graph.node_index(node_id, node_type)
+    if node is None:
+        raise ValueError(f"{node_type.capitalize()} {node_id} is no longer in the graph")
+    return node
+
+
+def _path_actor_indices(path, graph):
+    return {graph.node_index(node_id, "actor") for node_id, node_type in path if node_type == "actor"}
+
+
+def _sample_options(session, sampler, index, path=None):
+    """
+    Draws the next OPTION_COUNT options from the neighbor row of the last node of path,
+    the session's path by default. Callers pass a path they have not committed yet, so
+    a failed draw leaves the session unchanged.
+    """
+    graph = sampler.graph
+    path = session.path if path is None else path
+    node_id, node_type = path[-1]
+    node = _graph_node(graph, node_id, node_type)
+    rng = session.next_rng()
+
+    if node_type == "actor":
+        return [graph.movie_ids[movie - graph.actor_count] for movie in sampler.sample(node, OPTION_COUNT, rng)]
+
+    # Actors already on the path are never offered again.
+    picked = sampler.sample_weighted(node, OPTION_COUNT, rng, exclude=_path_actor_indices(path, graph))
+    ranked = sorted(
+        picked,
+        key=lambda actor: (
+            -(sampler.popularity_of(actor) or 0.0),
+            _node_label(index, graph.actor_ids[actor], "actor").lower(),
+        ),
+    )
+    return [graph.actor_ids[actor] for actor in ranked]
+
+
+def _context():
+    sampler = get_neighbor_sampler(DB_FILE)
+    return sampler, get_search_index(DB_FILE)
+
+
+def session_state(session, index):
+    def summary(node_id, node_type):
+        return {"id": node_id, "type": node_type, "label": _node_label(index, node_id, node_type)}
+
+    phase = session.phase
+    option_type = phase if phase else None
+    return {
+        "session_id": session.session_id,
+        "status": session.status,
+        "phase": phase,
+        "start": summary(session.start_id, "actor"),
+        "target": summary(session.target_id, "actor"),
+        "current": summary(*session.path[-1]),
+        "path": [summary(node_id, node_type) for node_id, node_type in session.path],
+        "options": [summary(node_id, option_type) for node_id in session.options] if option_type else [],
+        "connections": len(session.path) // 2,
+        "turn_count": session.turn_count,
+        "back_count": session.back_count,
+        "shuffle_count": session.shuffle_count,
+    }
+
+
+def start_session(start_id, target_id, seed=None, store=None):
+    """Creates a session from the start actor towards the target actor and returns its state."""
+    store = store or SESSION_STORE
+    if start_id == target_id:
+        raise ValueError("Start and target actors must differ")
+    sampler, index = _context()
+    _graph_node(sampler.graph, start_id, "actor")
+    _graph_node(sampler.graph, target_id, "actor")
+
+    session = GameSession(
+        secrets.token_urlsafe(12),
+        start_id,
+        target_id,
+        seed if seed is not None else secrets.randbits(32),
+    )
+    session.options = _sample_options(session, sampler, index)
+    store.add(session)
+    return session_state(session, index)
+
+
+def _with_session(session_id, store, action):
+    session = (store or SESSION_STORE).get(session_id)
+    if session is None:
+        return None
+    with session.lock:
+        sampler, index = _context()
+        if action is not None:
+            action(session, sampler, index)
+        return session_state(session, index)
+
+
+def get_session(session_id, store=None):
+    return _with_session(session_id, store, None)
+
+
+def end_session(session_id, store=None):
+    return (store or SESSION_STORE).remove(session_id)
+
+
+def _require_playing(session):
+    if session.status != "playing":
+        raise ValueError("Game is already over")
+
+
+def _apply_move(session, sampler, index, node_id):
+    """Appends node_id after validating it is adjacent to the current node; rewinds movie loops."""
+    graph = sampler.graph
+    current_id, current_type = session.path[-1]
+    next_type = "movie" if current_type == "actor" else "actor"
+    current = _graph_node(graph, current_id, current_type)
+    node = graph.node_index(node_id, next_type)
+    if node is None or not graph.has_edge(current, node):
+        raise ValueError(f"{next_type.capitalize()} {node_id} is not connected to the current {current_type}")
+
+    path = list(session.path)
+    if next_type == "movie":
+        # Same rule as versus_game.rewind_if_loop: replaying a movie rewinds to the actor who first took it.
+        if (node_id, "movie") in path:
+            path = path[: path.index((node_id, "movie"))]
+    elif node in _path_actor_indices(path, graph):
+        raise ValueError(f"Actor {node_id} is already on the path")
+
+    path.append((node_id, next_type))
+    won = next_type == "actor" and node_id == session.target_id
+    options = [] if won else _sample_options(session, sampler, index, path)
+    session.path = path
+    session.options = options
+    session.turn_count += 1
+    if won:
+        session.status = "won"
+
+
+def choose_option(session_id, node_id, store=None):
+    """Plays one of the options currently on offer."""
+
+    def action(session, sampler, index):
+        _require_playing(session)
+        if node_id not in session.options:
+            raise ValueError(f"{node_id} is not one of the current options")
+        _apply_move(session, sampler, index, node_id)
+
+    return _with_session(session_id, store, action)
+
+
+def shuffle_options(session_id, store=None):
+    def action(session, sampler, index):
+        _require_playing(session)
+        session.options = _sample_options(session, sampler, index)
+        session.shuffle_count += 1
+
+    return _with_session(session_id, store, action)
+
+
+def go_back(session_id, store=None):
+    """Undoes the last actor and movie while choosing a movie, or the last movie while choosing a costar."""
+
+    def action(session, sampler, index):
+        _require_playing(session)
+        if session.phase == "movie":
+            if len(session.path) < 3:
+                raise ValueError("Cannot go back further")
+            path = session.path[:-2]
+        else:
+            path = session.path[:-1]
+        # Sampled before anything is committed, so a failed draw leaves the session as it was.
+        options = _sample_options(session, sampler, index, path)
+        session.path = path
+        session.options = options
+        session.turn_count += 1
+        session.back_count += 1
+
+    return _with_session(session_id, store, action)
+
+
+def write_in(session_id, text, store=None):
+    """Resolves free text against every legal next node, not just the options on offer."""
+
+    def action(session, sampler, index):
+        _require_playing(session)
+        node_type = session.phase
+        current_id, current_type = session.path[-1]
+        graph = sampler.graph
+        neighbors = graph.neighbors_of(_graph_node(graph, current_id, current_type))
+        if node_type == "movie":
+            candidates = [(graph.movie_ids[movie - graph.actor_count], "movie") for movie in neighbors]
+        else:
+            excluded = _path_actor_indices(session.path, graph)
+            candidates = [(graph.actor_ids[actor], "actor") for actor in neighbors if actor not in excluded]
+        matches = index.search(text, node_type=node_type, limit=1, restrict_to=candidates, min_score=WRITE_IN_MIN_SCORE)
+        if not matches:
+            raise ValueError(f"No close {node_type} match for '{text}'")
+        _apply_move(session, sampler, index, matches[0]["id"])
+
+    return _with_session(session_id, store, action)
+
+
+def get_session_stats(store=None):
+    return (store or SESSION_STORE).stats()
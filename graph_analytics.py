@@ -0,0 +1,329 @@
+"""Offline actor/movie graph statistics used to calibrate level difficulty."""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import levels_loader
+from graph_index import load_graph
+from path_utils import count_shortest_paths
+from project_version import get_project_version
+
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = ROOT / "dist" / "graph-analytics.json"
+DEFAULT_SAMPLE_COUNT = 32
+TOP_NODE_COUNT = 25
+UNREACHED = -1
+
+# Set in each worker process by _init_worker so the CSR arrays are pickled once per
+# worker instead of once per sampled source.
+_worker_offsets = None
+_worker_neighbors = None
+
+
+def bfs_distances(offsets, neighbors, source):
+    """Returns an array of hop distances from source, UNREACHED for other components."""
+    node_count = len(offsets) - 1
+    dist = array("i", [UNREACHED]) * node_count
+    dist[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            for neighbor in neighbors[offsets[node] : offsets[node + 1]]:
+                if dist[neighbor] == UNREACHED:
+                    dist[neighbor] = depth
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return dist
+
+
+def _init_worker(offsets, neighbors):
+    global _worker_offsets, _worker_neighbors
+    _worker_offsets = offsets
+    _worker_neighbors = neighbors
+
+
+def _summarize_sources(sources):
+    """
+    Runs one BFS per source and folds the results into per-node accumulators:
+    the largest distance to any sample (an eccentricity lower bound), the smallest
+    d(s, v) + ecc(s) (an eccentricity upper bound), and distance sums for closeness.
+    """
+    offsets, neighbors = _worker_offsets, _worker_neighbors
+    node_count = len(offsets) - 1
+    max_dist = array("i", [0]) * node_count
+    upper_bound = array("i", [UNREACHED]) * node_count
+    dist_sum = array("q", [0]) * node_count
+    hits = array("i", [0]) * node_count
+    source_eccentricity = {}
+
+    for source in sources:
+        dist = bfs_distances(offsets, neighbors, source)
+        eccentricity = max(dist)
+        source_eccentricity[source] = eccentricity
+        for node in range(node_count):
+            distance = dist[node]
+            if distance == UNREACHED:
+                continue
+            if distance > max_dist[node]:
+                max_dist[node] = distance
+            bound = distance + eccentricity
+            if upper_bound[node] == UNREACHED or bound < upper_bound[node]:
+                upper_bound[node] = bound
+            dist_sum[node] += distance
+            hits[node] += 1
+
+    return max_dist, upper_bound, dist_sum, hits, source_eccentricity
+
+
+def _chunk(values, chunk_count):
+    chunk_count = max(1, min(chunk_count, len(values)))
+    return [values[index::chunk_count] for index in range(chunk_count)]
+
+
+def sample_sources(graph, component_ids, component_sizes, sample_count, seed):
+    """Picks sources from the largest component: the highest-degree hubs plus a seeded random sample."""
+    if not component_sizes:
+        return []
+    largest = max(range(len(component_sizes)), key=component_sizes.__getitem__)
+    members = [node for node in range(graph.node_count) if component_ids[node] == largest]
+    hub_count = min(len(members), max(1, sample_count // 4))
+    hubs = sorted(members, key=graph.degree, reverse=True)[:hub_count]
+    rng = random.Random(seed)
+    hub_set = set(hubs)
+    others = [node for node in members if node not in hub_set]
+    extra = rng.sample(others, min(len(others), sample_count - hub_count))
+    return hubs + extra
+
+
+def _run_sampled_bfs(graph, sources, workers):
+    offsets, neighbors = graph.offsets, graph.neighbors
+    if workers <= 1 or len(sources) <= 1:
+        _init_worker(offsets, neighbors)
+        partials = [_summarize_sources(sources)]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(offsets, neighbors),
+        ) as executor:
+            partials = list(executor.map(_summarize_sources, _chunk(sources, workers)))
+
+    node_count = graph.node_count
+    max_dist = array("i", [0]) * node_count
+    upper_bound = array("i", [UNREACHED]) * node_count
+    dist_sum = array("q", [0]) * node_count
+    hits = array("i", [0]) * node_count
+    source_eccentricity = {}
+    for part_max, part_upper, part_sum, part_hits, part_ecc in partials:
+        source_eccentricity.update(part_ecc)
+        for node in range(node_count):
+            if part_max[node] > max_dist[node]:
+                max_dist[node] = part_max[node]
+            if part_upper[node] != UNREACHED and (
+                upper_bound[node] == UNREACHED or part_upper[node] < upper_bound[node]
+            ):
+                upper_bound[node] = part_upper[node]
+            dist_sum[node] += part_sum[node]
+            hits[node] += part_hits[node]
+    return max_dist, upper_bound, dist_sum, hits, source_eccentricity
+
+
+def _describe(values):
+    if not values:
+        return {"count": 0, "min": None, "max": None, "mean": None, "median": None, "p90": None}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": round(statistics.fmean(ordered), 3),
+        "median": statistics.median(ordered),
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+    }
+
+
+def _histogram(values):
+    histogram = {}
+    for value in values:
+        histogram[value] = histogram.get(value, 0) + 1
+    return {str(value): histogram[value] for value in sorted(histogram)}
+
+
+def compute_level_distances(graph, levels, actor_names):
+    """Returns one entry per level with the shortest actor-to-actor distance and path count."""
+    index_by_name = {}
+    for actor_id, name in actor_names.items():
+        index = graph.node_index(actor_id, "actor")
+        if index is not None and isinstance(name, str):
+            index_by_name.setdefault(name.strip().casefold(), index)
+
+    results = []
+    for level in levels:
+        source = index_by_name.get(str(level.get("actor_a", "")).strip().casefold())
+        target = index_by_name.get(str(level.get("actor_b", "")).strip().casefold())
+        steps, path_count = (None, 0)
+        if source is not None and target is not None:
+            steps, path_count = count_shortest_paths(graph, source, target)
+        results.append(
+            {
+                "actor_a": level.get("actor_a"),
+                "actor_b": level.get("actor_b"),
+                "stars": level.get("stars"),
+                "steps": steps,
+                "actor_hops": steps // 2 if steps is not None else None,
+                "shortest_path_count": path_count,
+            }
+        )
+    return results
+
+
+def compute_graph_analytics(graph, levels=(), actor_names=None, sample_count=DEFAULT_SAMPLE_COUNT, seed=0, workers=1):
+    timings = {}
+    started = time.perf_counter()
+
+    component_ids, component_sizes = graph.component_ids, graph.component_sizes
+    phase_started = time.perf_counter()
+    sources = sample_sources(graph, component_ids, component_sizes, sample_count, seed)
+    max_dist, upper_bound, dist_sum, hits, source_eccentricity = _run_sampled_bfs(graph, sources, workers)
+    timings["sampled_bfs_ms"] = round((time.perf_counter() - phase_started) * 1000, 2)
+
+    phase_started = time.perf_counter()
+    level_distances = compute_level_distances(graph, levels, actor_names or {})
+    timings["level_distances_ms"] = round((time.perf_counter() - phase_started) * 1000, 2)
+
+    actor_degrees = [graph.degree(index) for index in range(graph.actor_count)]
+    movie_degrees = [graph.degree(index) for index in range(graph.actor_count, graph.node_count)]
+    closeness = [
+        round(hits[node] / dist_sum[node], 6) if dist_sum[node] else 0.0
+        for node in range(graph.node_count)
+    ]
+    top_actors = sorted(range(graph.actor_count), key=lambda node: closeness[node], reverse=True)[:TOP_NODE_COUNT]
+    sample_eccentricities = list(source_eccentricity.values())
+
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return {
+        "meta": {
+            "version": get_project_version(),
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "actor_count": graph.actor_count,
+            "movie_count": graph.movie_count,
+            "relationship_count": graph.edge_count,
+            "sample_count": len(sources),
+            "workers": workers,
+            "seed": seed,
+            "timings": timings,
+        },
+        "components": {
+            "count": len(component_sizes),
+            "largest_size": max(component_sizes) if component_sizes else 0,
+            "isolated_node_count": sum(1 for size in component_sizes if size == 1),
+            "size_histogram": _histogram(component_sizes),
+        },
+        "degrees": {
+            "actor_filmography_lengths": _describe(actor_degrees),
+            "movie_cast_sizes": _describe(movie_degrees),
+            "actor_histogram": _histogram(actor_degrees),
+            "movie_histogram": _histogram(movie_degrees),
+        },
+        "eccentricity": {
+            "sampled_diameter_lower_bound": max(sample_eccentricities) if sample_eccentricities else 0,
+            "sampled_radius_upper_bound": min(sample_eccentricities) if sample_eccentricities else 0,
+        },
+        "top_central_actors": [
+            {
+                "id": graph.node_key(node)[0],
+                "name": (actor_names or {}).get(graph.node_key(node)[0]),
+                "degree": graph.degree(node),
+                "closeness": closeness[node],
+                "eccentricity_lower_bound": max_dist[node],
+            }
+            for node in top_actors
+        ],
+        "levels": level_distances,
+        "nodes": {
+            "ids": [graph.node_key(node)[0] for node in range(graph.node_count)],
+            "types": ["actor"] * graph.actor_count + ["movie"] * graph.movie_count,
+            "component": list(component_ids),
+            "degree": actor_degrees + movie_degrees,
+            "eccentricity_lower_bound": list(max_dist),
+            "eccentricity_upper_bound": [None if bound == UNREACHED else bound for bound in upper_bound],
+            "closeness": closeness,
+        },
+    }
+
+
+def load_actor_names(db_file):
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute("SELECT id, name FROM actors").fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compute component, degree, eccentricity, and centrality statistics for the actor/movie graph."
+    )
+    parser.add_argument("--db-file", default="movies.db", help="SQLite database to analyze. Default: movies.db")
+    parser.add_argument(
+        "--output",
+        default=str(DEFAULT_OUTPUT),
+        help="Output JSON path. Defaults to dist/graph-analytics.json next to the frontend manifest.",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=DEFAULT_SAMPLE_COUNT,
+        help=f"Number of BFS sources used for eccentricity and centrality estimates. Default: {DEFAULT_SAMPLE_COUNT}",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for source sampling.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for sampled BFS. Use 1 to run in-process.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    graph = load_graph(args.db_file)
+    load_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    levels = levels_loader.load_levels() if levels_loader.LEVELS_FILE.exists() else []
+    analytics = compute_graph_analytics(
+        graph,
+        levels=levels,
+        actor_names=load_actor_names(args.db_file),
+        sample_count=args.samples,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    analytics["meta"]["timings"]["graph_load_ms"] = load_ms
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(analytics), encoding="utf-8")
+    timings = analytics["meta"]["timings"]
+    print(
+        f"Wrote graph analytics for {graph.node_count} nodes to {output_path} "
+        f"(load {load_ms} ms, analysis {timings['total_ms']} ms, {args.workers} workers)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""Persisted binary cache of the in-memory GraphIndex.
+
+Building the graph reads every movie_actors row and sorts the edges in Python,
+which dominates worker start-up as the database grows. This module saves the built
+graph next to the database as ``<db>.graphcache``. The file holds the CSR offsets and
+neighbors, the sorted actor and movie ids, the component labels, and the movie
+attribute bitsets. Loading maps the file with mmap and uses the arrays in place as
+memoryviews, so a worker only rebuilds the id lookup dicts, and workers on one
+host share the mapped pages.
+
+The header records the BLAKE2b hash of the database file the graph was built
+from, along with its (inode, size, mtime) and SQLite change counter. A matching
+stat token is trusted as is. Otherwise a different size or change counter means
+the cache is stale, and a copied or touched file is hashed and compared. When the
+hash matches, the header is restamped with the new stat token on a background
+thread, so later loads skip the hash. A graph built because the cache was missing
+or stale is written back the same way, so the request that built it does not wait
+for the write.
+
+get_graph() keeps the shared GraphIndex per database and loads it through this cache.
+It lives here rather than in graph_index, so graph_index stays free of the cache.
+
+    python graph_cache.py
+    python graph_cache.py --db-file /data/movies.db
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+
+import data_watcher
+import metrics
+from db import DB_FILE, get_content_version, get_serving_published_db
+from graph_index import GraphIndex, load_graph
+
+GRAPH_CACHE_ENABLED = os.getenv("GRAPH_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+# Empty keeps each cache next to its database.
+GRAPH_CACHE_DIR = os.getenv("GRAPH_CACHE_DIR", "").strip()
+GRAPH_CACHE_SUFFIX = ".graphcache"
+FILE_MAGIC = b"GRC1"
+FORMAT_VERSION = 1
+ARRAY_NAMES = ("actor_ids", "movie_ids", "offsets", "neighbors", "component_ids", "component_sizes")
+BITSET_NAMES = ("year", "genre", "content_rating", "language")
+HASH_CHUNK_BYTES = 1 << 20
+
+_pending_lock = threading.Lock()
+_pending_writes = {}
+_graph_lock = threading.Lock()
+_graph_cache = {}
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+def _source_file(db_file=None):
+    """The file reads of db_file actually open: the current published copy or db_file itself."""
+    published = get_serving_published_db(db_file)
+    return Path(published["path"] if published else (db_file or DB_FILE))
+
+
+def cache_path(db_file=None):
+    source = _source_file(db_file)
+    if not GRAPH_CACHE_DIR:
+        return source.with_name(source.name + GRAPH_CACHE_SUFFIX)
+    # One shared directory can hold caches for databases with the same name.
+    digest = hashlib.blake2b(str(source.resolve()).encode("utf-8"), digest_size=4).hexdigest()
+    return Path(GRAPH_CACHE_DIR) / f"{source.name}-{digest}{GRAPH_CACHE_SUFFIX}"
+
+
+def content_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as source:
+        while chunk := source.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def change_counter(path):
+    """SQLite's file change counter, bumped by every committed write outside WAL mode, or None."""
+    with open(path, "rb") as source:
+        header = source.read(28)
+    return struct.unpack(">I", header[24:28])[0] if len(header) == 28 else None
+
+
+def _file_token(stat):
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def fresh_source_token(header, source):
+    """
+    The current stat token of source when the cache header was built from its current
+    contents, otherwise None. It differs from the header's token only after a hash match.
+    """
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    current = _file_token(stat)
+    token = header.get("source_token")
+    if token == current:
+        return current
+    if token is None or token[1] != stat.st_size or header.get("change_counter") != change_counter(source):
+        return None
+    return current if header.get("content_hash") == content_hash(source) else None
+
+
+def _write_cache_file(output_path, header, chunks):
+    """Atomically writes header and the (offset, bytes) data chunks, so readers see the old file or the new one."""
+    encoded = json.dumps(header).encode("utf-8")
+    data_start = _align(8 + len(encoded))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, "wb") as output:
+            output.write(FILE_MAGIC)
+            output.write(struct.pack("<I", len(encoded)))
+            output.write(encoded)
+            # Arrays start on 8-byte boundaries so they can be cast in place.
+            for position, data in chunks:
+                output.write(b"\0" * (data_start + position - output.tell()))
+                output.write(data)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def save_graph_cache(graph, db_file=None, path=None):
+    """
+    Writes graph to its cache file and returns the path, or None when the database
+    changed after the graph was built. The file is replaced atomically, so readers
+    see the old cache or the new one.
+    """
+    source = _source_file(db_file)
+    if get_content_version(db_file) != graph.version:
+        return None
+    stat = os.stat(source)
+    digest = content_hash(source)
+    counter = change_counter(source)
+    # Hashing takes a while on a large database; a write during it makes the hash unusable.
+    if get_content_version(db_file) != graph.version:
+        return None
+
+    arrays = {
+        "actor_ids": graph.actor_ids,
+        "movie_ids": graph.movie_ids,
+        "offsets": graph.offsets,
+        "neighbors": graph.neighbors,
+        "component_ids": graph.component_ids,
+        "component_sizes": array("q", graph.component_sizes),
+    }
+    sections = {}
+    chunks = []
+    position = 0
+    for name in ARRAY_NAMES:
+        values = memoryview(arrays[name])
+        data = values.tobytes()
+        sections[name] = [position, len(values), values.format, values.itemsize]
+        chunks.append((position, data))
+        position = _align(position + len(data))
+    bitsets = {}
+    for name in BITSET_NAMES:
+        entries = []
+        for key, bits in getattr(graph, f"{name}_bits").items():
+            data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+            entries.append([key, position, len(data)])
+            chunks.append((position, data))
+            position += len(data)
+        bitsets[name] = entries
+
+    header = {
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "source": str(source),
+        "source_token": _file_token(stat),
+        "change_counter": counter,
+        "content_hash": digest,
+        "fingerprint": graph.fingerprint(),
+        "arrays": sections,
+        "bitsets": bitsets,
+    }
+    output_path = Path(path or cache_path(db_file))
+    _write_cache_file(output_path, header, chunks)
+    return output_path
+
+
+def restamp_graph_cache(path, source, token):
+    """
+    Rewrites the header of the cache file at path with source's stat token, copying the
+    data unchanged, so the next load trusts the token instead of hashing. Does nothing
+    when source has changed since token was taken. Returns whether it wrote.
+    """
+    path = Path(path)
+    with open(path, "rb") as cache:
+        (header_length,) = struct.unpack("<I", cache.read(8)[4:8])
+        header = json.loads(cache.read(header_length))
+        cache.seek(_align(8 + header_length))
+        data = cache.read()
+    if _file_token(os.stat(source)) != token:
+        return False
+    header["source_token"] = token
+    _write_cache_file(path, header, [(0, data)])
+    return True
+
+
+def load_graph_cache(db_file=None, version=None, path=None):
+    """
+    Maps the cache file for db_file and returns its GraphIndex, tagged with version,
+    or None when the file is missing, malformed, or built from other database contents.
+    """
+    path = path or cache_path(db_file)
+    try:
+        source = open(path, "rb")
+    except OSError:
+        return None
+    with source:
+        prefix = source.read(8)
+        if len(prefix) < 8 or prefix[:4] != FILE_MAGIC:
+            return None
+        (header_length,) = struct.unpack("<I", prefix[4:8])
+        try:
+            header = json.loads(source.read(header_length))
+        except ValueError:
+            return None
+        if header.get("format") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            return None
+        source_file = _source_file(db_file)
+        token = fresh_source_token(header, source_file)
+        if token is None:
+            return None
+        try:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+
+    view = memoryview(mapped)
+    data_start = _align(8 + header_length)
+    arrays = {}
+    for name in ARRAY_NAMES:
+        offset, count, typecode, itemsize = header["arrays"][name]
+        start = data_start + offset
+        end = start + count * itemsize
+        if struct.calcsize(typecode) != itemsize or end > len(view):
+            return None
+        arrays[name] = view[start:end].cast(typecode)
+    bitsets = {}
+    for name in BITSET_NAMES:
+        values = {}
+        for key, offset, length in header["bitsets"][name]:
+            start = data_start + offset
+            values[key] = int.from_bytes(view[start : start + length], "little")
+        bitsets[name] = values
+
+    graph = GraphIndex.from_arrays(
+        arrays["actor_ids"],
+        arrays["movie_ids"],
+        arrays["offsets"],
+        arrays["neighbors"],
+        arrays["component_ids"],
+        list(arrays["component_sizes"]),
+        bitsets,
+        version=version,
+    )
+    graph._fingerprint = header["fingerprint"]
+    if token != header.get("source_token"):
+        _write_in_background((str(path), tuple(token)), lambda: restamp_graph_cache(path, source_file, token))
+    return graph
+
+
+def _write_in_background(key, write):
+    """Runs write() on a thread unless a write under key is already running. Returns the thread or None."""
+
+    def run():
+        try:
+            write()
+        except Exception as exc:
+            print(f"Could not write the graph cache {key[0]}: {exc}", file=sys.stderr)
+        finally:
+            with _pending_lock:
+                _pending_writes.pop(key, None)
+
+    with _pending_lock:
+        if key in _pending_writes:
+            return None
+        # Not a daemon, so a short-lived script still finishes its write before exiting.
+        thread = _pending_writes[key] = threading.Thread(target=run, name="graph-cache-writer")
+    thread.start()
+    return thread
+
+
+def save_graph_cache_in_background(graph, db_file=None):
+    """Starts a thread that writes graph's cache file, unless one is already writing it. Returns the thread or None."""
+    return _write_in_background((str(cache_path(db_file)), graph.version), lambda: save_graph_cache(graph, db_file))
+
+
+def wait_for_background_writes():
+    with _pending_lock:
+        threads = list(_pending_writes.values())
+    for thread in threads:
+        thread.join()
+
+
+def load_or_build_graph(db_file=None, version=None):
+    """
+    The graph for db_file from its cache file when that is fresh, otherwise built from
+    SQL with the cache rewritten in the background. Used by get_graph.
+    """
+    if not GRAPH_CACHE_ENABLED or version is None:
+        return load_graph(db_file)
+    graph = load_graph_cache(db_file, version)
+    if graph is not None:
+        metrics.increment("graph_cache_loads_total")
+        return graph
+    metrics.increment("graph_builds_total")
+    graph = load_graph(db_file)
+    save_graph_cache_in_background(graph, db_file)
+    return graph
+
+
+def get_graph(db_file=None):
+    """
+    Returns the shared GraphIndex for db_file, reloading it when the database
+    content version changes. Callers keep whatever graph they were handed, so a
+    rebuild never changes the graph underneath an in-flight search, and every call
+    within one API request returns the same graph. A fresh cache file is mapped
+    instead of rebuilding from SQL.
+    """
+    db_file = db_file or DB_FILE
+    return data_watcher.pinned(("graph", db_file), lambda: _current_graph(db_file))
+
+
+def _current_graph(db_file):
+    version = get_content_version(db_file)
+    graph = _graph_cache.get(db_file)
+    if graph is not None and graph.version == version:
+        return graph
+
+    with _graph_lock:
+        graph = _graph_cache.get(db_file)
+        if graph is None or graph.version != version:
+            graph = load_or_build_graph(db_file, version)
+            _graph_cache[db_file] = graph
+    return graph
+
+
+def clear_graph_cache():
+    with _graph_lock:
+        _graph_cache.clear()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Build the binary graph cache for a database and compare cold and warm load times."
+    )
+    parser.add_argument("--db-file", default=DB_FILE, help=f"SQLite database. Default: {DB_FILE}")
+    parser.add_argument("--output", help="Cache file. Default: next to the database, or under GRAPH_CACHE_DIR.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    graph = load_graph(args.db_file)
+    built_ms = (time.perf_counter() - started) * 1000
+    path = save_graph_cache(graph, args.db_file, args.output)
+    if path is None:
+        print(f"{args.db_file} changed while the graph was built; run again.", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    cached = load_graph_cache(args.db_file, graph.version, path)
+    loaded_ms = (time.perf_counter() - started) * 1000
+    if cached is None or cached.fingerprint() != graph.fingerprint():
+        print(f"Could not load {path} back.", file=sys.stderr)
+        return 1
+    print(
+        f"Wrote {path} ({path.stat().st_size} bytes, {graph.node_count} nodes, {graph.edge_count} edges). "
+        f"Build from SQL {built_ms:.2f} ms, load from cache {loaded_ms:.2f} ms."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,284 @@
+import bisect
+import json
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+from db import connect, get_content_version
+
+DB_FILE = "movies.db"
+MOVIE_MASK_CACHE_SIZE = 256
+
+
+class GraphIndex:
+    """
+    Immutable in-memory actor/movie graph in compressed sparse row (CSR) form.
+
+    Every actor and movie gets a dense integer index: actors occupy
+    0..actor_count-1 (sorted by id) and movies occupy actor_count..node_count-1
+    (sorted by id). The neighbors of node i are
+    neighbors[offsets[i]:offsets[i + 1]], sorted ascending.
+
+    Connected components are labeled at build time: component_ids[i] is the
+    component number of node i and component_sizes[c] its node count.
+
+    Movie attributes (release year, genres, content rating, original language) are
+    precomputed as bitsets over movie offsets (movie index - actor_count), stored
+    as Python ints so filter combinations are a handful of big-int AND/OR operations.
+    """
+
+    def __init__(self, actor_ids, movie_ids, links, version=None, movie_attributes=None):
+        self.version = version
+        self._fingerprint = None
+        self.actor_ids = array("q", sorted(actor_ids))
+        self.movie_ids = array("q", sorted(movie_ids))
+        self._index_nodes()
+
+        edges = []
+        for movie_id, actor_id in links:
+            actor_index = self._actor_index.get(actor_id)
+            movie_index = self._movie_index.get(movie_id)
+            if actor_index is None or movie_index is None:
+                continue
+            edges.append((actor_index, movie_index))
+        edges = sorted(set(edges))
+        self.edge_count = len(edges)
+
+        degrees = [0] * self.node_count
+        for actor_index, movie_index in edges:
+            degrees[actor_index] += 1
+            degrees[movie_index] += 1
+
+        offsets = array("q", [0]) * (self.node_count + 1)
+        running = 0
+        for index, degree in enumerate(degrees):
+            offsets[index] = running
+            running += degree
+        offsets[self.node_count] = running
+
+        neighbors = array("i", [0]) * running
+        cursor = list(offsets[: self.node_count])
+        # Edges are sorted by (actor, movie), so actor rows fill in ascending movie order
+        # and movie rows fill in ascending actor order.
+        for actor_index, movie_index in edges:
+            neighbors[cursor[actor_index]] = movie_index
+            cursor[actor_index] += 1
+            neighbors[cursor[movie_index]] = actor_index
+            cursor[movie_index] += 1
+
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self._neighbor_view = memoryview(neighbors)
+        self.component_ids, self.component_sizes = label_components(offsets, neighbors)
+        self._build_movie_bitsets(movie_attributes or {})
+
+    @classmethod
+    def from_arrays(cls, actor_ids, movie_ids, offsets, neighbors, component_ids, component_sizes, bitsets, version=None):
+        """
+        Reassembles a graph from arrays saved by graph_cache without rebuilding it.
+        The arrays are used as given, so they may be memoryviews over a mapped file.
+        bitsets maps "year", "genre", "content_rating" and "language" to their dicts.
+        """
+        graph = cls.__new__(cls)
+        graph.version = version
+        graph._fingerprint = None
+        graph.actor_ids = actor_ids
+        graph.movie_ids = movie_ids
+        graph._index_nodes()
+        graph.edge_count = offsets[graph.node_count] // 2
+        graph.offsets = offsets
+        graph.neighbors = neighbors
+        graph._neighbor_view = memoryview(neighbors)
+        graph.component_ids = component_ids
+        graph.component_sizes = component_sizes
+        graph._set_movie_bitsets(bitsets["year"], bitsets["genre"], bitsets["content_rating"], bitsets["language"])
+        return graph
+
+    def _index_nodes(self):
+        self.actor_count = len(self.actor_ids)
+        self.movie_count = len(self.movie_ids)
+        self.node_count = self.actor_count + self.movie_count
+        self._actor_index = {actor_id: index for index, actor_id in enumerate(self.actor_ids)}
+        self._movie_index = {
+            movie_id: self.actor_count + index for index, movie_id in enumerate(self.movie_ids)
+        }
+
+    def _set_movie_bitsets(self, year_bits, genre_bits, content_rating_bits, language_bits):
+        self.all_movies_mask = (1 << self.movie_count) - 1
+        self.year_bits = year_bits
+        self.genre_bits = genre_bits
+        self.content_rating_bits = content_rating_bits
+        self.language_bits = language_bits
+        self._movie_mask_cache = OrderedDict()
+        self._mask_lock = threading.Lock()
+
+    def _build_movie_bitsets(self, movie_attributes):
+        self._set_movie_bitsets({}, {}, {}, {})
+        for offset, movie_id in enumerate(self.movie_ids):
+            release_date, genres_json, content_rating, original_language = movie_attributes.get(
+                movie_id, (None, None, None, None)
+            )
+            bit = 1 << offset
+            year = _parse_release_year(release_date)
+            if year is not None:
+                self.year_bits[year] = self.year_bits.get(year, 0) | bit
+            for genre in _parse_genres(genres_json):
+                key = genre.casefold()
+                self.genre_bits[key] = self.genre_bits.get(key, 0) | bit
+            if content_rating:
+                key = content_rating.casefold()
+                self.content_rating_bits[key] = self.content_rating_bits.get(key, 0) | bit
+            if original_language:
+                key = original_language.casefold()
+                self.language_bits[key] = self.language_bits.get(key, 0) | bit
+
+    def movie_mask(self, min_year=None, max_year=None, genres=(), content_ratings=(), languages=()):
+        """
+        Returns the bitset of movies matching every given filter. Each list filter
+        matches any of its values; a year bound excludes movies with no release date.
+        Masks are memoized per filter combination.
+        """
+        key = (
+            min_year,
+            max_year,
+            tuple(sorted(value.casefold() for value in genres)),
+            tuple(sorted(value.casefold() for value in content_ratings)),
+            tuple(sorted(value.casefold() for value in languages)),
+        )
+        with self._mask_lock:
+            mask = self._movie_mask_cache.get(key)
+            if mask is not None:
+                self._movie_mask_cache.move_to_end(key)
+                return mask
+
+        mask = self.all_movies_mask
+        if min_year is not None or max_year is not None:
+            year_mask = 0
+            for year, bits in self.year_bits.items():
+                if (min_year is None or year >= min_year) and (max_year is None or year <= max_year):
+                    year_mask |= bits
+            mask &= year_mask
+        for values, bitsets in (
+            (key[2], self.genre_bits),
+            (key[3], self.content_rating_bits),
+            (key[4], self.language_bits),
+        ):
+            if values:
+                value_mask = 0
+                for value in values:
+                    value_mask |= bitsets.get(value, 0)
+                mask &= value_mask
+
+        with self._mask_lock:
+            self._movie_mask_cache[key] = mask
+            while len(self._movie_mask_cache) > MOVIE_MASK_CACHE_SIZE:
+                self._movie_mask_cache.popitem(last=False)
+        return mask
+
+    def movie_mask_bytes(self, mask):
+        """Little-endian byte view of a movie mask for O(1) per-movie membership checks."""
+        return mask.to_bytes((self.movie_count + 7) // 8 or 1, "little")
+
+    def movie_allowed(self, movie_bits, index):
+        offset = index - self.actor_count
+        return (movie_bits[offset >> 3] >> (offset & 7)) & 1 == 1
+
+    def node_index(self, node_id, node_type):
+        if node_type == "actor":
+            return self._actor_index.get(node_id)
+        return self._movie_index.get(node_id)
+
+    def node_type(self, index):
+        return "actor" if index < self.actor_count else "movie"
+
+    def node_key(self, index):
+        if index < self.actor_count:
+            return (self.actor_ids[index], "actor")
+        return (self.movie_ids[index - self.actor_count], "movie")
+
+    def neighbors_of(self, index):
+        return self._neighbor_view[self.offsets[index] : self.offsets[index + 1]]
+
+    def degree(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def has_edge(self, index_a, index_b):
+        """Adjacency check by bisecting the smaller of the two sorted neighbor rows."""
+        if self.degree(index_b) < self.degree(index_a):
+            index_a, index_b = index_b, index_a
+        start = self.offsets[index_a]
+        stop = self.offsets[index_a + 1]
+        position = bisect.bisect_left(self.neighbors, index_b, start, stop)
+        return position < stop and self.neighbors[position] == index_b
+
+    def fingerprint(self):
+        """Content hash of the node ids and adjacency, stable across processes and machines."""
+        if self._fingerprint is None:
+            checksum = 0
+            for values in (self.actor_ids, self.movie_ids, self.offsets, self.neighbors):
+                checksum = zlib.crc32(values.tobytes(), checksum)
+            self._fingerprint = f"{self.node_count}:{self.edge_count}:{checksum:08x}"
+        return self._fingerprint
+
+
+def label_components(offsets, neighbors):
+    """Returns (component_ids, component_sizes) with components numbered by discovery order."""
+    node_count = len(offsets) - 1
+    component_ids = array("i", [-1]) * node_count
+    sizes = []
+    for start in range(node_count):
+        if component_ids[start] != -1:
+            continue
+        component = len(sizes)
+        component_ids[start] = component
+        stack = [start]
+        size = 0
+        while stack:
+            node = stack.pop()
+            size += 1
+            for neighbor in neighbors[offsets[node] : offsets[node + 1]]:
+                if component_ids[neighbor] == -1:
+                    component_ids[neighbor] = component
+                    stack.append(neighbor)
+        sizes.append(size)
+    return component_ids, sizes
+
+
+def _parse_release_year(release_date):
+    if not release_date or len(release_date) < 4 or not release_date[:4].isdigit():
+        return None
+    return int(release_date[:4])
+
+
+def _parse_genres(genres_json):
+    if not genres_json:
+        return []
+    try:
+        genres = json.loads(genres_json)
+    except json.JSONDecodeError:
+        return []
+    return [genre for genre in genres if isinstance(genre, str) and genre]
+
+
+def load_graph(db_file=None):
+    db_file = db_file or DB_FILE
+    version = get_content_version(db_file)
+    conn = connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM actors")
+    actor_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT id, release_date, genres_json, content_rating, original_language FROM movies"
+    )
+    movie_attributes = {row[0]: row[1:] for row in cursor.fetchall()}
+    cursor.execute("SELECT movie_id, actor_id FROM movie_actors")
+    links = cursor.fetchall()
+    conn.close()
+    return GraphIndex(
+        actor_ids,
+        list(movie_attributes),
+        links,
+        version=version,
+        movie_attributes=movie_attributes,
+    )
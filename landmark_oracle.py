@@ -0,0 +1,300 @@
+"""Landmark (ALT) distance oracle for the actor/movie graph.
+
+A handful of high-degree landmark nodes each store their BFS distance to every
+node as one byte. By the triangle inequality, for any landmark L:
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(s, L) + d(L, t)
+
+so K landmarks bound any distance in O(K) without searching. The same lower
+bounds prune bidirectional BFS: a node whose depth plus its lower bound to the
+goal exceeds the best known upper bound cannot lie on a shortest path.
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from array import array
+from pathlib import Path
+
+import metrics
+from graph_index import load_graph
+
+
+ROOT = Path(__file__).resolve().parent
+LANDMARK_FILE = os.getenv("LANDMARK_ORACLE_FILE", str(ROOT / "dist" / "landmarks.bin"))
+DEFAULT_LANDMARK_COUNT = 16
+# Landmarks closer than this many steps to an existing landmark add little information.
+LANDMARK_MIN_SEPARATION = 3
+UNREACHED = 255
+MAX_STORED_DISTANCE = UNREACHED - 1
+FILE_MAGIC = b"LMK1"
+
+_oracle_lock = threading.Lock()
+_oracle_cache = {}
+
+
+class LandmarkOracle:
+    """
+    Per-landmark uint8 distance arrays indexed by GraphIndex node index.
+    UNREACHED marks nodes outside the landmark's component; distances at or above
+    MAX_STORED_DISTANCE are saturated and ignored when bounding.
+    """
+
+    def __init__(self, fingerprint, landmarks, distances):
+        self.fingerprint = fingerprint
+        self.landmarks = list(landmarks)
+        self.distances = list(distances)
+
+    def profile(self, index):
+        return [distances[index] for distances in self.distances]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) step bounds between two node indices, with upper None
+        when no landmark reaches both. Returns None when a landmark proves the nodes
+        lie in different components.
+        """
+        if source == target:
+            return (0, 0)
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            source_distance = distances[source]
+            target_distance = distances[target]
+            if source_distance == UNREACHED and target_distance == UNREACHED:
+                continue
+            if source_distance == UNREACHED or target_distance == UNREACHED:
+                return None
+            if source_distance == MAX_STORED_DISTANCE or target_distance == MAX_STORED_DISTANCE:
+                continue
+            gap = abs(source_distance - target_distance)
+            if gap > lower:
+                lower = gap
+            through = source_distance + target_distance
+            if upper is None or through < upper:
+                upper = through
+        return lower, upper
+
+    def lower_bound_to(self, goal_profile, index):
+        lower = 0
+        for distances, goal_distance in zip(self.distances, goal_profile):
+            distance = distances[index]
+            if distance >= MAX_STORED_DISTANCE or goal_distance >= MAX_STORED_DISTANCE:
+                continue
+            gap = distance - goal_distance if distance > goal_distance else goal_distance - distance
+            if gap > lower:
+                lower = gap
+        return lower
+
+
+def landmark_distances(graph, source):
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    distances = array("B", [UNREACHED]) * graph.node_count
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth = min(depth + 1, MAX_STORED_DISTANCE)
+        next_frontier = []
+        for node in frontier:
+            for neighbor in neighbors[offsets[node] : offsets[node + 1]]:
+                if distances[neighbor] == UNREACHED:
+                    distances[neighbor] = depth
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances
+
+
+def build_landmark_oracle(graph, count=DEFAULT_LANDMARK_COUNT, min_separation=LANDMARK_MIN_SEPARATION):
+    """Picks up to ``count`` high-degree landmarks at least ``min_separation`` steps apart."""
+    candidates = sorted(range(graph.node_count), key=lambda index: (-graph.degree(index), index))
+    landmarks = []
+    distances = []
+    for candidate in candidates:
+        if len(landmarks) >= count or graph.degree(candidate) == 0:
+            break
+        if any(existing[candidate] < min_separation for existing in distances):
+            continue
+        landmarks.append(candidate)
+        distances.append(landmark_distances(graph, candidate))
+    return LandmarkOracle(graph.fingerprint(), landmarks, distances)
+
+
+def save_landmark_oracle(oracle, path):
+    header = json.dumps(
+        {
+            "fingerprint": oracle.fingerprint,
+            "landmarks": oracle.landmarks,
+            "node_count": len(oracle.distances[0]) if oracle.distances else 0,
+        }
+    ).encode("utf-8")
+    output_path = Path(path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as output:
+        output.write(FILE_MAGIC)
+        output.write(struct.pack("<I", len(header)))
+        output.write(header)
+        for distances in oracle.distances:
+            output.write(distances.tobytes())
+
+
+def load_landmark_oracle(path, fingerprint=None):
+    """Loads an oracle file, or returns None when it is missing, malformed, or built for another graph."""
+    try:
+        with open(path, "rb") as source:
+            data = source.read()
+    except OSError:
+        return None
+    if data[:4] != FILE_MAGIC or len(data) < 8:
+        return None
+    (header_length,) = struct.unpack("<I", data[4:8])
+    try:
+        header = json.loads(data[8 : 8 + header_length])
+    except ValueError:
+        return None
+    if fingerprint is not None and header.get("fingerprint") != fingerprint:
+        return None
+
+    node_count = header["node_count"]
+    body = data[8 + header_length :]
+    if len(body) != node_count * len(header["landmarks"]):
+        return None
+    distances = []
+    for position in range(len(header["landmarks"])):
+        distances.append(array("B", body[position * node_count : (position + 1) * node_count]))
+    return LandmarkOracle(header["fingerprint"], header["landmarks"], distances)
+
+
+def get_landmark_oracle(graph, path=None):
+    """
+    Returns the offline-built oracle for this graph, or None when no matching file
+    exists. Lookups are cached per graph fingerprint and file modification time.
+    """
+    path = path or LANDMARK_FILE
+    try:
+        file_version = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    key = (path, graph.fingerprint(), file_version)
+    if key in _oracle_cache:
+        return _oracle_cache[key]
+    with _oracle_lock:
+        if key not in _oracle_cache:
+            _oracle_cache.clear()
+            _oracle_cache[key] = load_landmark_oracle(path, fingerprint=key[1])
+        return _oracle_cache[key]
+
+
+def clear_landmark_oracle_cache():
+    with _oracle_lock:
+        _oracle_cache.clear()
+
+
+def _join_paths(forward, backward, meeting):
+    path = []
+    node = meeting
+    while node != -1:
+        path.append(node)
+        node = forward[node]
+    path.reverse()
+    node = backward[meeting]
+    while node != -1:
+        path.append(node)
+        node = backward[node]
+    return path
+
+
+def alt_bidirectional_search(graph, oracle, source, target, budget=None, hub_aware=False):
+    """
+    Shortest index path from source to target, or None when unreachable.
+    Expands the smaller frontier one level at a time and skips any node whose depth
+    plus its landmark lower bound to the far endpoint exceeds the landmark upper bound.
+    hub_aware measures frontiers by their total degree instead of their node count.
+    budget (a path_utils.SearchBudget) is charged for each level before it is expanded.
+    """
+    if source == target:
+        return [source]
+    bounds = oracle.bounds(source, target)
+    if bounds is None:
+        return None
+    upper = bounds[1]
+
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    sides = [
+        {"parents": {source: -1}, "depths": {source: 0}, "frontier": [source], "depth": 0, "goal": oracle.profile(target)},
+        {"parents": {target: -1}, "depths": {target: 0}, "frontier": [target], "depth": 0, "goal": oracle.profile(source)},
+    ]
+    for side in sides:
+        node = side["frontier"][0]
+        side["degree"] = offsets[node + 1] - offsets[node]
+    while sides[0]["frontier"] and sides[1]["frontier"]:
+        if hub_aware:
+            expand = 0 if sides[0]["degree"] <= sides[1]["degree"] else 1
+        else:
+            expand = 0 if len(sides[0]["frontier"]) <= len(sides[1]["frontier"]) else 1
+        side = sides[expand]
+        other = sides[1 - expand]
+        parents = side["parents"]
+        depths = side["depths"]
+        other_depths = other["depths"]
+        goal = side["goal"]
+        depth = side["depth"] + 1
+        best_total = None
+        best_meeting = None
+        next_frontier = []
+        next_degree = 0
+        if budget is not None:
+            budget.charge(len(side["frontier"]))
+        metrics.increment("bfs_nodes_expanded_total", len(side["frontier"]))
+        for node in side["frontier"]:
+            for neighbor in neighbors[offsets[node] : offsets[node + 1]]:
+                if neighbor in parents:
+                    continue
+                if upper is not None and depth + oracle.lower_bound_to(goal, neighbor) > upper:
+                    continue
+                parents[neighbor] = node
+                depths[neighbor] = depth
+                other_depth = other_depths.get(neighbor)
+                if other_depth is not None and (best_total is None or depth + other_depth < best_total):
+                    best_total = depth + other_depth
+                    best_meeting = neighbor
+                next_frontier.append(neighbor)
+                next_degree += offsets[neighbor + 1] - offsets[neighbor]
+        side["frontier"] = next_frontier
+        side["degree"] = next_degree
+        side["depth"] = depth
+        if best_meeting is not None:
+            return _join_paths(sides[0]["parents"], sides[1]["parents"], best_meeting)
+    return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the landmark distance oracle used for bounded path hints.")
+    parser.add_argument("--db-file", default="movies.db", help="SQLite database to index. Default: movies.db")
+    parser.add_argument("--output", default=LANDMARK_FILE, help="Output oracle path. Default: dist/landmarks.bin")
+    parser.add_argument(
+        "--landmarks",
+        type=int,
+        default=DEFAULT_LANDMARK_COUNT,
+        help=f"Number of landmarks. Default: {DEFAULT_LANDMARK_COUNT}",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    graph = load_graph(args.db_file)
+    oracle = build_landmark_oracle(graph, count=args.landmarks)
+    save_landmark_oracle(oracle, args.output)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    print(f"Wrote {len(oracle.landmarks)} landmarks for {graph.node_count} nodes to {args.output} ({elapsed_ms} ms)")
+
+
+if __name__ == "__main__":
+    main()
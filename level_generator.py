@@ -0,0 +1,292 @@
+"""Generate candidate game levels from the actor/movie graph.
+
+Pairs come from one depth-limited BFS per sampled source actor: every playable
+actor the BFS reaches inside the distance window becomes a candidate, in shuffled
+order, without running ``generate_typed_path`` per pair. ``pairs_per_source``
+optionally caps how many of them each source contributes, so levels spread
+across more source actors. Each candidate is scored from its actor distance, the
+number of shortest paths, and the branching factor along a shortest path, then
+mapped to ``stars``.
+"""
+
+import argparse
+import json
+import math
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import levels_loader
+from frontend_snapshot import _normalize_actor_name, _validate_levels_against_actor_rows
+from graph_index import load_graph
+
+
+POPULARITY_BANDS = ("star", "known", "deep_cut")
+# Upper percentile bounds (by descending popularity) for each band in POPULARITY_BANDS.
+POPULARITY_BAND_PERCENTILES = (0.1, 0.4, 1.0)
+STAR_SCORE_THRESHOLDS = (2.0, 3.0, 4.0, 5.0)
+DEFAULT_SOURCE_COUNT = 200
+DEFAULT_PAIRS_PER_SOURCE = None
+
+
+def load_actor_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute("SELECT id, name, popularity FROM actors").fetchall()
+    conn.close()
+    return rows
+
+
+def assign_popularity_bands(actor_rows):
+    """Maps actor id to a POPULARITY_BANDS entry using popularity percentiles."""
+    ranked = sorted(actor_rows, key=lambda row: (-(row[2] or 0.0), row[0]))
+    total = len(ranked)
+    bands = {}
+    for position, row in enumerate(ranked):
+        percentile = (position + 1) / total
+        for band, upper in zip(POPULARITY_BANDS, POPULARITY_BAND_PERCENTILES):
+            if percentile <= upper:
+                bands[row[0]] = band
+                break
+    return bands
+
+
+def score_difficulty(actor_hops, path_count, branching):
+    """Higher scores are harder: longer chains, fewer routes, and more distracting neighbors."""
+    rarity = 1.0 / (1.0 + math.log2(max(path_count, 1)))
+    distraction = min(1.0, math.log10(max(branching, 1.0)) / 2.0)
+    return actor_hops + rarity + distraction
+
+
+def stars_for_score(score):
+    return 1 + sum(1 for threshold in STAR_SCORE_THRESHOLDS if score >= threshold)
+
+
+def _search_from_source(graph, source, max_steps):
+    """Depth-limited BFS returning dist, shortest-path counts, and summed degree along one shortest path."""
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    dist = {source: 0}
+    sigma = {source: 1}
+    degree_sum = {source: 0}
+    frontier = [source]
+    depth = 0
+    while frontier and depth < max_steps:
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            node_degree_sum = degree_sum[node]
+            for neighbor in neighbors[offsets[node] : offsets[node + 1]]:
+                neighbor_depth = dist.get(neighbor)
+                if neighbor_depth is None:
+                    dist[neighbor] = depth
+                    sigma[neighbor] = sigma[node]
+                    degree_sum[neighbor] = node_degree_sum + offsets[neighbor + 1] - offsets[neighbor]
+                    next_frontier.append(neighbor)
+                elif neighbor_depth == depth:
+                    sigma[neighbor] += sigma[node]
+        frontier = next_frontier
+    return dist, sigma, degree_sum
+
+
+def iter_candidate_pairs(
+    graph,
+    actor_rows,
+    min_hops=2,
+    max_hops=4,
+    band_a=None,
+    band_b=None,
+    source_count=DEFAULT_SOURCE_COUNT,
+    pairs_per_source=DEFAULT_PAIRS_PER_SOURCE,
+    seed=0,
+):
+    """Yields a scored candidate for every window target of each sampled source's BFS."""
+    bands = assign_popularity_bands(actor_rows)
+    name_counts = {}
+    for row in actor_rows:
+        if isinstance(row[1], str) and row[1].strip():
+            key = _normalize_actor_name(row[1])
+            name_counts[key] = name_counts.get(key, 0) + 1
+
+    # Ambiguous names cannot round-trip through levels.json, so they never become endpoints.
+    playable = {}
+    for actor_id, name, popularity in actor_rows:
+        if not isinstance(name, str) or not name.strip() or name_counts[_normalize_actor_name(name)] > 1:
+            continue
+        index = graph.node_index(actor_id, "actor")
+        if index is not None and graph.degree(index) > 0:
+            playable[index] = (actor_id, name, popularity, bands.get(actor_id))
+
+    sources = sorted(index for index, actor in playable.items() if band_a is None or actor[3] == band_a)
+    rng = random.Random(seed)
+    if len(sources) > source_count:
+        sources = rng.sample(sources, source_count)
+
+    seen_pairs = set()
+    for source in sources:
+        dist, sigma, degree_sum = _search_from_source(graph, source, max_hops * 2)
+        targets = [
+            index
+            for index, steps in dist.items()
+            if min_hops * 2 <= steps
+            and index in playable
+            and (band_b is None or playable[index][3] == band_b)
+        ]
+        if pairs_per_source is not None and len(targets) > pairs_per_source:
+            targets = rng.sample(targets, pairs_per_source)
+        else:
+            rng.shuffle(targets)
+
+        source_actor = playable[source]
+        for target in targets:
+            pair_key = (min(source, target), max(source, target))
+            if pair_key in seen_pairs:
+                continue
+            seen_pairs.add(pair_key)
+
+            steps = dist[target]
+            target_actor = playable[target]
+            intermediate_degree = degree_sum[target] - graph.degree(target)
+            branching = intermediate_degree / max(steps - 1, 1)
+            score = score_difficulty(steps // 2, sigma[target], branching)
+            yield {
+                "actor_a": source_actor[1],
+                "actor_b": target_actor[1],
+                "stars": stars_for_score(score),
+                "actor_hops": steps // 2,
+                "shortest_path_count": sigma[target],
+                "branching": round(branching, 2),
+                "difficulty": round(score, 3),
+                "band_a": source_actor[3],
+                "band_b": target_actor[3],
+            }
+
+
+def generate_levels(graph, actor_rows, count, stars=None, existing_levels=(), **candidate_kwargs):
+    """Returns up to ``count`` scored candidates, balanced across the requested star ratings."""
+    taken = {
+        frozenset((_normalize_actor_name(level["actor_a"]), _normalize_actor_name(level["actor_b"])))
+        for level in existing_levels
+        if isinstance(level.get("actor_a"), str) and isinstance(level.get("actor_b"), str)
+    }
+    wanted_stars = sorted(set(stars)) if stars else None
+    quota = None
+    if wanted_stars:
+        quota = {value: count // len(wanted_stars) for value in wanted_stars}
+        for value in wanted_stars[: count % len(wanted_stars)]:
+            quota[value] += 1
+
+    generated = []
+    for candidate in iter_candidate_pairs(graph, actor_rows, **candidate_kwargs):
+        pair = frozenset((_normalize_actor_name(candidate["actor_a"]), _normalize_actor_name(candidate["actor_b"])))
+        if pair in taken:
+            continue
+        if quota is not None:
+            if quota.get(candidate["stars"], 0) <= 0:
+                continue
+            quota[candidate["stars"]] -= 1
+        taken.add(pair)
+        generated.append(candidate)
+        if len(generated) >= count:
+            break
+
+    generated.sort(key=lambda candidate: (candidate["stars"], candidate["difficulty"], candidate["actor_a"]))
+    _validate_levels_against_actor_rows(generated, actor_rows)
+    return generated
+
+
+def to_level_entries(candidates):
+    return [
+        {
+            "actor_a": candidate["actor_a"],
+            "actor_b": candidate["actor_b"],
+            "stars": candidate["stars"],
+        }
+        for candidate in candidates
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate levels.json entries at target distances and popularity bands.")
+    parser.add_argument("--db-file", default="movies.db", help="SQLite database to sample from. Default: movies.db")
+    parser.add_argument("--count", type=int, default=20, help="Number of levels to generate. Default: 20")
+    parser.add_argument("--min-hops", type=int, default=2, help="Minimum actor-to-actor hops. Default: 2")
+    parser.add_argument("--max-hops", type=int, default=4, help="Maximum actor-to-actor hops. Default: 4")
+    parser.add_argument(
+        "--stars",
+        type=int,
+        action="append",
+        choices=range(1, 6),
+        help="Star rating to target. Repeat to balance across several ratings.",
+    )
+    parser.add_argument("--band-a", choices=POPULARITY_BANDS, help="Popularity band for actor_a.")
+    parser.add_argument("--band-b", choices=POPULARITY_BANDS, help="Popularity band for actor_b.")
+    parser.add_argument(
+        "--sources",
+        type=int,
+        default=DEFAULT_SOURCE_COUNT,
+        help=f"Source actors to BFS from. Default: {DEFAULT_SOURCE_COUNT}",
+    )
+    parser.add_argument(
+        "--pairs-per-source",
+        type=int,
+        default=DEFAULT_PAIRS_PER_SOURCE,
+        help="Maximum candidates kept per source, to spread levels across more source actors. Default: no cap",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for source and target sampling.")
+    parser.add_argument(
+        "--include-existing",
+        action="store_true",
+        help="Allow pairs that already appear in levels.json.",
+    )
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="Emit difficulty details (hops, path count, branching, bands) alongside each level.",
+    )
+    parser.add_argument("--output", help="Write JSON here instead of stdout.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.min_hops < 1 or args.max_hops < args.min_hops:
+        print("--min-hops must be at least 1 and no greater than --max-hops.", file=sys.stderr)
+        sys.exit(2)
+
+    started = time.perf_counter()
+    graph = load_graph(args.db_file)
+    actor_rows = load_actor_rows(args.db_file)
+    existing_levels = []
+    if not args.include_existing and levels_loader.LEVELS_FILE.exists():
+        existing_levels = levels_loader.load_levels()
+
+    candidates = generate_levels(
+        graph,
+        actor_rows,
+        args.count,
+        stars=args.stars,
+        existing_levels=existing_levels,
+        min_hops=args.min_hops,
+        max_hops=args.max_hops,
+        band_a=args.band_a,
+        band_b=args.band_b,
+        source_count=args.sources,
+        pairs_per_source=args.pairs_per_source,
+        seed=args.seed,
+    )
+    payload = json.dumps(candidates if args.details else to_level_entries(candidates), indent=2)
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    print(f"Generated {len(candidates)} levels in {elapsed_ms} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
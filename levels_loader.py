@@ -0,0 +1,23 @@
+"""Load the predefined challenge levels.
+
+Scripts such as export_frontend_snapshot.py and bench_suite.py read levels from
+here instead of importing the API. LEVELS_FILE defaults to the levels.json next to
+this module, so the result does not depend on the working directory.
+"""
+
+import json
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+LEVELS_FILE = Path(os.getenv("LEVELS_FILE") or ROOT / "levels.json")
+
+
+def load_levels(path=None):
+    """Reads the levels list from path, LEVELS_FILE by default."""
+    path = path or LEVELS_FILE
+    with open(path, "r", encoding="utf-8") as f:
+        levels = json.load(f)
+    if not isinstance(levels, list):
+        raise ValueError(f"{path} must contain a list of levels")
+    return levels
@@ -0,0 +1,169 @@
+"""Process-wide request metrics exported in the Prometheus text format.
+
+Counters are plain integers behind one lock. Each HTTP request also opens a
+scope (a ContextVar holding a dict), and ``increment`` adds to that dict as
+well, so the middleware can report what one request cost in its
+``Server-Timing`` header. Sync endpoints run in a worker thread with a copy of
+the request context, and that copy still points at the same dict.
+"""
+
+import os
+import threading
+from contextvars import ContextVar
+
+import db
+import query_log
+
+METRIC_PREFIX = "costars_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERVER_TIMING_ENABLED = os.getenv("METRICS_SERVER_TIMING", "").strip().lower() in ("1", "true", "yes")
+
+COUNTER_HELP = {
+    "http_requests_total": "HTTP requests by method, route template and status code.",
+    "sqlite_connections_total": "SQLite connections opened through the shared connection factory.",
+    "sqlite_queries_total": "SQL statements executed on connections from the shared connection factory.",
+    "bfs_nodes_expanded_total": "Graph nodes expanded by shortest-path searches.",
+    "path_hints_total": "Path hints computed for suggestion endpoints.",
+    "snapshot_cache_hits_total": "Frontend snapshot requests served from the cached build.",
+    "snapshot_cache_misses_total": "Frontend snapshot requests that rebuilt the snapshot.",
+    "graph_cache_loads_total": "In-memory graphs loaded from the binary graph cache.",
+    "graph_builds_total": "In-memory graphs built from SQL because the graph cache was missing or stale.",
+    "path_budget_exceeded_total": "Path searches stopped by their expanded-node or time budget.",
+    "single_flight_shared_total": "Requests answered by an identical computation already in progress.",
+    "rate_limited_total": "Requests rejected with 429 by the per-client rate limiter, by scope.",
+}
+# Per-request counters reported in Server-Timing, as (counter, Server-Timing metric name).
+SERVER_TIMING_COUNTERS = (
+    ("sqlite_queries_total", "sql"),
+    ("sqlite_connections_total", "sqlconn"),
+    ("bfs_nodes_expanded_total", "bfs"),
+    ("path_hints_total", "hints"),
+)
+
+_request_counts = ContextVar("request_counts", default=None)
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, amount=1, labels=()):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe_latency(self, method, route, seconds):
+        key = (("method", method), ("route", route))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][position] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def counter_value(self, name, labels=()):
+        with self._lock:
+            return self._counters.get((name, tuple(labels)), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges=None):
+        """
+        Prometheus text exposition. gauges: optional {name: (help, value)} sampled by
+        the caller at scrape time, e.g. cache sizes owned by other modules.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._histograms.items()}
+
+        lines = []
+        name = f"{METRIC_PREFIX}http_request_duration_seconds"
+        lines.append(f"# HELP {name} Request latency by method and route template.")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(histograms.items()):
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+        for counter, help_text in COUNTER_HELP.items():
+            name = f"{METRIC_PREFIX}{counter}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            series = sorted((labels, value) for (key, labels), value in counters.items() if key == counter)
+            for labels, value in series or [((), 0)]:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for gauge, (help_text, value) in (gauges or {}).items():
+            name = f"{METRIC_PREFIX}{gauge}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def increment(name, amount=1):
+    """Adds to a process-wide counter and to the current request's scope, if any."""
+    METRICS.increment(name, amount)
+    counts = _request_counts.get()
+    if counts is not None:
+        counts[name] = counts.get(name, 0) + amount
+
+
+def start_request():
+    return _request_counts.set({})
+
+
+def finish_request(token):
+    """Closes a request scope and returns its counter totals."""
+    counts = _request_counts.get() or {}
+    _request_counts.reset(token)
+    return counts
+
+
+def _count_statement(_statement):
+    increment("sqlite_queries_total")
+
+
+def connect(db_file, **kwargs):
+    """
+    db.connect that counts the connection and every statement it executes.
+    With query_log.QUERY_LOG_ENABLED the statements are also timed; see query_log.
+    """
+    if query_log.QUERY_LOG_ENABLED:
+        kwargs.setdefault("factory", query_log.InstrumentedConnection)
+    conn = db.connect(db_file, **kwargs)
+    increment("sqlite_connections_total")
+    conn.set_trace_callback(_count_statement)
+    return conn
+
+
+def server_timing_header(elapsed_seconds, counts):
+    entries = [f"app;dur={elapsed_seconds * 1000:.2f}"]
+    for counter, metric in SERVER_TIMING_COUNTERS:
+        if counts.get(counter):
+            entries.append(f'{metric};desc="{counts[counter]}"')
+    return ", ".join(entries)
@@ -0,0 +1,322 @@
+"""Precomputed sort orders for movie casts and actor filmographies.
+
+Each movie's cast is stored twice, once by popularity and once by name. Each
+actor's filmography is stored once by release date and once by title. The orders
+are slices of shared ``array('i')`` buffers of row positions, and every node maps
+to one (start, stop) range. A request returns a top-k slice without sorting.
+
+Writes that go through db_helper are applied incrementally. Only the touched
+nodes are re-sorted, and the new slice is appended to the shared buffers. Once
+the abandoned slices outnumber the live ones, the buffers are compacted.
+"""
+
+import threading
+from array import array
+
+import data_watcher
+from db import connect, get_content_version
+
+DB_FILE = "movies.db"
+CAST_ORDERS = ("popularity", "name")
+FILMOGRAPHY_ORDERS = ("title", "release_date")
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+_orders_lock = threading.Lock()
+_orders_cache = {}
+
+
+def nocase_key(text):
+    """Folds ASCII letters only, like sqlite's COLLATE NOCASE."""
+    return (text or "").translate(_ASCII_LOWER)
+
+
+def _popularity_key(row):
+    # The ordering of versus_game.sort_actor_rows_by_popularity, applied with reverse=True,
+    # with names folded like every other order here.
+    return (row[2] is not None, row[2] or 0.0, nocase_key(row[1]))
+
+
+def _release_date_key(row):
+    # Chronological, undated movies last.
+    return (row[2] is None, row[2] or "", nocase_key(row[1]), row[0])
+
+
+def _append_range(orders, ranges, node_id, sorted_orders):
+    start = len(next(iter(orders.values())))
+    for order, positions in sorted_orders.items():
+        orders[order].extend(positions)
+    ranges[node_id] = (start, start + len(sorted_orders[next(iter(sorted_orders))]))
+
+
+class _RangeBuffer:
+    """
+    Named orders over one node type, sharing a (start, stop) range per node.
+
+    ``layout`` is the (orders, ranges) pair. Readers take it once and never see
+    ranges from one layout applied to the buffers of another. Writers (serialized
+    by the caller) only append to the live buffers, so a range a reader already
+    holds stays valid. Compaction builds a new pair and publishes it in one swap.
+    """
+
+    def __init__(self, orders):
+        self.layout = ({order: array("i") for order in orders}, {})
+        self.dead = 0
+
+    def live(self):
+        return sum(stop - start for start, stop in self.layout[1].values())
+
+    def store(self, node_id, sorted_orders):
+        orders, ranges = self.layout
+        previous = ranges.get(node_id)
+        if previous is not None:
+            self.dead += previous[1] - previous[0]
+        _append_range(orders, ranges, node_id, sorted_orders)
+
+    def members(self, node_id):
+        orders, ranges = self.layout
+        span = ranges.get(node_id)
+        if span is None:
+            return []
+        return list(next(iter(orders.values()))[span[0] : span[1]])
+
+    def compact(self):
+        if self.dead <= self.live():
+            return
+        old_orders, old_ranges = self.layout
+        orders = {order: array("i") for order in old_orders}
+        ranges = {}
+        for node_id, (start, stop) in old_ranges.items():
+            sorted_orders = {order: positions[start:stop] for order, positions in old_orders.items()}
+            _append_range(orders, ranges, node_id, sorted_orders)
+        self.layout = (orders, ranges)
+        self.dead = 0
+
+
+class NeighborOrders:
+    """
+    Ordered casts and filmographies over shared row tables. ``actor_rows`` holds
+    (id, name, popularity) and ``movie_rows`` holds (id, title, release_date), so
+    a slice returns rows in exactly the shape db_helper's SQL used to return.
+    """
+
+    def __init__(self, actor_rows, movie_rows, links, version=None):
+        self.version = version
+        self.actor_rows = []
+        self.movie_rows = []
+        self._actor_position = {}
+        self._movie_position = {}
+        for row in actor_rows:
+            self._put_actor_row(tuple(row))
+        for row in movie_rows:
+            self._put_movie_row(tuple(row))
+
+        cast = {}
+        filmography = {}
+        for movie_id, actor_id in set(links):
+            actor = self._actor_position.get(actor_id)
+            movie = self._movie_position.get(movie_id)
+            if actor is None or movie is None:
+                continue
+            cast.setdefault(movie_id, []).append(actor)
+            filmography.setdefault(actor_id, []).append(movie)
+
+        self.casts = _RangeBuffer(CAST_ORDERS)
+        self.filmographies = _RangeBuffer(FILMOGRAPHY_ORDERS)
+        for movie_id in sorted(cast):
+            self._store_cast(movie_id, cast[movie_id])
+        for actor_id in sorted(filmography):
+            self._store_filmography(actor_id, filmography[actor_id])
+
+    def _put_actor_row(self, row):
+        position = self._actor_position.get(row[0])
+        if position is None:
+            self._actor_position[row[0]] = len(self.actor_rows)
+            self.actor_rows.append(row)
+        else:
+            self.actor_rows[position] = row
+
+    def _put_movie_row(self, row):
+        position = self._movie_position.get(row[0])
+        if position is None:
+            self._movie_position[row[0]] = len(self.movie_rows)
+            self.movie_rows.append(row)
+        else:
+            self.movie_rows[position] = row
+
+    def _store_cast(self, movie_id, actors):
+        rows = self.actor_rows
+        self.casts.store(
+            movie_id,
+            {
+                "popularity": sorted(actors, key=lambda actor: _popularity_key(rows[actor]), reverse=True),
+                "name": sorted(actors, key=lambda actor: (nocase_key(rows[actor][1]), rows[actor][0])),
+            },
+        )
+
+    def _store_filmography(self, actor_id, movies):
+        rows = self.movie_rows
+        self.filmographies.store(
+            actor_id,
+            {
+                "title": sorted(movies, key=lambda movie: (nocase_key(rows[movie][1]), rows[movie][0])),
+                "release_date": sorted(movies, key=lambda movie: _release_date_key(rows[movie])),
+            },
+        )
+
+    def movie_cast(self, movie_id, order="name", limit=None, exclude_names=None):
+        """(id, name, popularity) rows of the movie's cast in ``order``, skipping exclude_names."""
+        orders, ranges = self.casts.layout
+        span = ranges.get(movie_id)
+        if span is None:
+            return []
+        positions = orders[order]
+        rows = self.actor_rows
+        if not exclude_names:
+            stop = span[1] if limit is None else min(span[1], span[0] + limit)
+            return [rows[position] for position in positions[span[0] : stop]]
+
+        excluded = set(exclude_names)
+        result = []
+        for position in positions[span[0] : span[1]]:
+            row = rows[position]
+            if row[1] in excluded:
+                continue
+            result.append(row)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def actor_filmography(self, actor_id, order="title", limit=None):
+        """(id, title, release_date) rows of the actor's movies in ``order``."""
+        orders, ranges = self.filmographies.layout
+        span = ranges.get(actor_id)
+        if span is None:
+            return []
+        stop = span[1] if limit is None else min(span[1], span[0] + limit)
+        rows = self.movie_rows
+        return [rows[position] for position in orders[order][span[0] : stop]]
+
+    def add_link(self, movie_id, actor_id):
+        """Re-sorts only the movie's cast and the actor's filmography. Returns False for unknown rows."""
+        actor = self._actor_position.get(actor_id)
+        movie = self._movie_position.get(movie_id)
+        if actor is None or movie is None:
+            return False
+        cast = self.casts.members(movie_id)
+        if actor not in cast:
+            self._store_cast(movie_id, cast + [actor])
+            self._store_filmography(actor_id, self.filmographies.members(actor_id) + [movie])
+            self._compact()
+        return True
+
+    def update_actor(self, row):
+        """Applies a new or changed actor row and re-sorts every cast it appears in."""
+        self._put_actor_row(tuple(row))
+        for movie in self.filmographies.members(row[0]):
+            movie_id = self.movie_rows[movie][0]
+            self._store_cast(movie_id, self.casts.members(movie_id))
+        self._compact()
+
+    def update_movie(self, row):
+        """Applies a new or changed movie row and re-sorts the filmography of every cast member."""
+        self._put_movie_row(tuple(row))
+        for actor in self.casts.members(row[0]):
+            actor_id = self.actor_rows[actor][0]
+            self._store_filmography(actor_id, self.filmographies.members(actor_id))
+        self._compact()
+
+    def _compact(self):
+        self.casts.compact()
+        self.filmographies.compact()
+
+
+def load_neighbor_orders(db_file=None):
+    db_file = db_file or DB_FILE
+    version = get_content_version(db_file)
+    conn = connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name, popularity FROM actors")
+    actor_rows = cursor.fetchall()
+    cursor.execute("SELECT id, title, release_date FROM movies")
+    movie_rows = cursor.fetchall()
+    cursor.execute("SELECT movie_id, actor_id FROM movie_actors")
+    links = cursor.fetchall()
+    conn.close()
+    return NeighborOrders(actor_rows, movie_rows, links, version=version)
+
+
+def get_neighbor_orders(db_file=None):
+    """
+    Returns the shared NeighborOrders for db_file. Writes made through the record_*
+    hooks keep it current; any other change to the database rebuilds it. Every call
+    within one API request returns the same orders.
+    """
+    db_file = db_file or DB_FILE
+    return data_watcher.pinned(("neighbor_orders", db_file), lambda: _current_neighbor_orders(db_file))
+
+
+def _current_neighbor_orders(db_file):
+    version = get_content_version(db_file)
+    orders = _orders_cache.get(db_file)
+    if orders is not None and orders.version == version:
+        return orders
+
+    with _orders_lock:
+        orders = _orders_cache.get(db_file)
+        if orders is None or orders.version != version:
+            orders = load_neighbor_orders(db_file)
+            _orders_cache[db_file] = orders
+    return orders
+
+
+def _record(db_file, previous_version, apply):
+    db_file = db_file or DB_FILE
+    with _orders_lock:
+        orders = _orders_cache.get(db_file)
+        if orders is None or orders.version is None or orders.version != previous_version:
+            return
+        if apply(orders, db_file) is False:
+            del _orders_cache[db_file]
+            return
+        orders.version = get_content_version(db_file)
+
+
+def _fetch_row(db_file, sql, row_id):
+    conn = connect(db_file)
+    row = conn.execute(sql, (row_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def record_relationship(db_file, movie_id, actor_id, previous_version):
+    """Applies a newly inserted link to the cached orders when they were current before the insert."""
+    _record(db_file, previous_version, lambda orders, _db_file: orders.add_link(movie_id, actor_id))
+
+
+def record_actor(db_file, actor_id, previous_version):
+    """Re-reads an upserted actor row, since the upsert may keep the stored popularity."""
+
+    def apply(orders, db_file):
+        row = _fetch_row(db_file, "SELECT id, name, popularity FROM actors WHERE id = ?", actor_id)
+        if row is None:
+            return False
+        orders.update_actor(row)
+
+    _record(db_file, previous_version, apply)
+
+
+def record_movie(db_file, movie_id, previous_version):
+    """Re-reads an upserted movie row, since the upsert may keep the stored release date."""
+
+    def apply(orders, db_file):
+        row = _fetch_row(db_file, "SELECT id, title, release_date FROM movies WHERE id = ?", movie_id)
+        if row is None:
+            return False
+        orders.update_movie(row)
+
+    _record(db_file, previous_version, apply)
+
+
+def clear_neighbor_orders_cache():
+    with _orders_lock:
+        _orders_cache.clear()
@@ -0,0 +1,282 @@
+"""Uniform and popularity-weighted sampling over GraphIndex neighbor rows.
+
+Replaces ``ORDER BY RANDOM() LIMIT n`` in the versus game. sqlite has to
+materialize and sort the whole join for every shuffle; here a draw touches
+only the k positions it picks:
+
+- uniform draws use a sparse partial Fisher-Yates shuffle, O(k) time and memory
+  however large the neighbor row is;
+- popularity-weighted costar draws use a per-movie alias table (Vose), O(1) per
+  draw after an O(degree) build, with tables kept in a bounded LRU.
+
+Every function takes an explicit ``rng`` so seeded games replay exactly.
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import data_watcher
+from db import connect, get_content_version
+from graph_cache import get_graph
+
+DB_FILE = "movies.db"
+# Actors with no or zero popularity keep a small chance of being drawn.
+MIN_SAMPLE_WEIGHT = 0.1
+ALIAS_TABLE_CACHE_SIZE = int(os.getenv("ALIAS_TABLE_CACHE_SIZE", "4096"))
+
+_sampler_lock = threading.Lock()
+_sampler_cache = {}
+
+
+def sample_without_replacement(population, k, rng, exclude=None):
+    """
+    Up to k distinct items of population in random order, skipping items in exclude.
+    Sparse partial Fisher-Yates: swapped positions live in a dict, so the population
+    is never copied.
+    """
+    size = len(population)
+    swaps = {}
+    picked = []
+    position = 0
+    while len(picked) < k and position < size:
+        chosen = rng.randrange(position, size)
+        item = population[swaps.get(chosen, chosen)]
+        swaps[chosen] = swaps.get(position, position)
+        position += 1
+        if exclude and item in exclude:
+            continue
+        picked.append(item)
+    return picked
+
+
+class AliasTable:
+    """Vose's alias method: O(n) build, O(1) weighted draws of positions 0..n-1."""
+
+    def __init__(self, weights):
+        size = len(weights)
+        total = float(sum(weights))
+        self.weights = array("d", weights)
+        self.probability = array("d", [1.0]) * size
+        self.alias = array("i", range(size))
+        if not size or total <= 0:
+            return
+
+        scaled = [weight * size / total for weight in weights]
+        small = [position for position, value in enumerate(scaled) if value < 1.0]
+        large = [position for position, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Whatever is left is 1.0 up to rounding error.
+        for position in small + large:
+            self.probability[position] = 1.0
+
+    def __len__(self):
+        return len(self.probability)
+
+    def draw(self, rng):
+        position = rng.randrange(len(self.probability))
+        return position if rng.random() < self.probability[position] else self.alias[position]
+
+
+def weighted_sample_without_replacement(population, table, k, rng, exclude=None):
+    """
+    Up to k distinct items drawn in proportion to table weights, skipping items in
+    exclude. Repeats are rejected; when rejections pile up (k close to the row size)
+    the remainder is finished with Efraimidis-Spirakis keys, which has the same
+    distribution.
+    """
+    size = len(population)
+    picked = []
+    seen = set()
+    attempts = 4 * (k + (len(exclude) if exclude else 0)) + 16
+    while len(picked) < k and len(seen) < size and attempts > 0:
+        attempts -= 1
+        position = table.draw(rng)
+        if position in seen:
+            continue
+        seen.add(position)
+        item = population[position]
+        if exclude and item in exclude:
+            continue
+        picked.append(item)
+
+    if len(picked) < k and len(seen) < size:
+        remaining = [
+            position
+            for position in range(size)
+            if position not in seen and not (exclude and population[position] in exclude)
+        ]
+        keyed = heapq.nlargest(
+            k - len(picked),
+            remaining,
+            key=lambda position: rng.random() ** (1.0 / table.weights[position]),
+        )
+        picked.extend(population[position] for position in keyed)
+    return picked
+
+
+class NeighborSampler:
+    """
+    Samples neighbor rows of one GraphIndex. Costar draws from a movie row are
+    weighted by actor popularity; alias tables are built on first use per movie.
+    """
+
+    def __init__(self, graph, actor_popularity=None):
+        self.graph = graph
+        self.version = graph.version
+        actor_popularity = actor_popularity or {}
+        self.popularity = array("d", [-1.0]) * graph.actor_count
+        for index, actor_id in enumerate(graph.actor_ids):
+            popularity = actor_popularity.get(actor_id)
+            if popularity is not None:
+                self.popularity[index] = popularity
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def popularity_of(self, actor_index):
+        popularity = self.popularity[actor_index]
+        return None if popularity < 0 else popularity
+
+    def sample(self, index, k, rng, exclude=None):
+        """Uniform draw of up to k neighbor indices of node ``index``."""
+        return sample_without_replacement(self.graph.neighbors_of(index), k, rng, exclude)
+
+    def _alias_table(self, index):
+        with self._lock:
+            table = self._tables.get(index)
+            if table is not None:
+                self._tables.move_to_end(index)
+                return table
+        popularity = self.popularity
+        table = AliasTable(
+            [max(popularity[actor], MIN_SAMPLE_WEIGHT) for actor in self.graph.neighbors_of(index)]
+        )
+        with self._lock:
+            self._tables[index] = table
+            while len(self._tables) > ALIAS_TABLE_CACHE_SIZE:
+                self._tables.popitem(last=False)
+        return table
+
+    def sample_weighted(self, index, k, rng, exclude=None):
+        """Popularity-weighted draw of up to k actor indices from movie node ``index``."""
+        neighbors = self.graph.neighbors_of(index)
+        if not neighbors:
+            return []
+        return weighted_sample_without_replacement(neighbors, self._alias_table(index), k, rng, exclude)
+
+
+def load_actor_popularity(db_file):
+    conn = connect(db_file)
+    rows = conn.execute("SELECT id, popularity FROM actors").fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def get_neighbor_sampler(db_file=None):
+    """
+    Returns the shared NeighborSampler for db_file, rebuilt alongside the graph when
+    content changes. Every call within one API request returns the same sampler.
+    """
+    db_file = db_file or DB_FILE
+    return data_watcher.pinned(("neighbor_sampler", db_file), lambda: _current_neighbor_sampler(db_file))
+
+
+def _current_neighbor_sampler(db_file):
+    version = get_content_version(db_file)
+    sampler = _sampler_cache.get(db_file)
+    if sampler is not None and sampler.version == version:
+        return sampler
+
+    with _sampler_lock:
+        sampler = _sampler_cache.get(db_file)
+        if sampler is None or sampler.version != version:
+            sampler = NeighborSampler(get_graph(db_file), load_actor_popularity(db_file))
+            _sampler_cache[db_file] = sampler
+    return sampler
+
+
+def clear_neighbor_sampler_cache():
+    with _sampler_lock:
+        _sampler_cache.clear()
+
+
+def _time_calls(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def benchmark(db_file, nodes=10, repeat=200, limit=6, pool_size=20, seed=0):
+    """Compares the old ORDER BY RANDOM() queries with in-memory sampling on the highest-degree nodes."""
+    sampler = get_neighbor_sampler(db_file)
+    graph = sampler.graph
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_file)
+    results = []
+    for node_type in ("actor", "movie"):
+        first, stop = (0, graph.actor_count) if node_type == "actor" else (graph.actor_count, graph.node_count)
+        hubs = heapq.nlargest(nodes, range(first, stop), key=graph.degree)
+        for index in hubs:
+            node_id = graph.node_key(index)[0]
+            if node_type == "actor":
+                sql = (
+                    "SELECT m.id, m.title FROM movies m JOIN movie_actors ma ON m.id = ma.movie_id "
+                    "WHERE ma.actor_id = ? ORDER BY RANDOM() LIMIT ?"
+                )
+                params = (node_id, limit)
+                in_memory = lambda: sampler.sample(index, limit, rng)
+            else:
+                sql = (
+                    "SELECT a.id, a.name, a.popularity FROM actors a JOIN movie_actors ma ON a.id = ma.actor_id "
+                    "WHERE ma.movie_id = ? ORDER BY RANDOM() LIMIT ?"
+                )
+                params = (node_id, pool_size)
+                in_memory = lambda: sampler.sample_weighted(index, limit, rng)
+            results.append(
+                {
+                    "type": node_type,
+                    "id": node_id,
+                    "degree": graph.degree(index),
+                    "sql_ms": round(_time_calls(lambda: conn.execute(sql, params).fetchall(), repeat), 4),
+                    "sampler_ms": round(_time_calls(in_memory, repeat), 4),
+                }
+            )
+    conn.close()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark ORDER BY RANDOM() against in-memory neighbor sampling.")
+    parser.add_argument("--db-file", default="movies.db", help="SQLite database to sample from. Default: movies.db")
+    parser.add_argument("--nodes", type=int, default=10, help="Highest-degree actors and movies to time. Default: 10")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per node and method. Default: 200")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = benchmark(args.db_file, nodes=args.nodes, repeat=args.repeat)
+    print(f"{'type':<6} {'id':>10} {'degree':>7} {'sql ms':>9} {'sampler ms':>11} {'speedup':>8}")
+    for row in results:
+        speedup = row["sql_ms"] / row["sampler_ms"] if row["sampler_ms"] else float("inf")
+        print(
+            f"{row['type']:<6} {row['id']:>10} {row['degree']:>7} "
+            f"{row['sql_ms']:>9.4f} {row['sampler_ms']:>11.4f} {speedup:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
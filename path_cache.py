@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("PATH_CACHE_MAX_ENTRIES", "4096"))
+DEFAULT_MAX_BYTES = int(os.getenv("PATH_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Rough per-object costs used to keep the byte budget honest without calling
+# sys.getsizeof on every tuple in every cached path.
+ENTRY_OVERHEAD_BYTES = 160
+NODE_BYTES = 120
+
+
+def estimate_path_bytes(path):
+    if path == -1:
+        return ENTRY_OVERHEAD_BYTES
+    return ENTRY_OVERHEAD_BYTES + NODE_BYTES * len(path)
+
+
+class PathCache:
+    """
+    Bounded LRU cache of shortest typed paths.
+
+    Keys are (content_version, node_a, node_b) with the two endpoints stored in a
+    canonical order. The graph is undirected, so a cached (a, b) path also answers
+    (b, a) by reversal. Entries from an older content_version are never returned and
+    age out through normal LRU eviction.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reversed_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _canonical_key(version, start, end):
+        if end < start:
+            return (version, end, start), True
+        return (version, start, end), False
+
+    def get(self, version, start, end):
+        """Returns (hit, typed_path). typed_path is a fresh list or -1."""
+        key, reversed_key = self._canonical_key(version, start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if reversed_key:
+                self.reversed_hits += 1
+
+        path, _size = entry
+        if path == -1:
+            return True, -1
+        return True, list(reversed(path)) if reversed_key else list(path)
+
+    def put(self, version, start, end, typed_path):
+        key, reversed_key = self._canonical_key(version, start, end)
+        if typed_path == -1:
+            stored = -1
+        else:
+            stored = tuple(reversed(typed_path)) if reversed_key else tuple(typed_path)
+        size = estimate_path_bytes(stored)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (stored, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _evicted_key, (_path, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "reversed_hits": self.reversed_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
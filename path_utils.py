@@ -1,9 +1,81 @@
-import sqlite3
+import os
+import random
+import time
+from collections import deque
+
+import metrics
+from component_index import get_component_index
+from db import get_content_version
+from graph_cache import get_graph
+from landmark_oracle import alt_bidirectional_search, get_landmark_oracle
+from path_cache import PathCache
 
 DB_FILE = "movies.db"
+SQLITE_IN_CHUNK_SIZE = 900
+SHORTEST_PATH_SAMPLE_ATTEMPTS_PER_PATH = 8
+# Per-query traversal budgets; 0 turns a limit off.
+PATH_MAX_EXPANDED_NODES = int(os.getenv("PATH_MAX_EXPANDED_NODES", "200000"))
+PATH_TIME_BUDGET_MS = float(os.getenv("PATH_TIME_BUDGET_MS", "1000"))
+PATH_HUB_AWARE_ORDERING = os.getenv("PATH_HUB_AWARE_ORDERING", "1").strip().lower() in ("1", "true", "yes")
+# Expanded nodes between clock reads for the time budget.
+BUDGET_CLOCK_INTERVAL = 256
+
+PATH_CACHE = PathCache()
+
+
+class PathBudgetExceeded(Exception):
+    """
+    Raised by SearchBudget.charge() once a search runs past its node or time budget.
+    generate_typed_paths_from_source sets results to what it had answered by then.
+    """
+
+    def __init__(self, budget, limit):
+        self.limit = limit
+        self.results = None
+        self.nodes_expanded = budget.nodes_expanded
+        self.elapsed_ms = budget.elapsed_ms()
+        super().__init__(
+            f"Search budget exceeded ({limit}): {self.nodes_expanded} nodes expanded in {self.elapsed_ms:.1f} ms"
+        )
+
+
+class SearchBudget:
+    """
+    Node and time budget for one path query. Searches charge() every node they expand,
+    and the charge that exceeds max_nodes or lands after time_budget_ms raises
+    PathBudgetExceeded. Defaults come from PATH_MAX_EXPANDED_NODES and PATH_TIME_BUDGET_MS.
+    nodes_expanded and elapsed_ms() describe the query either way. A budget shared by
+    several searches of one request stays spent: every later charge raises too.
+    """
+
+    def __init__(self, max_nodes=None, time_budget_ms=None):
+        self.max_nodes = PATH_MAX_EXPANDED_NODES if max_nodes is None else max_nodes
+        time_budget_ms = PATH_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+        self.started = time.perf_counter()
+        self.deadline = self.started + time_budget_ms / 1000 if time_budget_ms > 0 else None
+        self.nodes_expanded = 0
+        self._next_clock_check = BUDGET_CLOCK_INTERVAL
+
+    def charge(self, count=1):
+        self.nodes_expanded += count
+        if self.max_nodes and self.nodes_expanded > self.max_nodes:
+            metrics.increment("path_budget_exceeded_total")
+            raise PathBudgetExceeded(self, "max_nodes")
+        if self.deadline is not None and self.nodes_expanded >= self._next_clock_check:
+            if time.perf_counter() > self.deadline:
+                metrics.increment("path_budget_exceeded_total")
+                raise PathBudgetExceeded(self, "time")
+            self._next_clock_check = self.nodes_expanded + BUDGET_CLOCK_INTERVAL
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def stats(self):
+        return {"nodes_expanded": self.nodes_expanded, "elapsed_ms": round(self.elapsed_ms(), 3)}
+
 
 def get_connection():
-    return sqlite3.connect(DB_FILE)
+    return metrics.connect(DB_FILE)
 
 
 def next_node_type(node_type):
@@ -98,70 +170,624 @@ def validate_named_path(path, start_type="actor"):
     return True
 
 
+def fallback_node_label(node_id, node_type):
+    return f"Actor {node_id}" if node_type == "actor" else f"Movie {node_id}"
+
+
 def get_node_label(cursor, node_id, node_type):
     if node_type == "actor":
         cursor.execute("SELECT name FROM actors WHERE id = ?", (node_id,))
         row = cursor.fetchone()
-        return row[0] if row else f"Actor {node_id}"
+        return row[0] if row else fallback_node_label(node_id, node_type)
 
     cursor.execute("SELECT title FROM movies WHERE id = ?", (node_id,))
     row = cursor.fetchone()
-    return row[0] if row else f"Movie {node_id}"
+    return row[0] if row else fallback_node_label(node_id, node_type)
 
 
-def generate_typed_path(start_id, start_type, end_id, end_type):
-    from collections import deque
+def hydrate_node_labels(nodes):
+    """
+    Returns {(node_id, node_type): label} for every typed node, using one
+    WHERE id IN (...) query per node type instead of one query per node.
+    Missing ids fall back to the same "Actor <id>" / "Movie <id>" labels as get_node_label.
+    """
+    ids_by_type = {"actor": set(), "movie": set()}
+    for node_id, node_type in nodes:
+        ids_by_type[node_type].add(node_id)
+
+    labels = {}
+    if not ids_by_type["actor"] and not ids_by_type["movie"]:
+        return labels
 
     conn = get_connection()
     cursor = conn.cursor()
-    queue = deque()
-    visited = set()
-    queue.append((start_id, start_type, [(start_id, start_type)]))
-    visited.add((start_id, start_type))
-
-    while queue:
-        curr_id, curr_type, path = queue.popleft()
-        if (curr_id, curr_type) == (end_id, end_type):
-            conn.close()
-            return path
-
-        if curr_type == "actor":
-            cursor.execute("SELECT movie_id FROM movie_actors WHERE actor_id = ?", (curr_id,))
-            for (movie_id,) in cursor.fetchall():
-                if (movie_id, "movie") not in visited:
-                    visited.add((movie_id, "movie"))
-                    queue.append((movie_id, "movie", path + [(movie_id, "movie")]))
-        elif curr_type == "movie":
-            cursor.execute("SELECT actor_id FROM movie_actors WHERE movie_id = ?", (curr_id,))
-            for (actor_id,) in cursor.fetchall():
-                if (actor_id, "actor") not in visited:
-                    visited.add((actor_id, "actor"))
-                    queue.append((actor_id, "actor", path + [(actor_id, "actor")]))
-
+    for node_type, table, column in (("actor", "actors", "name"), ("movie", "movies", "title")):
+        node_ids = sorted(ids_by_type[node_type])
+        for offset in range(0, len(node_ids), SQLITE_IN_CHUNK_SIZE):
+            chunk = node_ids[offset : offset + SQLITE_IN_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"SELECT id, {column} FROM {table} WHERE id IN ({placeholders})", chunk)
+            for node_id, label in cursor.fetchall():
+                labels[(node_id, node_type)] = label
+        for node_id in node_ids:
+            labels.setdefault((node_id, node_type), fallback_node_label(node_id, node_type))
     conn.close()
-    return -1
+    return labels
+
 
+def get_path_cache_stats():
+    return PATH_CACHE.stats()
 
-def serialize_typed_path(path):
+
+def clear_path_cache():
+    PATH_CACHE.clear()
+
+
+def get_component_stats(top=10):
+    graph = get_graph(DB_FILE)
+    return get_component_index(DB_FILE, graph).stats(top=top)
+
+
+def nodes_disconnected(start, end, graph=None):
+    """
+    True when both typed nodes are indexed and lie in different connected components,
+    which means no path can exist under any constraints. Answered in near-constant time.
+    """
+    if graph is None:
+        if get_content_version(DB_FILE) is None:
+            return False
+        graph = get_graph(DB_FILE)
+    return get_component_index(DB_FILE, graph).connected(start, end) is False
+
+
+def build_path_constraints(
+    exclude_nodes=None,
+    min_year=None,
+    max_year=None,
+    genres=None,
+    content_ratings=None,
+    languages=None,
+):
+    """
+    Normalizes path search constraints into a hashable dict, or None when nothing is constrained.
+    exclude_nodes: iterable of (node_id, node_type) that the path may not visit.
+    min_year/max_year: inclusive release-year bounds for every movie on the path.
+    genres/content_ratings/languages: each movie on the path must match any listed value.
+    """
+    constraints = {
+        "exclude_nodes": tuple(sorted(set(exclude_nodes or ()))),
+        "min_year": min_year,
+        "max_year": max_year,
+        "genres": tuple(sorted({value.casefold() for value in genres or ()})),
+        "content_ratings": tuple(sorted({value.casefold() for value in content_ratings or ()})),
+        "languages": tuple(sorted({value.casefold() for value in languages or ()})),
+    }
+    if not any(value is not None and value != () for value in constraints.values()):
+        return None
+    return constraints
+
+
+def _constraints_key(constraints):
+    if not constraints:
+        return None
+    return tuple(sorted(constraints.items()))
+
+
+def _build_node_filter(graph, constraints):
+    """Returns (excluded_indexes, movie_bits) where movie_bits is None when every movie is allowed."""
+    if not constraints:
+        return frozenset(), None
+
+    excluded = set()
+    for node_id, node_type in constraints["exclude_nodes"]:
+        index = graph.node_index(node_id, node_type)
+        if index is not None:
+            excluded.add(index)
+
+    movie_bits = None
+    if (
+        constraints["min_year"] is not None
+        or constraints["max_year"] is not None
+        or constraints["genres"]
+        or constraints["content_ratings"]
+        or constraints["languages"]
+    ):
+        mask = graph.movie_mask(
+            min_year=constraints["min_year"],
+            max_year=constraints["max_year"],
+            genres=constraints["genres"],
+            content_ratings=constraints["content_ratings"],
+            languages=constraints["languages"],
+        )
+        movie_bits = graph.movie_mask_bytes(mask)
+    return frozenset(excluded), movie_bits
+
+
+def _node_allowed(graph, index, excluded, movie_bits):
+    if index in excluded:
+        return False
+    if movie_bits is None or index < graph.actor_count:
+        return True
+    return graph.movie_allowed(movie_bits, index)
+
+
+def _cache_version(constraints):
+    # Key on the graph the search will run on, which a request may have pinned to an
+    # older content version than the file now on disk.
+    if get_content_version(DB_FILE) is None:
+        return None
+    graph_version = get_graph(DB_FILE).version
+    if graph_version is None:
+        return None
+    return (graph_version, _constraints_key(constraints))
+
+
+def generate_typed_path(start_id, start_type, end_id, end_type, use_cache=True, constraints=None, budget=None):
+    """
+    Returns the shortest typed path [(id, type), ...] between two nodes, or -1.
+    constraints: optional dict from build_path_constraints restricting which nodes the path may use.
+    budget: SearchBudget charged by the search, a default one when omitted. Raises
+    PathBudgetExceeded when the search runs out; that outcome is not cached.
+    Nodes in different connected components return -1 without searching.
+    Results are memoized in PATH_CACHE per database content version and constraint set;
+    pass use_cache=False to force a fresh search.
+    """
+    start = (start_id, start_type)
+    end = (end_id, end_type)
+    if nodes_disconnected(start, end):
+        return -1
+    if budget is None:
+        budget = SearchBudget()
+
+    version = _cache_version(constraints) if use_cache else None
+    if version is None:
+        return _search_typed_path(start_id, start_type, end_id, end_type, constraints, budget)
+
+    hit, cached_path = PATH_CACHE.get(version, start, end)
+    if hit:
+        return cached_path
+
+    typed_path = _search_typed_path(start_id, start_type, end_id, end_type, constraints, budget)
+    PATH_CACHE.put(version, start, end, typed_path)
+    return typed_path
+
+
+def _search_typed_path(start_id, start_type, end_id, end_type, constraints=None, budget=None):
+    start = (start_id, start_type)
+    graph = get_graph(DB_FILE)
+    excluded, movie_bits = _build_node_filter(graph, constraints)
+    source = graph.node_index(start_id, start_type)
+    target = graph.node_index(end_id, end_type)
+    if source is not None and not _node_allowed(graph, source, excluded, movie_bits):
+        return -1
+    if start == (end_id, end_type):
+        return [start]
+    if source is None or target is None or not _node_allowed(graph, target, excluded, movie_bits):
+        return -1
+
+    oracle = get_landmark_oracle(graph) if constraints is None else None
+    if oracle is not None:
+        index_path = alt_bidirectional_search(
+            graph, oracle, source, target, budget=budget, hub_aware=PATH_HUB_AWARE_ORDERING
+        )
+    else:
+        index_path = bidirectional_search(graph, source, target, excluded, movie_bits, budget=budget)
+    return -1 if index_path is None else [graph.node_key(index) for index in index_path]
+
+
+def bidirectional_search(graph, source, target, excluded=frozenset(), movie_bits=None, budget=None, hub_aware=None):
+    """
+    Shortest index path from source to target, or None when unreachable. BFS runs from
+    both ends, expanding one whole level of one side at a time, and returns at the first
+    meeting node: every meeting found on that level closes a path of the same length.
+
+    The side with fewer frontier nodes expands next. With hub_aware (PATH_HUB_AWARE_ORDERING
+    by default) the side whose frontier has the smaller total degree expands instead, which
+    is the work the level will actually do. A frontier holding a prolific actor or a
+    100-person cast then waits while the other side catches up. budget is charged for
+    every expanded node.
+    """
+    if source == target:
+        return [source]
+    if hub_aware is None:
+        hub_aware = PATH_HUB_AWARE_ORDERING
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    sides = [
+        {"parents": {source: -1}, "frontier": [source], "degree": offsets[source + 1] - offsets[source]},
+        {"parents": {target: -1}, "frontier": [target], "degree": offsets[target + 1] - offsets[target]},
+    ]
+    expanded = 0
+    try:
+        while sides[0]["frontier"] and sides[1]["frontier"]:
+            if hub_aware:
+                expand = 0 if sides[0]["degree"] <= sides[1]["degree"] else 1
+            else:
+                expand = 0 if len(sides[0]["frontier"]) <= len(sides[1]["frontier"]) else 1
+            parents = sides[expand]["parents"]
+            other_parents = sides[1 - expand]["parents"]
+            next_frontier = []
+            next_degree = 0
+            for node in sides[expand]["frontier"]:
+                expanded += 1
+                if budget is not None:
+                    budget.charge()
+                for neighbor in neighbors[offsets[node] : offsets[node + 1]]:
+                    if neighbor in parents:
+                        continue
+                    if neighbor in excluded or (
+                        movie_bits is not None
+                        and neighbor >= graph.actor_count
+                        and not graph.movie_allowed(movie_bits, neighbor)
+                    ):
+                        continue
+                    parents[neighbor] = node
+                    if neighbor in other_parents:
+                        forward = _rebuild_index_path(sides[0]["parents"], neighbor)
+                        backward = _rebuild_index_path(sides[1]["parents"], neighbor)
+                        return forward + backward[-2::-1]
+                    next_frontier.append(neighbor)
+                    next_degree += offsets[neighbor + 1] - offsets[neighbor]
+            sides[expand]["frontier"] = next_frontier
+            sides[expand]["degree"] = next_degree
+        return None
+    finally:
+        metrics.increment("bfs_nodes_expanded_total", expanded)
+
+
+def estimate_typed_distance(start_id, start_type, end_id, end_type, budget=None):
+    """
+    Returns {"reachable", "steps_to_target", "steps_lower_bound", "steps_upper_bound"}
+    without building a path when the landmark oracle can answer. steps_to_target is set
+    only when the bounds meet; without an oracle (or landmark coverage) the exact distance
+    comes from the cached shortest-path search, charged to budget. A search that runs out
+    of budget reports the target as unreachable with budget_exceeded.
+    """
+    start = (start_id, start_type)
+    end = (end_id, end_type)
+    unreachable = {"reachable": False, "steps_to_target": None, "steps_lower_bound": None, "steps_upper_bound": None}
+    if start == end:
+        return {"reachable": True, "steps_to_target": 0, "steps_lower_bound": 0, "steps_upper_bound": 0}
+    if nodes_disconnected(start, end):
+        return unreachable
+
+    graph = get_graph(DB_FILE)
+    oracle = get_landmark_oracle(graph)
+    source = graph.node_index(start_id, start_type)
+    target = graph.node_index(end_id, end_type)
+    if oracle is not None and source is not None and target is not None:
+        bounds = oracle.bounds(source, target)
+        if bounds is None:
+            return unreachable
+        lower, upper = bounds
+        if upper is not None:
+            return {
+                "reachable": True,
+                "steps_to_target": upper if lower == upper else None,
+                "steps_lower_bound": lower,
+                "steps_upper_bound": upper,
+            }
+
+    try:
+        typed_path = generate_typed_path(start_id, start_type, end_id, end_type, budget=budget)
+    except PathBudgetExceeded:
+        return {**unreachable, "budget_exceeded": True}
+    if typed_path == -1:
+        return unreachable
+    steps = len(typed_path) - 1
+    return {"reachable": True, "steps_to_target": steps, "steps_lower_bound": steps, "steps_upper_bound": steps}
+
+
+def _rebuild_index_path(parents, index):
+    path = []
+    while index != -1:
+        path.append(index)
+        index = parents[index]
+    path.reverse()
+    return path
+
+
+def generate_typed_paths_from_source(start_id, start_type, targets, constraints=None, budget=None):
+    """
+    Runs one BFS from the start node over the in-memory graph and returns
+    {(target_id, target_type): typed_path} for every requested target, using -1 for
+    unreachable targets. The search stops as soon as every target has been reached.
+    Constrained searches check exclusions and the precomputed movie bitset per node,
+    so they cost the same as unconstrained ones. budget, when given, is charged per
+    expanded node and raises PathBudgetExceeded once spent; the exception's results
+    keep the paths found so far and the known -1s, with None for targets not yet reached.
+    """
+    start = (start_id, start_type)
+    targets = set(targets)
+    results = {target: -1 for target in targets}
+    graph = get_graph(DB_FILE)
+    excluded, movie_bits = _build_node_filter(graph, constraints)
+    source = graph.node_index(start_id, start_type)
+
+    if source is not None and not _node_allowed(graph, source, excluded, movie_bits):
+        return results
+    if start in targets:
+        results[start] = [start]
+    if source is None:
+        return results
+
+    components = get_component_index(DB_FILE, graph)
+    remaining = {}
+    for target in targets:
+        target_index = graph.node_index(*target)
+        if target_index is None or target_index == source:
+            continue
+        # Targets in another component are unreachable; leave them at -1 instead of
+        # exhausting the source's component looking for them.
+        if components.connected(start, target) is False:
+            continue
+        remaining[target_index] = target
+
+    parents = {source: -1}
+    queue = deque([source])
+    expanded = 0
+    try:
+        while queue and remaining:
+            node = queue.popleft()
+            expanded += 1
+            if budget is not None:
+                budget.charge()
+            for neighbor in graph.neighbors_of(node):
+                if neighbor in parents:
+                    continue
+                if neighbor in excluded or (
+                    movie_bits is not None
+                    and neighbor >= graph.actor_count
+                    and not graph.movie_allowed(movie_bits, neighbor)
+                ):
+                    continue
+                parents[neighbor] = node
+                target = remaining.pop(neighbor, None)
+                if target is not None:
+                    results[target] = [graph.node_key(index) for index in _rebuild_index_path(parents, neighbor)]
+                queue.append(neighbor)
+    except PathBudgetExceeded as exc:
+        for target in remaining.values():
+            results[target] = None
+        exc.results = results
+        raise
+    finally:
+        metrics.increment("bfs_nodes_expanded_total", expanded)
+    return results
+
+
+def iter_batch_typed_paths(pairs, constraints=None, budget=None):
+    """
+    Yields (index, typed_path) for each ((start_id, start_type), (end_id, end_type)) pair.
+    Pairs are grouped by source so a single BFS answers every target sharing that source;
+    results are yielded one source group at a time, in first-seen source order.
+    Every group is charged to one budget, a default SearchBudget for the whole call when
+    omitted, so a batch costs at most one query's budget. Targets the group that runs it
+    out had not reached yet, and uncached targets of every group after it, yield None.
+    """
+    groups = {}
+    for index, (source, target) in enumerate(pairs):
+        groups.setdefault(source, []).append((index, target))
+
+    version = _cache_version(constraints)
+    if budget is None:
+        budget = SearchBudget()
+    for source, members in groups.items():
+        paths = {}
+        if version is not None:
+            for _index, target in members:
+                hit, cached_path = PATH_CACHE.get(version, source, target)
+                if hit:
+                    paths[target] = cached_path
+
+        missing_targets = {target for _index, target in members if target not in paths}
+        if missing_targets:
+            try:
+                found = generate_typed_paths_from_source(
+                    source[0],
+                    source[1],
+                    missing_targets,
+                    constraints=constraints,
+                    budget=budget,
+                )
+            except PathBudgetExceeded as exc:
+                found = exc.results
+            for target, typed_path in found.items():
+                paths[target] = typed_path
+                if version is not None and typed_path is not None:
+                    PATH_CACHE.put(version, source, target, typed_path)
+
+        for index, target in members:
+            yield index, paths[target]
+
+
+def _shortest_path_layers(graph, source, target, budget=None):
+    """
+    Layered BFS from source that stops once the target's layer is complete.
+    Returns (dist, sigma) where sigma[v] is the number of distinct shortest
+    source->v paths, accumulated layer by layer without materializing any path.
+    budget, when given, is charged for each layer before it is expanded.
+    """
+    dist = {source: 0}
+    sigma = {source: 1}
+    frontier = [source]
+    depth = 0
+
+    while frontier and target not in dist:
+        depth += 1
+        next_frontier = []
+        if budget is not None:
+            budget.charge(len(frontier))
+        metrics.increment("bfs_nodes_expanded_total", len(frontier))
+        for node in frontier:
+            node_sigma = sigma[node]
+            for neighbor in graph.neighbors_of(node):
+                neighbor_depth = dist.get(neighbor)
+                if neighbor_depth is None:
+                    dist[neighbor] = depth
+                    sigma[neighbor] = node_sigma
+                    next_frontier.append(neighbor)
+                elif neighbor_depth == depth:
+                    sigma[neighbor] += node_sigma
+        frontier = next_frontier
+
+    return dist, sigma
+
+
+def _shortest_path_predecessors(graph, dist, node):
+    previous_depth = dist[node] - 1
+    return [
+        neighbor
+        for neighbor in graph.neighbors_of(node)
+        if dist.get(neighbor) == previous_depth
+    ]
+
+
+def _iter_shortest_paths(graph, dist, source, target):
+    """Yields shortest source->target index paths in ascending-index DFS order."""
+    stack = [(target, [target])]
+    while stack:
+        node, suffix = stack.pop()
+        if node == source:
+            yield list(reversed(suffix))
+            continue
+        for predecessor in reversed(_shortest_path_predecessors(graph, dist, node)):
+            stack.append((predecessor, suffix + [predecessor]))
+
+
+def _sample_shortest_path(graph, dist, sigma, source, target, rng):
+    """Draws one shortest path uniformly at random by walking predecessors weighted by sigma."""
+    path = [target]
+    node = target
+    while node != source:
+        predecessors = _shortest_path_predecessors(graph, dist, node)
+        node = rng.choices(predecessors, weights=[sigma[pred] for pred in predecessors])[0]
+        path.append(node)
+    path.reverse()
+    return path
+
+
+def _resolve_graph_nodes(graph, start_id, start_type, end_id, end_type):
+    return graph.node_index(start_id, start_type), graph.node_index(end_id, end_type)
+
+
+def count_shortest_paths(graph, source, target, budget=None):
+    """
+    Returns (steps, count) for the shortest paths between two node indexes of graph,
+    or (None, 0) when none exists. Searches the whole graph, with no component check.
+    """
+    dist, sigma = _shortest_path_layers(graph, source, target, budget)
+    if target not in dist:
+        return None, 0
+    return dist[target], sigma[target]
+
+
+def count_typed_shortest_paths(start_id, start_type, end_id, end_type, budget=None):
+    """
+    Returns {"steps": int | None, "count": int} for the number of distinct shortest
+    paths between two nodes. Runs in time linear in the explored graph even when
+    the count is in the millions. Raises PathBudgetExceeded when budget runs out.
+    """
+    graph = get_graph(DB_FILE)
+    source, target = _resolve_graph_nodes(graph, start_id, start_type, end_id, end_type)
+    if source is None or target is None:
+        return {"steps": None, "count": 0}
+    if nodes_disconnected((start_id, start_type), (end_id, end_type), graph):
+        return {"steps": None, "count": 0}
+
+    steps, count = count_shortest_paths(graph, source, target, budget)
+    return {"steps": steps, "count": count}
+
+
+def enumerate_typed_shortest_paths(
+    start_id, start_type, end_id, end_type, k=5, mode="first", seed=None, budget=None
+):
+    """
+    Returns {"steps", "count", "paths"} with up to k distinct shortest typed paths.
+
+    mode="first" walks the layered shortest-path DAG in a deterministic order.
+    mode="sample" draws paths uniformly at random from all shortest paths using the
+    per-node path counts; pass seed for reproducible samples.
+    Raises PathBudgetExceeded when budget runs out during the layered search.
+    """
+    graph = get_graph(DB_FILE)
+    source, target = _resolve_graph_nodes(graph, start_id, start_type, end_id, end_type)
+    if source is None or target is None:
+        return {"steps": None, "count": 0, "paths": []}
+    if nodes_disconnected((start_id, start_type), (end_id, end_type), graph):
+        return {"steps": None, "count": 0, "paths": []}
+
+    dist, sigma = _shortest_path_layers(graph, source, target, budget)
+    if target not in dist:
+        return {"steps": None, "count": 0, "paths": []}
+
+    limit = min(k, sigma[target])
+    index_paths = []
+    if mode == "sample":
+        rng = random.Random(seed)
+        seen = set()
+        attempts = limit * SHORTEST_PATH_SAMPLE_ATTEMPTS_PER_PATH
+        while len(index_paths) < limit and attempts > 0:
+            attempts -= 1
+            sampled = tuple(_sample_shortest_path(graph, dist, sigma, source, target, rng))
+            if sampled not in seen:
+                seen.add(sampled)
+                index_paths.append(sampled)
+    else:
+        for index_path in _iter_shortest_paths(graph, dist, source, target):
+            index_paths.append(index_path)
+            if len(index_paths) >= limit:
+                break
+
+    return {
+        "steps": dist[target],
+        "count": sigma[target],
+        "paths": [[graph.node_key(index) for index in index_path] for index_path in index_paths],
+    }
+
+
+def serialize_typed_path(path, labels=None):
+    """
+    labels: optional {(node_id, node_type): label} map from hydrate_node_labels,
+    so callers that also pretty-print the path only look labels up once.
+    """
     if path == -1:
         return []
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    serialized = [
+    if labels is None:
+        labels = hydrate_node_labels(path)
+    return [
         {
             "id": node_id,
             "type": node_type,
-            "label": get_node_label(cursor, node_id, node_type),
+            "label": labels.get((node_id, node_type)) or fallback_node_label(node_id, node_type),
         }
         for node_id, node_type in path
     ]
-    conn.close()
-    return serialized
 
 
-def build_path_hint(start_id, start_type, end_id, end_type):
-    typed_path = generate_typed_path(start_id, start_type, end_id, end_type)
+def build_path_hint(start_id, start_type, end_id, end_type, constraints=None, distance_only=False, budget=None):
+    """
+    Returns path hint metadata for a suggestion. distance_only skips path serialization
+    and, for unconstrained hints, answers from the landmark oracle's distance bounds.
+    Pass one budget to every hint of a request to bound the request as a whole.
+    A search that runs out of budget reports the target as unreachable with budget_exceeded.
+    """
+    metrics.increment("path_hints_total")
+    if distance_only and constraints is None:
+        return {**estimate_typed_distance(start_id, start_type, end_id, end_type, budget=budget), "path": []}
+
+    try:
+        typed_path = generate_typed_path(
+            start_id, start_type, end_id, end_type, constraints=constraints, budget=budget
+        )
+    except PathBudgetExceeded:
+        return {
+            "reachable": False,
+            "steps_to_target": None,
+            "path": [],
+            "budget_exceeded": True,
+        }
     if typed_path == -1:
         return {
             "reachable": False,
@@ -169,6 +795,16 @@ def build_path_hint(start_id, start_type, end_id, end_type):
             "path": [],
         }
 
+    if distance_only:
+        steps = len(typed_path) - 1
+        return {
+            "reachable": True,
+            "steps_to_target": steps,
+            "steps_lower_bound": steps,
+            "steps_upper_bound": steps,
+            "path": [],
+        }
+
     return {
         "reachable": True,
         "steps_to_target": len(typed_path) - 1,
@@ -182,8 +818,12 @@ def generate_path(start_id, start_type, end_id, end_type):
     """
     Returns a list of alternating actor/movie IDs connecting start to end, regardless of type.
     start_type/end_type: "actor" or "movie"
+    Returns -1 when no path exists or the search runs out of budget.
     """
-    typed_path = generate_typed_path(start_id, start_type, end_id, end_type)
+    try:
+        typed_path = generate_typed_path(start_id, start_type, end_id, end_type)
+    except PathBudgetExceeded:
+        return -1
     if typed_path == -1:
         return -1
     return [node_id for node_id, _node_type in typed_path]
@@ -222,27 +862,22 @@ def verify_path(path):
 # -----------------------------
 # Optional: Pretty-print a path
 # -----------------------------
-def pretty_print_path(path, start_type="actor"):
+def pretty_print_path(path, start_type="actor", labels=None):
     """
     Converts a path of IDs into readable names from DB.
     start_type: 'actor' or 'movie' (type of first node)
+    labels: optional {(node_id, node_type): label} map from hydrate_node_labels
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    names = []
+    typed_path = []
     curr_type = start_type
     for val in path:
-        if curr_type == "actor":
-            cursor.execute("SELECT name FROM actors WHERE id = ?", (val,))
-            row = cursor.fetchone()
-            names.append(row[0] if row else f"Actor {val}")
-            curr_type = "movie"
-        else:
-            cursor.execute("SELECT title FROM movies WHERE id = ?", (val,))
-            row = cursor.fetchone()
-            names.append(row[0] if row else f"Movie {val}")
-            curr_type = "actor"
-
-    conn.close()
+        typed_path.append((val, curr_type))
+        curr_type = next_node_type(curr_type)
+
+    if labels is None:
+        labels = hydrate_node_labels(typed_path)
+    names = [
+        labels.get(node) or fallback_node_label(*node)
+        for node in typed_path
+    ]
     return " -> ".join(names)
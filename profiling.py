@@ -0,0 +1,301 @@
+"""Opt-in profiling for API requests and CLI runs.
+
+With PROFILING_ENABLED=1, a request sent with ``X-Profile: cprofile`` (or
+``?profile=cprofile``) runs under cProfile and stores a pstats file. ``sample``
+instead runs a sampling profiler that reads the request's thread stacks
+every PROFILE_SAMPLE_INTERVAL_MS and stores speedscope JSON, which costs
+far less for slow requests. Profiles go to PROFILE_DIR (logs/profiles), and the
+response names the file in ``X-Profile-Path``.
+
+The middleware profiles the event loop thread for the whole request, which covers
+routing, validation, and response serialization. Sync endpoints run in a worker
+thread that cProfile cannot see from there, so ProfiledRoute wraps them. The
+wrapper picks up the request's session from a ContextVar and profiles the worker
+thread as well. The per-thread cProfile results are merged when saved. The event
+loop is shared, so profile one request at a time.
+
+The CLI profiles whole scripts:
+
+    python profiling.py --mode sample export_frontend_snapshot.py -- --output /tmp/snapshot.json
+    python profiling.py populate_db.py -- --limit 5
+"""
+
+import argparse
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import re
+import runpy
+import sys
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi.routing import APIRoute
+
+ROOT = Path(__file__).resolve().parent
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").strip().lower() in ("1", "true", "yes")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(ROOT / "logs" / "profiles")))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_active_profile = ContextVar("active_profile", default=None)
+_UNSAFE_FILENAME = re.compile(r"[^0-9A-Za-z_.-]+")
+
+
+class StackSampler:
+    """
+    Samples the stacks of registered threads on a background thread and exports
+    them as a speedscope "sampled" profile. Threads register while they run
+    profiled code, so idle pool threads and other requests are never sampled.
+    """
+
+    def __init__(self, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.thread_ids = set()
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.weights = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.elapsed_ms = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+
+    def _frame_id(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        frame_id = self._frame_index.get(key)
+        if frame_id is None:
+            frame_id = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return frame_id
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                # The event loop thread idles in selectors while a worker thread runs the endpoint.
+                if frame is None or frame.f_code.co_filename.endswith("selectors.py"):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    stack.reverse()
+                    self.samples.append(stack)
+                    self.weights.append(round((now - last) * 1000, 4))
+            last = now
+
+    def to_speedscope(self, name):
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "co-stars profiling.py",
+            "shared": {"frames": self.frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": round(self.elapsed_ms, 4),
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+
+class ProfileSession:
+    def __init__(self, mode, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.profilers = []
+        self.sampler = StackSampler(interval_ms) if mode == "sample" else None
+
+    def start(self):
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def _new_profiler(self):
+        # cProfile.Profile is per thread, so every profiled call gets its own and save() merges them.
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        return profiler
+
+    def run(self, function, *args, **kwargs):
+        """Runs function in the calling thread under this session's profiler."""
+        if self.mode == "cprofile":
+            return self._new_profiler().runcall(function, *args, **kwargs)
+        thread_id = threading.get_ident()
+        self.sampler.thread_ids.add(thread_id)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.sampler.thread_ids.discard(thread_id)
+
+    async def run_async(self, function, *args, **kwargs):
+        if self.mode == "cprofile":
+            profiler = self._new_profiler()
+            profiler.enable()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                profiler.disable()
+        thread_id = threading.get_ident()
+        self.sampler.thread_ids.add(thread_id)
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            self.sampler.thread_ids.discard(thread_id)
+
+    def save(self, label, directory=None):
+        """Writes the profile under directory (PROFILE_DIR by default) and returns its path."""
+        directory = Path(directory or PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        stem = f"{stamp}-{_UNSAFE_FILENAME.sub('_', label).strip('_')[:80]}"
+        if self.mode == "cprofile":
+            path = directory / f"{stem}.prof"
+            pstats.Stats(*self.profilers).dump_stats(str(path))
+        else:
+            path = directory / f"{stem}.speedscope.json"
+            path.write_text(json.dumps(self.sampler.to_speedscope(label)), encoding="utf-8")
+        return path
+
+
+def requested_mode(headers, query_params):
+    """The profile mode a request asked for, or None when profiling is off or the value is unknown."""
+    if not PROFILING_ENABLED:
+        return None
+    mode = (headers.get(PROFILE_HEADER) or query_params.get(PROFILE_QUERY_PARAM) or "").strip().lower()
+    return mode if mode in PROFILE_MODES else None
+
+
+def start_request_profile(mode):
+    session = ProfileSession(mode)
+    session.start()
+    return session, _active_profile.set(session)
+
+
+def finish_request_profile(session, token, label):
+    _active_profile.reset(token)
+    session.stop()
+    return session.save(label)
+
+
+def profiled_endpoint(endpoint):
+    """
+    Wraps a sync endpoint so its worker thread runs under the request's ProfileSession,
+    if one is active. Async endpoints run on the event loop thread, which the
+    middleware already profiles, so they are returned unchanged.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _active_profile.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        return session.run(endpoint, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose sync endpoint can be profiled per request; see profiled_endpoint."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
+
+def profile_script(script, script_args, mode="cprofile", output_dir=None, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+    """Runs a script as __main__ under a ProfileSession and returns (exit code, profile path)."""
+    session = ProfileSession(mode, interval_ms)
+    script_path = Path(script).resolve()
+    previous_argv = sys.argv
+    sys.argv = [str(script_path), *script_args]
+    sys.path.insert(0, str(script_path.parent))
+    exit_code = 0
+    session.start()
+    try:
+        session.run(runpy.run_path, str(script_path), run_name="__main__")
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+    except Exception:
+        # Keep the profile of a failed run; it usually shows where it failed.
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        session.stop()
+        sys.argv = previous_argv
+        sys.path.remove(str(script_path.parent))
+    return exit_code, session.save(script_path.stem, output_dir)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Profile a script run such as export_frontend_snapshot.py or populate_db.py.",
+        epilog="Arguments after -- are passed to the script.",
+    )
+    parser.add_argument("script", help="Python script to run as __main__.")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="Arguments for the script, after --.")
+    parser.add_argument(
+        "--mode",
+        choices=PROFILE_MODES,
+        default="cprofile",
+        help="cprofile writes pstats; sample writes speedscope JSON. Default: cprofile",
+    )
+    parser.add_argument("--output-dir", default=str(PROFILE_DIR), help="Profile directory. Default: logs/profiles")
+    parser.add_argument(
+        "--interval-ms",
+        type=float,
+        default=PROFILE_SAMPLE_INTERVAL_MS,
+        help=f"Sampling interval for --mode sample. Default: {PROFILE_SAMPLE_INTERVAL_MS}",
+    )
+    parser.add_argument("--top", type=int, default=25, help="cProfile functions to print by cumulative time. Default: 25")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    script_args = args.script_args[1:] if args.script_args[:1] == ["--"] else args.script_args
+    exit_code, path = profile_script(args.script, script_args, args.mode, args.output_dir, args.interval_ms)
+    if args.mode == "cprofile":
+        pstats.Stats(str(path)).sort_stats("cumulative").print_stats(args.top)
+    print(f"Wrote {args.mode} profile to {path}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
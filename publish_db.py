@@ -0,0 +1,169 @@
+"""Publish the ingest database as a compacted, read-only serving copy.
+
+``populate_db.py`` and ``backfill_metadata.py`` write to movies.db. Publishing takes
+a consistent snapshot of it with ``VACUUM INTO``, so a transaction that is still
+running is left out. It applies pending schema migrations, runs ANALYZE and a
+quick check, and stores the result as ``movies-<version>.db`` with read-only
+permissions. CURRENT.json is then replaced atomically to point at the new file.
+
+An API started with SERVE_PUBLISHED_DB=1 opens the current version with
+``immutable=1``. The version is part of every content-version cache key, so the
+next request after a publish switches to the new file without a restart. Older
+versions are pruned, keeping ``--keep`` of them for requests still reading one.
+
+    python publish_db.py
+    python publish_db.py --source /data/ingest.db --publish-dir /srv/costars/published --keep 5
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import stat
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import graph_cache
+from db import DB_FILE, PUBLISHED_DB_DIR, PUBLISHED_POINTER, SCHEMA_VERSION, migrate
+from graph_index import load_graph
+
+DEFAULT_KEEP = 3
+READ_ONLY_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def _new_version(directory):
+    # Microseconds keep versions unique and in publish order when sorted by name.
+    while True:
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        if not (directory / f"movies-{version}.db").exists():
+            return version
+
+
+def _write_pointer(directory, record):
+    pointer = directory / PUBLISHED_POINTER
+    temp_pointer = directory / f".{PUBLISHED_POINTER}.tmp"
+    temp_pointer.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    os.replace(temp_pointer, pointer)
+
+
+def list_published_versions(publish_dir=PUBLISHED_DB_DIR):
+    """Published database files in publish_dir, oldest first."""
+    return sorted(Path(publish_dir).glob("movies-*.db"))
+
+
+def prune_published_versions(publish_dir=PUBLISHED_DB_DIR, keep=DEFAULT_KEEP, current=None):
+    """Deletes all but the newest ``keep`` versions, never the current one. Returns the removed paths."""
+    removed = []
+    for path in list_published_versions(publish_dir)[: -keep or None]:
+        if path.name == current:
+            continue
+        path.chmod(stat.S_IRUSR | stat.S_IWUSR)
+        path.unlink()
+        graph_cache.cache_path(path).unlink(missing_ok=True)
+        removed.append(path)
+    return removed
+
+
+def publish(source=DB_FILE, publish_dir=PUBLISHED_DB_DIR, keep=DEFAULT_KEEP):
+    """Publishes source into publish_dir and returns the new CURRENT.json record."""
+    if not Path(source).exists():
+        raise ValueError(f"Source database does not exist: {source}")
+    keep = max(1, keep)
+    directory = Path(publish_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = _new_version(directory)
+    target = directory / f"movies-{version}.db"
+    temp_target = directory / f".movies-{version}.db.tmp"
+    timings = {}
+
+    started = time.perf_counter()
+    source_conn = sqlite3.connect(Path(source).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        source_conn.execute("VACUUM INTO ?", (str(temp_target),))
+    finally:
+        source_conn.close()
+    timings["vacuum_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    try:
+        conn = sqlite3.connect(temp_target)
+        try:
+            step = time.perf_counter()
+            migrations = migrate(conn)
+            conn.execute("ANALYZE")
+            conn.commit()
+            timings["analyze_ms"] = round((time.perf_counter() - step) * 1000, 2)
+            check = conn.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise ValueError(f"Published copy failed PRAGMA quick_check: {check}")
+            counts = {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("actors", "movies", "movie_actors")
+            }
+        finally:
+            conn.close()
+        os.chmod(temp_target, READ_ONLY_MODE)
+        os.replace(temp_target, target)
+        if graph_cache.GRAPH_CACHE_ENABLED:
+            # Workers serving the new version map this instead of building the graph.
+            step = time.perf_counter()
+            graph_cache.save_graph_cache(load_graph(str(target)), str(target))
+            timings["graph_cache_ms"] = round((time.perf_counter() - step) * 1000, 2)
+    except BaseException:
+        if temp_target.exists():
+            temp_target.chmod(stat.S_IRUSR | stat.S_IWUSR)
+            temp_target.unlink()
+        raise
+
+    record = {
+        "version": version,
+        "file": target.name,
+        "published_at": datetime.now(timezone.utc).isoformat(),
+        "source": str(source),
+        "schema_version": SCHEMA_VERSION,
+        "bytes": target.stat().st_size,
+        "actors": counts["actors"],
+        "movies": counts["movies"],
+        "links": counts["movie_actors"],
+        "migrations_applied": [entry["name"] for entry in migrations],
+        "timings": dict(timings, total_ms=round((time.perf_counter() - started) * 1000, 2)),
+    }
+    _write_pointer(directory, record)
+    record["pruned"] = [path.name for path in prune_published_versions(directory, keep, current=target.name)]
+    return record
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compact the ingest database into a versioned, read-only copy for the API to serve."
+    )
+    parser.add_argument("--source", default=DB_FILE, help=f"Ingest database to publish. Default: {DB_FILE}")
+    parser.add_argument(
+        "--publish-dir",
+        default=PUBLISHED_DB_DIR,
+        help=f"Directory for published versions and {PUBLISHED_POINTER}. Default: PUBLISHED_DB_DIR or {PUBLISHED_DB_DIR}",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=DEFAULT_KEEP,
+        help=f"Published versions to keep, including the new one. Default: {DEFAULT_KEEP}",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    record = publish(args.source, args.publish_dir, args.keep)
+    timings = record["timings"]
+    print(
+        f"Published {record['file']} ({record['actors']} actors, {record['movies']} movies, "
+        f"{record['links']} links, {record['bytes']} bytes) in {timings['total_ms']:.2f} ms "
+        f"(VACUUM INTO {timings['vacuum_ms']:.2f} ms, ANALYZE {timings['analyze_ms']:.2f} ms)."
+    )
+    if record["pruned"]:
+        print(f"Pruned {', '.join(record['pruned'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""Opt-in SQL statement timing, slow-query log and full-scan report.
+
+With QUERY_LOG_ENABLED=1, ``metrics.connect`` returns connections whose cursors
+time every statement, from ``execute`` until its rows are fully read. Timings are
+aggregated by normalized SQL, meaning whitespace is collapsed and literals and
+``IN (...)`` lists are replaced by placeholders. Statements slower than SLOW_QUERY_MS
+are appended to SLOW_QUERY_LOG with their ``EXPLAIN QUERY PLAN``.
+``GET /api/metrics/queries`` returns the aggregates.
+
+The report explains every aggregated statement against the database and flags
+full table scans and temporary sort trees:
+
+    python query_log.py                       # runs a workload of the repo's own queries
+    python query_log.py --stats stats.json    # saved output of GET /api/metrics/queries
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+DB_FILE = "movies.db"
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "").strip().lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG = Path(os.getenv("SLOW_QUERY_LOG", str(ROOT / "logs" / "slow-queries.jsonl")))
+MAX_LOGGED_PARAMS = 20
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Collapses whitespace and replaces literals and IN lists, so one query shape aggregates as one entry."""
+    text = _STRING_LITERAL.sub("?", sql)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _IN_LIST.sub("IN (...)", text)
+
+
+class QueryStats:
+    """Per normalized statement: executions, total/max latency, slow executions and one raw example."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, sql, elapsed_ms, slow=False):
+        normalized = normalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(normalized)
+            if entry is None:
+                entry = self._entries[normalized] = {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "slow_count": 0,
+                    "sample_sql": sql,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["slow_count"] += int(slow)
+
+    def snapshot(self):
+        """Entries sorted by total time, heaviest first."""
+        with self._lock:
+            entries = [dict(entry, sql=normalized) for normalized, entry in self._entries.items()]
+        for entry in entries:
+            entry["mean_ms"] = round(entry["total_ms"] / entry["count"], 4)
+            entry["total_ms"] = round(entry["total_ms"], 4)
+            entry["max_ms"] = round(entry["max_ms"], 4)
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+QUERY_STATS = QueryStats()
+_slow_log_lock = threading.Lock()
+
+
+def explain_plan(conn, sql, params=None):
+    """
+    EXPLAIN QUERY PLAN detail lines for sql. Without params every placeholder is
+    bound to NULL, which does not change SQLite's choice of indexes.
+    """
+    try:
+        cursor = sqlite3.Cursor(conn)
+        if params is None:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * sql.count("?"))
+        else:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        rows = cursor.fetchall()
+        cursor.close()
+    except sqlite3.Error as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    """Plan lines that read a whole table or index instead of searching it."""
+    return [line for line in plan if line.startswith("SCAN ") and line != "SCAN CONSTANT ROW"]
+
+
+def temp_sorts(plan):
+    return [line for line in plan if line.startswith("USE TEMP B-TREE")]
+
+
+def _loggable_params(params):
+    if isinstance(params, dict):
+        return {key: params[key] for key in list(params)[:MAX_LOGGED_PARAMS]}
+    return list(params or ())[:MAX_LOGGED_PARAMS]
+
+
+def log_slow_query(conn, sql, params, elapsed_ms):
+    plan = explain_plan(conn, sql, params)
+    entry = {
+        "logged_at": datetime.now(timezone.utc).isoformat(),
+        "elapsed_ms": round(elapsed_ms, 3),
+        "sql": normalize_sql(sql),
+        "params": _loggable_params(params),
+        "plan": plan,
+        "full_scans": full_scans(plan),
+    }
+    with _slow_log_lock:
+        SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+        with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, default=str) + "\n")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Times each statement from execute until its rows are exhausted, the cursor runs
+    another statement, or it is closed, so the time spent stepping a SELECT counts.
+    """
+
+    _pending = None
+
+    def _start(self, sql, params):
+        self._finish()
+        self._pending = [sql, params, 0.0]
+
+    def _add(self, started):
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        sql, params, seconds = pending
+        elapsed_ms = seconds * 1000
+        slow = elapsed_ms >= SLOW_QUERY_MS
+        QUERY_STATS.record(sql, elapsed_ms, slow)
+        if slow:
+            log_slow_query(self.connection, sql, params, elapsed_ms)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._add(started)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None)
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._add(started)
+            self._finish()
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._add(started)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add(started)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._add(started)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(started)
+            self._finish()
+            raise
+        self._add(started)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection factory for sqlite3.connect whose cursors, including conn.execute's,
+    are instrumented. Closing it finishes statements whose rows were not all read.
+    """
+
+    _cursors = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        if self._cursors is None:
+            self._cursors = weakref.WeakSet()
+        self._cursors.add(cursor)
+        return cursor
+
+    def close(self):
+        for cursor in list(self._cursors or ()):
+            if isinstance(cursor, InstrumentedCursor):
+                cursor._finish()
+        super().close()
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def run_workload(samples=20, seed=0, db_file=DB_FILE):
+    """
+    Calls the SQL-backed lookups of db_helper, path_utils and versus_game against
+    db_file with sampled ids, names and titles. Returns the aggregated statements.
+    """
+    import db_helper
+    import path_utils
+    import query_log  # metrics.connect reads this module, which is not __main__ when run as a script
+    import versus_game
+
+    conn = sqlite3.connect(db_file)
+    links = conn.execute(
+        """
+        SELECT ma.movie_id, ma.actor_id, m.title, a.name
+        FROM movie_actors ma
+        JOIN movies m ON m.id = ma.movie_id
+        JOIN actors a ON a.id = ma.actor_id
+        """
+    ).fetchall()
+    conn.close()
+    if not links:
+        raise ValueError(f"{db_file} has no movie_actors rows to sample")
+    picked = random.Random(seed).sample(links, min(samples, len(links)))
+
+    modules = (db_helper, path_utils, versus_game)
+    previous_db_files = [module.DB_FILE for module in modules]
+    previous = query_log.QUERY_LOG_ENABLED
+    for module in modules:
+        module.DB_FILE = db_file
+    query_log.QUERY_LOG_ENABLED = True
+    query_log.QUERY_STATS.reset()
+    try:
+        db_helper.get_all_actors()
+        db_helper.get_all_movies()
+        for movie_id, actor_id, title, name in picked:
+            db_helper.get_actor_by_id(actor_id)
+            db_helper.get_movie_by_id(movie_id)
+            db_helper.movie_exists_by_title(title)
+            versus_game.get_actor_details_by_name(name)
+            versus_game.get_movie_by_title(title)
+            versus_game.get_all_movies_for_actor(actor_id)
+            versus_game.get_all_costars_for_movie_with_popularity(movie_id, [name])
+            path_utils.validate_named_path([name, title])
+            path_utils.verify_path([actor_id, movie_id, actor_id])
+            path_utils.hydrate_node_labels([(actor_id, "actor"), (movie_id, "movie")])
+    finally:
+        query_log.QUERY_LOG_ENABLED = previous
+        for module, previous_db_file in zip(modules, previous_db_files):
+            module.DB_FILE = previous_db_file
+    return query_log.QUERY_STATS.snapshot()
+
+
+def build_report(entries, db_file=DB_FILE):
+    """Adds each entry's query plan, full scans and temp sorts, explained against db_file."""
+    conn = sqlite3.connect(db_file)
+    try:
+        report = []
+        for entry in entries:
+            plan = explain_plan(conn, entry["sample_sql"])
+            report.append(dict(entry, plan=plan, full_scans=full_scans(plan), temp_sorts=temp_sorts(plan)))
+        return report
+    finally:
+        conn.close()
+
+
+def print_report(report):
+    flagged = [entry for entry in report if entry["full_scans"]]
+    print(f"{len(report)} statements, {len(flagged)} with full scans")
+    for entry in report:
+        marker = "FULL SCAN" if entry["full_scans"] else "ok"
+        print()
+        print(
+            f"[{marker}] count={entry['count']} total={entry['total_ms']:.2f}ms "
+            f"mean={entry['mean_ms']:.3f}ms max={entry['max_ms']:.3f}ms slow={entry['slow_count']}"
+        )
+        print(f"  {entry['sql']}")
+        for line in entry["plan"]:
+            print(f"    {line}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Report per-statement SQL timings and flag full table scans.")
+    parser.add_argument(
+        "--stats",
+        help="JSON saved from GET /api/metrics/queries. Default: run a workload of the repo's queries on --db-file",
+    )
+    parser.add_argument("--db-file", default=DB_FILE, help="Database the workload runs on and EXPLAIN QUERY PLAN reads. Default: movies.db")
+    parser.add_argument("--samples", type=int, default=20, help="Sampled links for the workload. Default: 20")
+    parser.add_argument("--seed", type=int, default=0, help="Workload sampling seed. Default: 0")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument("--fail-on-scan", action="store_true", help="Exit with status 1 when any statement scans a table.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.stats:
+        with open(args.stats, encoding="utf-8") as handle:
+            entries = json.load(handle)["queries"]
+    else:
+        entries = run_workload(args.samples, args.seed, args.db_file)
+
+    report = build_report(entries, args.db_file)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if args.fail_on_scan and any(entry["full_scans"] for entry in report) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
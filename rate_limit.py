@@ -0,0 +1,120 @@
+"""Per-client token-bucket rate limits for the expensive endpoints.
+
+Each client gets one bucket per scope. ``path`` covers ``/api/path/*``, and
+``hints`` covers suggestion requests that ask for path hints. A bucket holds up to
+``burst`` tokens and refills at ``rate`` tokens per second. A request takes one
+token or is answered 429 with a Retry-After of the time until the next token.
+
+Buckets live in a backend object with a single method,
+``take(key, rate, burst, cost=1)``, which returns ``(allowed, retry_after_seconds)``.
+The default ``memory`` backend keeps them in this process. Set RATE_LIMIT_BACKEND to
+``package.module:factory`` to plug in another store, such as one shared by several
+workers. The factory is called with no arguments.
+
+Limits are off unless RATE_LIMIT_ENABLED=1, and a scope whose rate is 0 is never
+limited. Clients are identified by their socket address, or with
+RATE_LIMIT_TRUST_FORWARDED=1 by the first X-Forwarded-For entry set by a trusted proxy.
+"""
+
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "").strip().lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip() or "memory"
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "").strip().lower() in ("1", "true", "yes")
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# scope: (tokens per second, burst)
+DEFAULT_LIMITS = {
+    "path": (
+        float(os.getenv("RATE_LIMIT_PATH_PER_SECOND", "5")),
+        float(os.getenv("RATE_LIMIT_PATH_BURST", "20")),
+    ),
+    "hints": (
+        float(os.getenv("RATE_LIMIT_HINTS_PER_SECOND", "10")),
+        float(os.getenv("RATE_LIMIT_HINTS_BURST", "40")),
+    ),
+}
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in a dict behind one lock. Past max_clients buckets, the least
+    recently used one is dropped; a dropped client starts again with a full bucket.
+    """
+
+    def __init__(self, max_clients=RATE_LIMIT_MAX_CLIENTS, clock=time.monotonic):
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return True, 0.0
+        return False, (cost - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def load_backend(spec=RATE_LIMIT_BACKEND):
+    """Builds the bucket store named by spec: "memory" or "package.module:factory"."""
+    if spec == "memory":
+        return MemoryBucketStore()
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"RATE_LIMIT_BACKEND must be 'memory' or 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+def client_id(request, trust_forwarded=None):
+    if trust_forwarded is None:
+        trust_forwarded = RATE_LIMIT_TRUST_FORWARDED
+    if trust_forwarded:
+        forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """Applies per-scope limits to clients; the backend is created on first use."""
+
+    def __init__(self, limits=None, backend=None, enabled=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.enabled = RATE_LIMIT_ENABLED if enabled is None else enabled
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = load_backend()
+        return self._backend
+
+    def check(self, scope, client, cost=1):
+        """Returns (allowed, retry_after_seconds) for one request from client in scope."""
+        rate, burst = self.limits.get(scope, (0, 0))
+        if not self.enabled or rate <= 0:
+            return True, 0.0
+        allowed, retry_after = self.backend.take(f"{scope}:{client}", rate, burst, cost)
+        if not allowed:
+            metrics.METRICS.increment("rate_limited_total", labels=(("scope", scope),))
+        return allowed, retry_after
@@ -31,6 +31,13 @@ TEST_SUITES = [
         "requires_server": False,
         "description": "Core pathfinding and normalization tests.",
     },
+    {
+        "key": "bench-unit",
+        "name": "Bench Suite Tests",
+        "command": [sys.executable, "test_bench_suite.py"],
+        "requires_server": False,
+        "description": "Synthetic graph generation and baseline comparison tests.",
+    },
     {
         "key": "api-smoke",
         "name": "API Smoke Test",
@@ -38,6 +45,14 @@ TEST_SUITES = [
         "requires_server": True,
         "description": "Live HTTP checks against a running FastAPI server.",
     },
+    {
+        "key": "bench",
+        "name": "Benchmarks",
+        "command": [sys.executable, "bench_suite.py"],
+        "requires_server": False,
+        "opt_in": True,
+        "description": "Hot-path latency and memory benchmarks compared against bench_baseline.json.",
+    },
 ]
 
 
@@ -185,6 +200,11 @@ def main():
         action="store_true",
         help="Skip api_smoke_test.py when the FastAPI server is not running.",
     )
+    parser.add_argument(
+        "--bench",
+        action="store_true",
+        help="Also run bench_suite.py and fail on regressions against bench_baseline.json.",
+    )
     args = parser.parse_args()
 
     print_header("Co-Stars Backend Test Runner")
@@ -193,14 +213,19 @@ def main():
 
     results = []
     for suite in TEST_SUITES:
+        skip = None
         if args.skip_smoke and suite["requires_server"]:
+            skip = ("Smoke test skipped by --skip-smoke.", "Requires a running FastAPI server at http://localhost:8000.")
+        elif suite.get("opt_in") and not args.bench:
+            skip = ("Benchmarks skipped; pass --bench to run them.", "Opt-in suite.")
+        if skip:
             result = {
                 "name": suite["name"],
                 "command": suite["command"],
                 "duration": 0.0,
                 "returncode": None,
                 "status": "SKIPPED",
-                "output": "Smoke test skipped by --skip-smoke.",
+                "output": skip[0],
                 "summary": None,
             }
             print_suite_output(
@@ -211,7 +236,7 @@ def main():
                 result["output"],
                 None,
                 skipped=True,
-                skip_reason="Requires a running FastAPI server at http://localhost:8000.",
+                skip_reason=skip[1],
             )
             results.append(result)
             continue
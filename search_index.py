@@ -0,0 +1,239 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+
+import data_watcher
+from db import connect, get_content_version
+
+DB_FILE = "movies.db"
+# Postings longer than this are not counted: very common trigrams ("the", " ma") add
+# cost without discriminating, and short queries are served by the prefix index instead.
+MAX_COMMON_POSTINGS = 1000
+CANDIDATE_POOL_SIZE = 32
+PREFIX_SCAN_LIMIT = 2000
+PREFIX_POOL_SIZE = 32
+# Prefixes up to this length keep a precomputed most-popular list, since their ranges are huge.
+SHORT_PREFIX_LENGTH = 3
+POPULARITY_WEIGHT = 0.15
+PREFIX_BONUS = 0.5
+WORD_PREFIX_BONUS = 0.3
+
+_index_lock = threading.Lock()
+_index_cache = {}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(text):
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', text)
+        if not unicodedata.combining(c)
+    ).lower()
+
+
+def search_key(text):
+    """normalize_text output with punctuation folded to single spaces, used for every index lookup."""
+    return _NON_ALNUM.sub(" ", normalize_text(text)).strip()
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Fuzzy and prefix search over actor names and movie titles.
+
+    Entries are stored column-wise. A trigram inverted index (trigram -> array of
+    entry ids) finds fuzzy candidates, and a sorted list of every word-start suffix
+    of every key acts as a flattened prefix trie for autocomplete: a bisect
+    finds the block of keys sharing a prefix. Results rank by trigram similarity plus
+    prefix bonuses, with popularity as a tiebreaking boost.
+    """
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.ids = []
+        self.types = []
+        self.labels = []
+        self.keys = []
+        self.popularity = []
+        self._entry_by_node = {}
+        postings = {}
+        suffixes = []
+
+        for node_id, node_type, label, popularity in entries:
+            if not isinstance(label, str):
+                continue
+            key = search_key(label)
+            if not key:
+                continue
+            entry = len(self.ids)
+            self.ids.append(node_id)
+            self.types.append(node_type)
+            self.labels.append(label)
+            self.keys.append(key)
+            self.popularity.append(popularity or 0.0)
+            self._entry_by_node[(node_id, node_type)] = entry
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(entry)
+            suffixes.append((key, entry))
+            for match in re.finditer(" ", key):
+                suffixes.append((key[match.end() :], entry))
+
+        self.postings = {gram: array("i", entries) for gram, entries in postings.items()}
+        suffixes.sort()
+        self._suffix_keys = [suffix for suffix, _entry in suffixes]
+        self._suffix_entries = array("i", [entry for _suffix, entry in suffixes])
+
+        max_popularity = max(self.popularity, default=0.0)
+        scale = math.log1p(max_popularity) or 1.0
+        self._popularity_boost = [
+            POPULARITY_WEIGHT * math.log1p(max(popularity, 0.0)) / scale for popularity in self.popularity
+        ]
+        self._short_prefix_top = self._build_short_prefix_top()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, node_id, node_type):
+        """Returns (label, popularity) for an indexed node, or None."""
+        entry = self._entry_by_node.get((node_id, node_type))
+        if entry is None:
+            return None
+        return self.labels[entry], self.popularity[entry]
+
+    def _build_short_prefix_top(self):
+        buckets = {}
+        for suffix, entry in zip(self._suffix_keys, self._suffix_entries):
+            for length in range(1, SHORT_PREFIX_LENGTH + 1):
+                if len(suffix) >= length:
+                    buckets.setdefault(suffix[:length], set()).add(entry)
+        return {
+            prefix: heapq.nlargest(PREFIX_POOL_SIZE, entries, key=self.popularity.__getitem__)
+            for prefix, entries in buckets.items()
+        }
+
+    def _prefix_entries(self, key):
+        if len(key) <= SHORT_PREFIX_LENGTH:
+            return self._short_prefix_top.get(key, [])
+        start = bisect.bisect_left(self._suffix_keys, key)
+        stop = min(len(self._suffix_keys), start + PREFIX_SCAN_LIMIT)
+        stop = bisect.bisect_left(self._suffix_keys, key + "\uffff", start, stop)
+        return heapq.nlargest(PREFIX_POOL_SIZE, set(self._suffix_entries[start:stop]), key=self.popularity.__getitem__)
+
+    def _trigram_candidates(self, query_grams):
+        lists = sorted(
+            (self.postings[gram] for gram in query_grams if gram in self.postings),
+            key=len,
+        )
+        counts = {}
+        for entries in lists:
+            if len(entries) > MAX_COMMON_POSTINGS:
+                break
+            for entry in entries:
+                counts[entry] = counts.get(entry, 0) + 1
+        return heapq.nlargest(CANDIDATE_POOL_SIZE, counts, key=counts.__getitem__)
+
+    def _score(self, entry, key, query_grams):
+        candidate_key = self.keys[entry]
+        candidate_grams = trigrams(candidate_key)
+        similarity = 2 * len(query_grams & candidate_grams) / (len(query_grams) + len(candidate_grams))
+        if candidate_key.startswith(key):
+            similarity += PREFIX_BONUS
+        elif f" {key}" in f" {candidate_key}":
+            similarity += WORD_PREFIX_BONUS
+        return similarity
+
+    def search(self, query, node_type=None, limit=10, restrict_to=None, min_score=0.0):
+        """
+        Returns up to ``limit`` result dicts ({id, type, label, popularity, score}),
+        best first. restrict_to: optional iterable of (id, type) keys to rank instead
+        of searching the whole catalog, e.g. the legal write-ins for a move.
+        """
+        key = search_key(query or "")
+        if not key:
+            return []
+        query_grams = trigrams(key)
+
+        if restrict_to is not None:
+            candidates = {self._entry_by_node[node] for node in restrict_to if node in self._entry_by_node}
+        else:
+            candidates = set(self._trigram_candidates(query_grams))
+            candidates.update(self._prefix_entries(key))
+
+        scored = []
+        for entry in candidates:
+            if node_type is not None and self.types[entry] != node_type:
+                continue
+            score = self._score(entry, key, query_grams)
+            if score < min_score:
+                continue
+            scored.append((score + self._popularity_boost[entry], score, entry))
+
+        results = []
+        for ranked, score, entry in heapq.nlargest(limit, scored):
+            results.append(
+                {
+                    "id": self.ids[entry],
+                    "type": self.types[entry],
+                    "label": self.labels[entry],
+                    "popularity": self.popularity[entry],
+                    "score": round(ranked, 4),
+                }
+            )
+        return results
+
+
+def load_search_index(db_file=None):
+    db_file = db_file or DB_FILE
+    version = get_content_version(db_file)
+    conn = connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name, popularity FROM actors")
+    entries = [(actor_id, "actor", name, popularity) for actor_id, name, popularity in cursor.fetchall()]
+    # Movies have no popularity column; rank them by their most popular cast member.
+    cursor.execute(
+        """
+        SELECT m.id, m.title, MAX(a.popularity)
+        FROM movies m
+        LEFT JOIN movie_actors ma ON ma.movie_id = m.id
+        LEFT JOIN actors a ON a.id = ma.actor_id
+        GROUP BY m.id
+        """
+    )
+    entries.extend((movie_id, "movie", title, popularity) for movie_id, title, popularity in cursor.fetchall())
+    conn.close()
+    return SearchIndex(entries, version=version)
+
+
+def get_search_index(db_file=None):
+    """
+    Returns the shared SearchIndex for db_file, rebuilding it when the database content
+    version changes. Every call within one API request returns the same index.
+    """
+    db_file = db_file or DB_FILE
+    return data_watcher.pinned(("search_index", db_file), lambda: _current_search_index(db_file))
+
+
+def _current_search_index(db_file):
+    version = get_content_version(db_file)
+    index = _index_cache.get(db_file)
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        index = _index_cache.get(db_file)
+        if index is None or index.version != version:
+            index = load_search_index(db_file)
+            _index_cache[db_file] = index
+    return index
+
+
+def clear_search_index_cache():
+    with _index_lock:
+        _index_cache.clear()
@@ -0,0 +1,74 @@
+"""Coalesce concurrent identical computations.
+
+Twenty clients asking for the frontend snapshot, or for the same path pair, at
+the same moment would otherwise each build the same result. A SingleFlight runs
+the first caller's computation and hands its result, or its exception, to every
+caller that arrives with the same key while it is still running. Nothing is kept
+once the computation finishes; caching stays with the callers.
+
+Followers share the leader's result object, so callers must treat it as read-only.
+A failed computation is raised in each follower as its own copy of the leader's
+exception, chained to the original, so concurrent raises never share a traceback.
+"""
+
+import threading
+
+import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _follower_error(error):
+    """Returns a new exception of error's type with its args and attributes, without calling __init__."""
+    fresh = type(error).__new__(type(error), *error.args)
+    fresh.__dict__.update(error.__dict__)
+    return fresh
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, compute):
+        """Returns compute(), or the result of the identical compute() already running under key."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            metrics.increment("single_flight_shared_total")
+            call.done.wait()
+            if call.error is not None:
+                raise _follower_error(call.error) from call.error
+            return call.result
+
+        try:
+            call.result = compute()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
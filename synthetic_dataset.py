@@ -0,0 +1,342 @@
+"""Deterministic production-scale synthetic datasets for scale tests and benchmarks.
+
+Writes a full-schema actor/movie database of 10k, 100k, or 1M nodes with no TMDB
+access. The shape follows the real data:
+
+- cast sizes are power-law (ci_seed_db.synthetic_cast_sizes), capped at MAX_CAST_SIZE;
+- every actor gets a Pareto casting weight, so filmography lengths are heavy-tailed
+  and popularity tracks how often an actor is cast;
+- names, titles, overviews, and biographies are composed from word lists, with text
+  lengths in the same range as enriched TMDB records. Some fields are empty or null
+  at roughly the real data's rate.
+
+Rows are generated and inserted in batches, so a 1M-node dataset never sits in memory.
+Each table has its own random stream keyed by the seed, so a given seed always
+writes the same database.
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import string
+import time
+from array import array
+
+from ci_seed_db import synthetic_cast_sizes
+from db import init_db, migrate
+
+SCALE_PRESETS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_DB_FILE = "synthetic.db"
+# Share of nodes that are actors; enriched TMDB casts give roughly four actors per movie.
+ACTOR_SHARE = 0.8
+MEAN_CAST_SIZE = 12
+MAX_CAST_SIZE = 250
+CASTING_WEIGHT_ALPHA = 1.8
+MAX_CASTING_WEIGHT = 200.0
+BATCH_SIZE = 10_000
+SENTENCE_POOL_SIZE = 2000
+BIOGRAPHY_EMPTY_RATE = 0.3
+OVERVIEW_EMPTY_RATE = 0.03
+
+FIRST_NAMES = """
+Aaron Abigail Adam Adrian Aisha Alan Alice Amanda Amber Andre Andrea Angela Anna Anthony Ava Ben Beth Brad
+Brian Bruce Carla Carlos Carmen Catherine Charles Charlotte Chloe Chris Claire Colin Daniel David Denise Diane
+Dominic Dylan Edward Elena Eli Elizabeth Emily Emma Eric Ethan Eva Felix Fiona Frank Gabriel Gemma George Grace
+Hannah Harold Harry Helen Henry Holly Hugo Ian Isaac Isabel Jack Jacob James Jane Jason Javier Jean Jennifer
+Jessica Joan John Jonah Jose Julia Julian Karen Kate Kenji Kevin Laura Leah Leo Liam Linda Lucas Lucy Luis Maria
+Mark Martin Maya Megan Michael Mia Nadia Naomi Nathan Nicole Noah Olivia Oscar Owen Paul Paula Peter Priya Rachel
+Ravi Rebecca Richard Rita Robert Rosa Ruth Ryan Samuel Sara Sean Simon Sofia Stephen Susan Thomas Tom Valerie
+Victor Vincent Walter William Yuki Zoe
+""".split()
+
+LAST_NAMES = """
+Abbott Adams Alvarez Anderson Baker Banks Barnes Bell Bennett Brooks Brown Bryant Burke Campbell Carter Castillo
+Chen Clark Cole Collins Cooper Cruz Davies Davis Diaz Dixon Doyle Duncan Edwards Ellis Evans Fischer Fisher Fleming
+Foster Fox Garcia Gibson Gordon Graham Grant Gray Green Griffin Hall Hamilton Harper Harris Hayes Hill Holmes
+Howard Hughes Hunt Jackson James Jensen Johnson Jones Kapoor Keller Kelly Kennedy Khan Kim King Knight Lambert Lee
+Lewis Lopez Marshall Martin Mason Meyer Miller Mitchell Moore Morales Morgan Murphy Murray Nakamura Nelson Novak
+Nguyen Obi Ortiz Owens Palmer Park Parker Patel Perez Perry Phillips Porter Price Quinn Ramirez Reed Reyes Reynolds
+Rivera Roberts Robinson Rossi Russell Ryan Sanchez Santos Schmidt Scott Shaw Silva Simmons Singh Smith Stewart
+Sullivan Tanaka Taylor Thompson Torres Turner Walker Wallace Ward Watson Webb White Williams Wilson Wood Wright
+Young
+""".split()
+
+TITLE_ADJECTIVES = """
+Silent Broken Golden Hidden Last Lost Midnight Crimson Distant Eternal Fallen Final Frozen Hollow Iron Burning
+Wild Quiet Savage Secret Shattered Silver Scarlet Velvet Wicked Endless Forgotten Restless Bitter Dark Bright
+Little Long Northern Southern Electric Sacred Steel Twisted
+""".split()
+
+TITLE_NOUNS = """
+Road River Kingdom Heart Promise Garden Mirror Shadow Storm Summer Winter Harbor Highway Empire Witness Frontier
+Signal Orchard Circle Crown Current Echo Engine Horizon Island Legacy Lighthouse Machine Memory Motel Ocean
+Paradise Passage Prophet Reckoning Requiem Season Stranger Tide Valley Voyage Border Alibi Ransom Verdict
+""".split()
+
+TITLE_PLACES = """
+Brooklyn Tangier Memphis Lisbon Nevada Kyoto Marseille Montana Havana Berlin Oslo Bombay Palermo Dakota Galway
+Saigon Detroit Tucson Vienna Yukon
+""".split()
+
+TITLE_PATTERNS = (
+    "The {adjective} {noun}",
+    "{adjective} {noun}",
+    "The {noun} of {place}",
+    "{noun} in {place}",
+    "A {adjective} {noun}",
+    "{place}",
+    "{noun}: The {adjective} {noun2}",
+    "The {noun}",
+)
+
+SEQUEL_SUFFIXES = ("II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X")
+
+TEXT_WORDS = """
+a an the and but with without after before during across against toward under over into from about
+family city war love secret past future career town friend brother sister mother father stranger detective
+soldier journalist musician teacher doctor thief lawyer pilot farmer crew rival partner neighbor
+discovers finds confronts escapes follows hides joins leaves loses meets protects returns risks seeks survives
+trusts uncovers betrays chases defends rebuilds
+dangerous desperate unlikely ambitious reluctant mysterious ordinary young aging former small remote
+coastal crumbling glamorous troubled unexpected violent quiet fragile
+night summer journey conspiracy fortune heist trial storm election fire wedding funeral ransom border
+festival island hospital studio precinct newsroom factory harbor kingdom
+""".split()
+
+GENRES = (
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family", "Fantasy", "History",
+    "Horror", "Music", "Mystery", "Romance", "Science Fiction", "TV Movie", "Thriller", "War", "Western",
+)
+LANGUAGES = (("en", 70), ("fr", 6), ("es", 5), ("ja", 4), ("de", 3), ("it", 3), ("ko", 3), ("hi", 3), ("zh", 3))
+CONTENT_RATINGS = (("PG-13", 30), ("R", 35), ("PG", 15), ("G", 4), ("NR", 6), (None, 10))
+DEPARTMENTS = (("Acting", 92), ("Directing", 3), ("Writing", 2), ("Production", 2), ("Sound", 1))
+BIRTHPLACES = (
+    "Los Angeles, California, USA", "New York City, New York, USA", "London, England, UK", "Toronto, Ontario, Canada",
+    "Sydney, New South Wales, Australia", "Dublin, Ireland", "Paris, France", "Mumbai, Maharashtra, India",
+    "Seoul, South Korea", "Tokyo, Japan", "Madrid, Spain", "Mexico City, Mexico", "Chicago, Illinois, USA",
+    "Berlin, Germany", "Rome, Italy", "Auckland, New Zealand", "Glasgow, Scotland, UK", "Houston, Texas, USA",
+)
+PATH_ALPHABET = string.ascii_letters + string.digits
+
+
+def _weighted(rng, choices):
+    return rng.choices([value for value, _weight in choices], weights=[weight for _value, weight in choices])[0]
+
+
+def _unique_label(base, occurrences, variants):
+    """
+    Returns base on its first use and the next variant after that, so labels stay
+    unique and keep the same shape. variants(base, n) builds the n-th duplicate.
+    """
+    count = occurrences.get(base, 0)
+    occurrences[base] = count + 1
+    return base if count == 0 else variants(base, count)
+
+
+def _name_variant(base, count):
+    # 26 middle initials, then two initials, then numbered.
+    first, last = base.split(" ", 1)
+    if count <= 26:
+        return f"{first} {string.ascii_uppercase[count - 1]}. {last}"
+    count -= 27
+    if count < 26 * 26:
+        return f"{first} {string.ascii_uppercase[count // 26]}. {string.ascii_uppercase[count % 26]}. {last}"
+    return f"{base} {count}"
+
+
+def _title_variant(base, count):
+    if count <= len(SEQUEL_SUFFIXES):
+        return f"{base} {SEQUEL_SUFFIXES[count - 1]}"
+    return f"{base} ({count + 1})"
+
+
+def _sentence_pool(rng):
+    pool = []
+    for _ in range(SENTENCE_POOL_SIZE):
+        words = [rng.choice(TEXT_WORDS) for _ in range(rng.randint(8, 22))]
+        pool.append(" ".join(words).capitalize() + ".")
+    return pool
+
+
+def _text(rng, pool, min_length, max_length):
+    target = rng.randint(min_length, max_length)
+    parts = []
+    length = 0
+    while length < target:
+        sentence = rng.choice(pool)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)
+
+
+def _image_path(rng):
+    return "/" + "".join(rng.choices(PATH_ALPHABET, k=27)) + ".jpg"
+
+
+def _date(rng, first_year, last_year):
+    return f"{rng.randint(first_year, last_year)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def casting_weights(actor_count, rng):
+    """Pareto casting weight per actor position; an actor's expected filmography length is proportional to it."""
+    return array("d", (min(rng.paretovariate(CASTING_WEIGHT_ALPHA), MAX_CASTING_WEIGHT) for _ in range(actor_count)))
+
+
+def iter_actor_rows(weights, rng):
+    pool = _sentence_pool(rng)
+    occurrences = {}
+    for position, weight in enumerate(weights):
+        name = _unique_label(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", occurrences, _name_variant)
+        birth_year = rng.randint(1920, 2010)
+        yield (
+            position + 1,
+            name,
+            round(0.6 + weight * rng.uniform(0.8, 1.6), 3),
+            f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else None,
+            _date(rng, birth_year + 40, 2025) if birth_year < 1960 and rng.random() < 0.3 else None,
+            rng.choice(BIRTHPLACES) if rng.random() < 0.65 else None,
+            "" if rng.random() < BIOGRAPHY_EMPTY_RATE else _text(rng, pool, 120, 1800),
+            _image_path(rng) if rng.random() < 0.6 else None,
+            _weighted(rng, DEPARTMENTS),
+        )
+
+
+def iter_movie_rows(movie_count, rng):
+    pool = _sentence_pool(rng)
+    occurrences = {}
+    for movie_id in range(1, movie_count + 1):
+        base = rng.choice(TITLE_PATTERNS).format(
+            adjective=rng.choice(TITLE_ADJECTIVES),
+            noun=rng.choice(TITLE_NOUNS),
+            noun2=rng.choice(TITLE_NOUNS),
+            place=rng.choice(TITLE_PLACES),
+        )
+        # Release years skew recent, like the TMDB catalog.
+        year = 2025 - int(min(rng.expovariate(1 / 18), 105))
+        yield (
+            movie_id,
+            _unique_label(base, occurrences, _title_variant),
+            f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            json.dumps(rng.sample(GENRES, rng.randint(1, 3))),
+            "" if rng.random() < OVERVIEW_EMPTY_RATE else _text(rng, pool, 80, 600),
+            _image_path(rng) if rng.random() < 0.9 else None,
+            _weighted(rng, LANGUAGES),
+            _weighted(rng, CONTENT_RATINGS),
+        )
+
+
+def iter_relationships(movie_count, weights, rng, mean_cast_size=MEAN_CAST_SIZE):
+    actor_ids = range(1, len(weights) + 1)
+    cum_weights = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cum_weights.append(total)
+    sizes = synthetic_cast_sizes(movie_count, mean_cast_size, "powerlaw", rng, min(MAX_CAST_SIZE, len(weights)))
+    for movie_id, size in enumerate(sizes, start=1):
+        cast = set()
+        while len(cast) < size:
+            cast.update(rng.choices(actor_ids, cum_weights=cum_weights, k=size - len(cast)))
+        for actor_id in sorted(cast):
+            yield movie_id, actor_id
+
+
+def _insert_batches(conn, sql, rows, batch_size):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def generate_dataset(db_file, nodes, seed=0, mean_cast_size=MEAN_CAST_SIZE, batch_size=BATCH_SIZE):
+    """Recreates db_file with a synthetic dataset of about ``nodes`` actors plus movies. Returns row counts and timings."""
+    actor_count = max(2, int(nodes * ACTOR_SHARE))
+    movie_count = max(1, nodes - actor_count)
+    started = time.perf_counter()
+
+    init_db(db_file, migrate_schema=False)
+    conn = sqlite3.connect(db_file)
+    # The file is rebuilt from scratch on any failure, so skip the journal while loading.
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    weights = casting_weights(actor_count, random.Random(f"{seed}:weights"))
+    actors = _insert_batches(
+        conn,
+        """
+        INSERT INTO actors (
+            id, name, popularity, birthday, deathday, place_of_birth, biography, profile_path, known_for_department
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        iter_actor_rows(weights, random.Random(f"{seed}:actors")),
+        batch_size,
+    )
+    movies = _insert_batches(
+        conn,
+        """
+        INSERT INTO movies (
+            id, title, release_date, genres_json, overview, poster_path, original_language, content_rating
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        iter_movie_rows(movie_count, random.Random(f"{seed}:movies")),
+        batch_size,
+    )
+    links = _insert_batches(
+        conn,
+        "INSERT INTO movie_actors (movie_id, actor_id) VALUES (?, ?)",
+        iter_relationships(movie_count, weights, random.Random(f"{seed}:links"), mean_cast_size),
+        batch_size,
+    )
+    conn.commit()
+    # Indexes are built once over the loaded rows instead of maintained per insert.
+    migrate(conn)
+    conn.close()
+    return {
+        "db_file": str(db_file),
+        "actors": actors,
+        "movies": movies,
+        "links": links,
+        "seed": seed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Write a deterministic synthetic actor/movie database at production scale."
+    )
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=sorted(SCALE_PRESETS), default="10k", help="Node count preset. Default: 10k")
+    size.add_argument("--nodes", type=int, help="Exact node count (actors plus movies) instead of a preset.")
+    parser.add_argument(
+        "--db-file",
+        default=DEFAULT_DB_FILE,
+        help=f"Database to recreate. Default: {DEFAULT_DB_FILE}. Passing movies.db replaces the real data.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed. Default: 0")
+    parser.add_argument(
+        "--cast-size", type=int, default=MEAN_CAST_SIZE, help=f"Mean cast size. Default: {MEAN_CAST_SIZE}"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    nodes = args.nodes or SCALE_PRESETS[args.scale]
+    summary = generate_dataset(args.db_file, nodes, seed=args.seed, mean_cast_size=args.cast_size)
+    print(
+        f"Wrote {summary['actors']} actors, {summary['movies']} movies, and {summary['links']} links "
+        f"to {summary['db_file']} in {summary['elapsed_ms']} ms (seed {summary['seed']})."
+    )
+
+
+if __name__ == "__main__":
+    main()
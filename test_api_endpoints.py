@@ -1,14 +1,32 @@
+import json
+import os
+import pstats
+import tempfile
+import threading
 import unittest
-from unittest.mock import patch
+from unittest.mock import ANY, MagicMock, patch
 
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
-from fastapi_app.main import app
+import ci_seed_db
+import fastapi_app.main as main_module
+import graph_cache
+import levels_loader
+import metrics
+import profiling
+import query_log
+from fastapi_app.main import app, clear_frontend_snapshot_cache
+from graph_index import GraphIndex
+from path_utils import PathBudgetExceeded, SearchBudget
+from rate_limit import MemoryBucketStore, RateLimiter, load_backend
+from single_flight import SingleFlight
 
 
 class TestApiEndpoints(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(app)
+        clear_frontend_snapshot_cache()
 
     def test_health_check_returns_status_and_version(self):
         response = self.client.get("/api/health")
@@ -275,8 +293,11 @@ class TestApiEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()[0]["path_hint"]["steps_to_target"], 1)
         self.assertEqual(response.json()[1]["path_hint"]["steps_to_target"], 3)
-        mock_build_path_hint.assert_any_call(11, "movie", 44, "actor")
-        mock_build_path_hint.assert_any_call(12, "movie", 44, "actor")
+        mock_build_path_hint.assert_any_call(11, "movie", 44, "actor", budget=ANY)
+        mock_build_path_hint.assert_any_call(12, "movie", 44, "actor", budget=ANY)
+        # Both hints of the response draw on one traversal budget.
+        budgets = {id(call.kwargs["budget"]) for call in mock_build_path_hint.call_args_list}
+        self.assertEqual(len(budgets), 1)
 
     @patch("fastapi_app.main.actor_exists")
     @patch("fastapi_app.main.movie_exists")
@@ -354,6 +375,7 @@ class TestApiEndpoints(unittest.TestCase):
                         "reachable": True,
                         "steps_to_target": 0,
                         "path": [{"id": 44, "type": "actor", "label": "Matt Damon"}],
+                        "budget_exceeded": False,
                     },
                 },
                 {
@@ -368,6 +390,7 @@ class TestApiEndpoints(unittest.TestCase):
                             {"id": 21, "type": "movie", "label": "The Departed"},
                             {"id": 44, "type": "actor", "label": "Matt Damon"},
                         ],
+                        "budget_exceeded": False,
                     },
                 },
             ],
@@ -402,6 +425,32 @@ class TestApiEndpoints(unittest.TestCase):
         self.assertEqual(response.json()[0]["path_hint"]["steps_to_target"], 0)
         self.assertEqual(response.json()[0]["path_hint"]["path"][0]["label"], "Matt Damon")
 
+    @patch("fastapi_app.main.movie_exists")
+    @patch("fastapi_app.main.get_actors_in_movie")
+    @patch("fastapi_app.main.actor_exists")
+    @patch("fastapi_app.main.db_get_movies_for_actor")
+    def test_suggestion_endpoints_pass_order_and_limit_through(
+        self,
+        mock_get_movies_for_actor,
+        mock_actor_exists,
+        mock_get_actors_in_movie,
+        mock_movie_exists,
+    ):
+        mock_actor_exists.return_value = True
+        mock_movie_exists.return_value = True
+        mock_get_movies_for_actor.return_value = [(161, "Ocean's Eleven", "2001-12-07")]
+        mock_get_actors_in_movie.return_value = [(1892, "Matt Damon", 51.25)]
+
+        movies = self.client.get("/api/actor/1461/movies?order=release_date&limit=1")
+        costars = self.client.get("/api/movie/161/costars?order=popularity&limit=1")
+        invalid = self.client.get("/api/movie/161/costars?order=birthday")
+
+        self.assertEqual(movies.status_code, 200)
+        self.assertEqual(costars.json()[0]["name"], "Matt Damon")
+        self.assertEqual(invalid.status_code, 422)
+        mock_get_movies_for_actor.assert_called_once_with(1461, order="release_date", limit=1)
+        mock_get_actors_in_movie.assert_called_once_with(161, [], order="popularity", limit=1)
+
     @patch("fastapi_app.main.actor_exists")
     def test_get_movies_for_actor_rejects_partial_target_query(self, mock_actor_exists):
         mock_actor_exists.return_value = True
@@ -465,16 +514,20 @@ class TestApiEndpoints(unittest.TestCase):
     @patch("fastapi_app.main.vg_get_actor_by_name")
     @patch("fastapi_app.main.vg_get_movie_by_title")
     @patch("fastapi_app.main.generate_typed_path")
+    @patch("fastapi_app.main.hydrate_node_labels")
     @patch("fastapi_app.main.serialize_typed_path")
     @patch("fastapi_app.main.pretty_print_path")
     def test_generate_path_returns_structured_nodes(
         self,
         mock_pretty_print_path,
         mock_serialize_typed_path,
+        mock_hydrate_node_labels,
         mock_generate_typed_path,
         mock_get_movie_by_title,
         mock_get_actor_by_name,
     ):
+        labels = {(1, "actor"): "George Clooney", (11, "movie"): "Ocean's Eleven"}
+        mock_hydrate_node_labels.return_value = labels
         mock_get_actor_by_name.return_value = (1, "George Clooney")
         mock_get_movie_by_title.return_value = (11, "Ocean's Eleven")
         mock_generate_typed_path.return_value = [(1, "actor"), (11, "movie")]
@@ -493,8 +546,10 @@ class TestApiEndpoints(unittest.TestCase):
         )
 
         self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertIsInstance(body.pop("elapsed_ms"), float)
         self.assertEqual(
-            response.json(),
+            body,
             {
                 "path": "George Clooney -> Ocean's Eleven",
                 "nodes": [
@@ -503,12 +558,677 @@ class TestApiEndpoints(unittest.TestCase):
                 ],
                 "steps": 1,
                 "reason": None,
+                "nodes_expanded": 0,
+                "budget_exceeded": False,
+            },
+        )
+        mock_hydrate_node_labels.assert_called_once_with([(1, "actor"), (11, "movie")])
+        mock_pretty_print_path.assert_called_once_with([1, 11], start_type="actor", labels=labels)
+        mock_serialize_typed_path.assert_called_once_with([(1, "actor"), (11, "movie")], labels=labels)
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    @patch("fastapi_app.main.iter_batch_typed_paths")
+    def test_batch_path_returns_distances_in_request_order(
+        self,
+        mock_iter_batch_typed_paths,
+        mock_get_actor_by_name,
+    ):
+        actor_ids = {"George Clooney": 1, "Matt Damon": 2, "Daniel Craig": 3}
+        mock_get_actor_by_name.side_effect = lambda name: (actor_ids[name], name) if name in actor_ids else None
+        mock_iter_batch_typed_paths.return_value = iter(
+            [
+                (1, -1),
+                (0, [(1, "actor"), (11, "movie"), (2, "actor")]),
+            ]
+        )
+
+        response = self.client.post(
+            "/api/path/batch",
+            json={
+                "pairs": [
+                    {"a": {"type": "actor", "value": "George Clooney"}, "b": {"type": "actor", "value": "Matt Damon"}},
+                    {"a": {"type": "actor", "value": "George Clooney"}, "b": {"type": "actor", "value": "Daniel Craig"}},
+                    {"a": {"type": "actor", "value": "Nobody Real"}, "b": {"type": "actor", "value": "Matt Damon"}},
+                ],
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["pair_count"], 3)
+        self.assertEqual(body["source_count"], 1)
+        self.assertEqual([result["index"] for result in body["results"]], [0, 1, 2])
+        self.assertEqual(body["results"][0]["steps"], 2)
+        self.assertEqual(body["results"][0]["nodes"], [])
+        self.assertEqual(body["results"][1]["reason"], "No path found")
+        self.assertEqual(body["results"][2]["reason"], "Invalid actor/movie name")
+        mock_iter_batch_typed_paths.assert_called_once_with(
+            [((1, "actor"), (2, "actor")), ((1, "actor"), (3, "actor"))]
+        )
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    @patch("fastapi_app.main.iter_batch_typed_paths")
+    @patch("fastapi_app.main.serialize_typed_path")
+    def test_batch_path_streams_ndjson_with_paths(
+        self,
+        mock_serialize_typed_path,
+        mock_iter_batch_typed_paths,
+        mock_get_actor_by_name,
+    ):
+        mock_get_actor_by_name.side_effect = lambda name: {"George Clooney": (1, name), "Matt Damon": (2, name)}[name]
+        mock_iter_batch_typed_paths.return_value = iter([(0, [(1, "actor"), (11, "movie"), (2, "actor")])])
+        mock_serialize_typed_path.return_value = [
+            {"id": 1, "type": "actor", "label": "George Clooney"},
+            {"id": 11, "type": "movie", "label": "Ocean's Eleven"},
+            {"id": 2, "type": "actor", "label": "Matt Damon"},
+        ]
+
+        response = self.client.post(
+            "/api/path/batch",
+            json={
+                "pairs": [
+                    {"a": {"type": "actor", "value": "George Clooney"}, "b": {"type": "actor", "value": "Matt Damon"}},
+                ],
+                "include_paths": True,
+                "stream": True,
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["steps"], 2)
+        self.assertEqual(lines[0]["nodes"][1]["label"], "Ocean's Eleven")
+
+    @patch("fastapi_app.main.MAX_PATH_BATCH_PAIRS", 1)
+    def test_batch_path_rejects_oversized_batches(self):
+        pair = {"a": {"type": "actor", "value": "George Clooney"}, "b": {"type": "actor", "value": "Matt Damon"}}
+
+        response = self.client.post("/api/path/batch", json={"pairs": [pair, pair]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit is 1", response.json()["detail"])
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    @patch("fastapi_app.main.generate_typed_path")
+    def test_generate_path_reports_exceeded_search_budget(self, mock_generate_typed_path, mock_get_actor_by_name):
+        mock_get_actor_by_name.side_effect = lambda name: {"George Clooney": (1, name), "Matt Damon": (2, name)}[name]
+
+        def exhaust_budget(*_args, budget, **_kwargs):
+            budget.charge(7)
+            raise PathBudgetExceeded(budget, "max_nodes")
+
+        mock_generate_typed_path.side_effect = exhaust_budget
+
+        response = self.client.post(
+            "/api/path/generate",
+            json={"a": {"type": "actor", "value": "George Clooney"}, "b": {"type": "actor", "value": "Matt Damon"}},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["reason"], "Search budget exceeded")
+        self.assertTrue(response.json()["budget_exceeded"])
+        self.assertEqual(response.json()["nodes_expanded"], 7)
+        self.assertEqual(response.json()["nodes"], [])
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    @patch("fastapi_app.main.generate_typed_path")
+    def test_generate_path_passes_constraints_to_search(self, mock_generate_typed_path, mock_get_actor_by_name):
+        actor_ids = {"George Clooney": 1, "Matt Damon": 2, "Brad Pitt": 3}
+        mock_get_actor_by_name.side_effect = lambda name: (actor_ids[name], name) if name in actor_ids else None
+        mock_generate_typed_path.return_value = -1
+
+        response = self.client.post(
+            "/api/path/generate",
+            json={
+                "a": {"type": "actor", "value": "George Clooney"},
+                "b": {"type": "actor", "value": "Matt Damon"},
+                "constraints": {
+                    "exclude": [{"type": "actor", "value": "Brad Pitt"}, {"type": "actor", "value": "Nobody"}],
+                    "min_year": 2000,
+                    "genres": ["Crime"],
+                },
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["reason"], "No path found")
+        mock_generate_typed_path.assert_called_once_with(
+            1,
+            "actor",
+            2,
+            "actor",
+            budget=ANY,
+            constraints={
+                "exclude_nodes": ((3, "actor"),),
+                "min_year": 2000,
+                "max_year": None,
+                "genres": ("crime",),
+                "content_ratings": (),
+                "languages": (),
+            },
+        )
+
+    @patch("fastapi_app.main.actor_exists")
+    @patch("fastapi_app.main.db_get_movies_for_actor")
+    @patch("fastapi_app.main.build_path_hint")
+    def test_get_movies_for_actor_applies_hint_constraints(
+        self,
+        mock_build_path_hint,
+        mock_get_movies_for_actor,
+        mock_actor_exists,
+    ):
+        mock_actor_exists.return_value = True
+        mock_get_movies_for_actor.return_value = [(11, "Ocean's Eleven", "2001-12-07")]
+        mock_build_path_hint.return_value = {"reachable": False, "steps_to_target": None, "path": []}
+
+        response = self.client.get(
+            "/api/actor/9/movies?target_type=actor&target_id=44&max_year=1999&content_rating=PG-13&hint_exclude_movie_id=12"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        mock_build_path_hint.assert_called_once_with(
+            11,
+            "movie",
+            44,
+            "actor",
+            constraints={
+                "exclude_nodes": ((12, "movie"),),
+                "min_year": None,
+                "max_year": 1999,
+                "genres": (),
+                "content_ratings": ("pg-13",),
+                "languages": (),
             },
+            budget=ANY,
         )
 
+    @patch("fastapi_app.main.actor_exists")
+    @patch("fastapi_app.main.get_actors_in_movie")
+    @patch("fastapi_app.main.movie_exists")
+    @patch("fastapi_app.main.build_path_hint")
+    def test_get_costars_distance_hint_mode_skips_paths(
+        self,
+        mock_build_path_hint,
+        mock_movie_exists,
+        mock_get_actors_in_movie,
+        mock_actor_exists,
+    ):
+        mock_actor_exists.return_value = True
+        mock_movie_exists.return_value = True
+        mock_get_actors_in_movie.return_value = [(44, "Matt Damon", 9.1)]
+        mock_build_path_hint.return_value = {
+            "reachable": True,
+            "steps_to_target": None,
+            "steps_lower_bound": 2,
+            "steps_upper_bound": 4,
+            "path": [],
+        }
+
+        response = self.client.get("/api/movie/11/costars?target_type=actor&target_id=55&hint_mode=distance")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["path_hint"]["steps_upper_bound"], 4)
+        mock_build_path_hint.assert_called_once_with(44, "actor", 55, "actor", distance_only=True, budget=ANY)
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    @patch("fastapi_app.main.enumerate_typed_shortest_paths")
+    @patch("fastapi_app.main.hydrate_node_labels")
+    def test_path_alternatives_returns_count_and_paths(
+        self,
+        mock_hydrate_node_labels,
+        mock_enumerate_typed_shortest_paths,
+        mock_get_actor_by_name,
+    ):
+        mock_get_actor_by_name.side_effect = lambda name: {"George Clooney": (1, name), "Matt Damon": (2, name)}[name]
+        mock_enumerate_typed_shortest_paths.return_value = {
+            "steps": 2,
+            "count": 3,
+            "paths": [
+                [(1, "actor"), (11, "movie"), (2, "actor")],
+                [(1, "actor"), (12, "movie"), (2, "actor")],
+            ],
+        }
+        mock_hydrate_node_labels.return_value = {
+            (1, "actor"): "George Clooney",
+            (11, "movie"): "Ocean's Eleven",
+            (12, "movie"): "Ocean's Twelve",
+            (2, "actor"): "Matt Damon",
+        }
+
+        response = self.client.post(
+            "/api/path/alternatives",
+            json={
+                "a": {"type": "actor", "value": "George Clooney"},
+                "b": {"type": "actor", "value": "Matt Damon"},
+                "k": 2,
+                "mode": "sample",
+                "seed": 3,
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["shortest_path_count"], 3)
+        self.assertEqual(response.json()["paths"][1][1]["label"], "Ocean's Twelve")
+        mock_enumerate_typed_shortest_paths.assert_called_once_with(
+            1, "actor", 2, "actor", k=2, mode="sample", seed=3, budget=ANY
+        )
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    def test_path_alternatives_answers_disconnected_pairs_without_searching(self, mock_get_actor_by_name):
+        mock_get_actor_by_name.side_effect = lambda name: {"George Clooney": (1, name), "Matt Damon": (3, name)}[name]
+        graph = GraphIndex([1, 2, 3], [10, 20], [(10, 1), (10, 2), (20, 3)])
+
+        with patch("path_utils.get_graph", return_value=graph), patch(
+            "path_utils._shortest_path_layers", side_effect=PathBudgetExceeded(SearchBudget(), "max_nodes")
+        ) as mock_layers:
+            response = self.client.post(
+                "/api/path/alternatives",
+                json={"a": {"type": "actor", "value": "George Clooney"}, "b": {"type": "actor", "value": "Matt Damon"}},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["reason"], "No path found")
+        self.assertEqual(response.json()["shortest_path_count"], 0)
+        self.assertFalse(response.json()["budget_exceeded"])
+        mock_layers.assert_not_called()
+
+    def test_path_alternatives_rejects_k_over_limit(self):
+        response = self.client.post(
+            "/api/path/alternatives",
+            json={
+                "a": {"type": "actor", "value": "George Clooney"},
+                "b": {"type": "actor", "value": "Matt Damon"},
+                "k": 10_000,
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch("fastapi_app.main.get_path_cache_stats")
+    def test_path_cache_stats_reports_counters(self, mock_get_path_cache_stats):
+        mock_get_path_cache_stats.return_value = {
+            "entries": 2,
+            "bytes": 880,
+            "max_entries": 4096,
+            "max_bytes": 8388608,
+            "hits": 5,
+            "reversed_hits": 2,
+            "misses": 2,
+            "evictions": 0,
+            "hit_rate": 0.7143,
+        }
+
+        response = self.client.get("/api/path/cache-stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["hits"], 5)
+        self.assertEqual(response.json()["reversed_hits"], 2)
+
+    @patch("fastapi_app.main.get_search_index")
+    def test_search_returns_ranked_matches(self, mock_get_search_index):
+        mock_index = MagicMock()
+        mock_index.search.return_value = [
+            {"id": 1461, "type": "actor", "label": "George Clooney", "popularity": 33.1, "score": 1.02},
+        ]
+        mock_get_search_index.return_value = mock_index
+
+        response = self.client.get("/api/search?q=george%20cloony&type=actor&limit=5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["label"], "George Clooney")
+        mock_index.search.assert_called_once_with("george cloony", node_type="actor", limit=5)
+
+    def test_search_requires_query(self):
+        response = self.client.get("/api/search")
+
+        self.assertEqual(response.status_code, 422)
+
+    @patch("fastapi_app.main.get_component_stats")
+    def test_graph_component_stats_reports_sizes(self, mock_get_component_stats):
+        mock_get_component_stats.return_value = {
+            "node_count": 12,
+            "component_count": 3,
+            "largest_component_size": 9,
+            "isolated_node_count": 2,
+            "top_component_sizes": [9, 1, 1],
+            "size_histogram": {"9": 1, "1": 2},
+        }
+
+        response = self.client.get("/api/graph/components?top=3")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["component_count"], 3)
+        self.assertEqual(response.json()["top_component_sizes"], [9, 1, 1])
+        mock_get_component_stats.assert_called_once_with(top=3)
+
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    @patch("path_utils._search_typed_path")
+    @patch("path_utils.nodes_disconnected")
+    def test_generate_path_short_circuits_across_components(
+        self,
+        mock_nodes_disconnected,
+        mock_search_typed_path,
+        mock_get_actor_by_name,
+    ):
+        actor_ids = {"George Clooney": 1, "Tobey Maguire": 2}
+        mock_get_actor_by_name.side_effect = lambda name: (actor_ids[name], name)
+        mock_nodes_disconnected.return_value = True
+
+        response = self.client.post(
+            "/api/path/generate",
+            json={
+                "a": {"type": "actor", "value": "George Clooney"},
+                "b": {"type": "actor", "value": "Tobey Maguire"},
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["reason"], "No path found")
+        mock_nodes_disconnected.assert_called_once_with((1, "actor"), (2, "actor"))
+        mock_search_typed_path.assert_not_called()
+
+    @patch("fastapi_app.main.game_start_session")
+    @patch("fastapi_app.main.vg_get_actor_by_name")
+    def test_start_game_session_resolves_actor_names(self, mock_get_actor, mock_start_session):
+        mock_get_actor.side_effect = [(1892, "Matt Damon"), (8784, "Daniel Craig")]
+        damon = {"id": 1892, "type": "actor", "label": "Matt Damon"}
+        mock_start_session.return_value = {
+            "session_id": "abc",
+            "status": "playing",
+            "phase": "movie",
+            "start": damon,
+            "target": {"id": 8784, "type": "actor", "label": "Daniel Craig"},
+            "current": damon,
+            "path": [damon],
+            "options": [{"id": 1422, "type": "movie", "label": "The Departed"}],
+            "connections": 0,
+            "turn_count": 0,
+            "back_count": 0,
+            "shuffle_count": 0,
+        }
+
+        response = self.client.post(
+            "/api/game/sessions",
+            json={"start_actor": "Matt Damon", "target_actor": "Daniel Craig", "seed": 3},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["options"][0]["label"], "The Departed")
+        mock_start_session.assert_called_once_with(1892, 8784, 3)
+
+    @patch("fastapi_app.main.game_choose_option")
+    def test_game_move_maps_invalid_moves_and_unknown_sessions(self, mock_choose_option):
+        mock_choose_option.side_effect = ValueError("99 is not one of the current options")
+        response = self.client.post("/api/game/sessions/abc/move", json={"id": 99})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "99 is not one of the current options")
+
+        mock_choose_option.side_effect = None
+        mock_choose_option.return_value = None
+        response = self.client.post("/api/game/sessions/missing/move", json={"id": 99})
+        self.assertEqual(response.status_code, 404)
+        mock_choose_option.assert_called_with("missing", 99)
+
+    @patch("fastapi_app.main.metrics.SERVER_TIMING_ENABLED", True)
+    def test_metrics_report_route_latency_and_server_timing(self):
+        metrics.METRICS.reset()
+        response = self.client.get("/api/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["Server-Timing"].startswith("app;dur="))
+
+        response = self.client.get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(
+            'costars_http_requests_total{method="GET",route="/api/health",status="200"} 1',
+            response.text,
+        )
+        self.assertIn(
+            'costars_http_request_duration_seconds_count{method="GET",route="/api/health"} 1',
+            response.text,
+        )
+        self.assertIn("# TYPE costars_game_sessions_active gauge", response.text)
+
+    def test_requests_keep_the_graph_they_first_resolved(self):
+        first, second, third = object(), object(), object()
+        watcher = main_module.DATA_WATCHER
+        with patch("graph_cache._current_graph", side_effect=[first, second, third]):
+            token = watcher.pin()
+            try:
+                # A database swap between two lookups does not reach the pinned request.
+                self.assertIs(graph_cache.get_graph("movies.db"), first)
+                self.assertIs(graph_cache.get_graph("movies.db"), first)
+            finally:
+                watcher.unpin(token)
+            self.assertIs(graph_cache.get_graph("movies.db"), second)
+            self.assertIs(graph_cache.get_graph("movies.db"), third)
+
+    def test_levels_reload_into_a_new_generation_without_restart(self):
+        watcher = main_module.DATA_WATCHER
+        main_module.watch_data_sources()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            levels_path = os.path.join(temp_dir, "levels.json")
+            with open(levels_path, "w", encoding="utf-8") as handle:
+                json.dump([{"actor_a": "Ada", "actor_b": "Bo", "stars": 2}], handle)
+
+            try:
+                with patch("levels_loader.LEVELS_FILE", levels_path):
+                    before = watcher.latest().number
+                    self.assertIsNotNone(watcher.check())
+                    response = self.client.get("/api/levels")
+                    self.assertEqual(response.json(), [{"actor_a": "Ada", "actor_b": "Bo", "stars": 2}])
+                    self.assertEqual(response.headers["X-Data-Generation"], str(before + 1))
+
+                    # A request pinned to a generation keeps it while a reload lands.
+                    token = watcher.pin()
+                    with open(levels_path, "w", encoding="utf-8") as handle:
+                        json.dump([{"actor_a": "Cy", "actor_b": "Di", "stars": 4}], handle)
+                    os.utime(levels_path, ns=(1, 1))
+                    watcher.check()
+                    self.assertEqual(main_module.current_levels()[0]["actor_a"], "Ada")
+                    watcher.unpin(token)
+                    self.assertEqual(main_module.current_levels()[0]["actor_a"], "Cy")
+
+                    # A half-written file keeps the previous generation.
+                    with open(levels_path, "w", encoding="utf-8") as handle:
+                        handle.write("[{")
+                    os.utime(levels_path, ns=(2, 2))
+                    self.assertIsNone(watcher.check())
+                    self.assertEqual(self.client.get("/api/levels").json()[0]["actor_a"], "Cy")
+            finally:
+                watcher.check()
+
+        self.assertEqual(main_module.current_levels(), levels_loader.load_levels())
+
+    def test_lifespan_loads_levels_and_prewarms_the_graph(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "movies.db")
+            ci_seed_db.seed_synthetic_db(db_path, [(1, "Ada", 1.0), (2, "Bo", 2.0)], [(10, "Film", None)], [(10, 1), (10, 2)])
+            try:
+                with patch("fastapi_app.main.DB_FILE", db_path), patch("fastapi_app.main.PREWARM_GRAPH", True):
+                    with TestClient(app) as client:
+                        self.assertIn(db_path, graph_cache._graph_cache)
+                        self.assertEqual(client.get("/api/levels").json(), levels_loader.load_levels())
+            finally:
+                main_module.invalidate_data_caches(["database"])
+
+    def test_query_stats_endpoint_returns_aggregated_statements(self):
+        query_log.QUERY_STATS.reset()
+        query_log.QUERY_STATS.record("SELECT id FROM actors WHERE id = 7", 2.0)
+        query_log.QUERY_STATS.record("SELECT id FROM actors   WHERE id = 9", 4.0, slow=True)
+
+        response = self.client.get("/api/metrics/queries")
+        query_log.QUERY_STATS.reset()
+
+        self.assertEqual(response.status_code, 200)
+        entry = response.json()["queries"][0]
+        self.assertEqual(entry["sql"], "SELECT id FROM actors WHERE id = ?")
+        self.assertEqual((entry["count"], entry["mean_ms"], entry["max_ms"], entry["slow_count"]), (2, 3.0, 4.0, 1))
+
+    @patch("fastapi_app.main.get_content_version", return_value=(1, 2, 3))
+    @patch("fastapi_app.main.build_frontend_snapshot")
+    def test_frontend_snapshot_is_cached_per_content_version(self, mock_build_frontend_snapshot, mock_version):
+        metrics.METRICS.reset()
+        mock_build_frontend_snapshot.return_value = {
+            "meta": {
+                "version": "2.1.0",
+                "exported_at": "2026-03-11T00:00:00+00:00",
+                "actor_count": 0,
+                "movie_count": 0,
+                "relationship_count": 0,
+                "level_count": 0,
+            },
+            "actors": [],
+            "movies": [],
+            "movie_actors": [],
+            "adjacency": {"actor_to_movies": {}, "movie_to_actors": {}},
+            "levels": [],
+        }
+
+        self.client.get("/api/export/frontend-snapshot")
+        self.client.get("/api/export/frontend-snapshot")
+        mock_version.return_value = (1, 2, 4)
+        self.client.get("/api/export/frontend-snapshot")
+
+        self.assertEqual(mock_build_frontend_snapshot.call_count, 2)
+        self.assertEqual(metrics.METRICS.counter_value("snapshot_cache_hits_total"), 1)
+        self.assertEqual(metrics.METRICS.counter_value("snapshot_cache_misses_total"), 2)
+
+    @patch("fastapi_app.main.get_content_version", return_value=(1, 2, 3))
+    @patch("fastapi_app.main.build_frontend_snapshot")
+    def test_concurrent_snapshot_requests_share_one_build(self, mock_build_frontend_snapshot, _mock_version):
+        building = threading.Event()
+        release = threading.Event()
+
+        def slow_build(_levels):
+            building.set()
+            release.wait(5)
+            return {"levels": []}
+
+        mock_build_frontend_snapshot.side_effect = slow_build
+        results = []
+        leader = threading.Thread(target=lambda: results.append(main_module.get_frontend_snapshot([])))
+        leader.start()
+        building.wait(5)
+        follower = threading.Thread(target=lambda: results.append(main_module.get_frontend_snapshot([])))
+        shared_before = main_module.REQUEST_FLIGHTS.shared
+        follower.start()
+        while main_module.REQUEST_FLIGHTS.shared == shared_before and follower.is_alive():
+            follower.join(0.001)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        clear_frontend_snapshot_cache()
+
+        self.assertEqual(mock_build_frontend_snapshot.call_count, 1)
+        self.assertEqual(len(results), 2)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(main_module.REQUEST_FLIGHTS.in_flight(), 0)
+
+    @patch("fastapi_app.main.actor_exists", return_value=False)
+    def test_path_and_hint_requests_are_rate_limited_per_client(self, _mock_actor_exists):
+        limiter = RateLimiter(
+            limits={"path": (1, 1), "hints": (1, 1)},
+            backend=MemoryBucketStore(clock=lambda: 0.0),
+            enabled=True,
+        )
+        with patch("fastapi_app.main.RATE_LIMITER", limiter):
+            first = self.client.get("/api/path/cache-stats")
+            limited = self.client.get("/api/path/cache-stats")
+            hint_urls = ["/api/actor/9/movies?target_type=actor&target_id=44"] * 2 + ["/api/actor/9/movies"]
+            hint_statuses = [self.client.get(url).status_code for url in hint_urls]
+            health = self.client.get("/api/health")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.headers["Retry-After"], "1")
+        self.assertEqual(hint_statuses, [404, 429, 404])
+        self.assertEqual(health.status_code, 200)
+
+    def test_profiling_is_opt_in_and_writes_pstats_or_speedscope(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with patch("profiling.PROFILE_DIR", profile_dir):
+                response = self.client.get("/api/health", headers={"X-Profile": "cprofile"})
+                self.assertNotIn("X-Profile-Path", response.headers)
+
+                with patch("profiling.PROFILING_ENABLED", True):
+                    response = self.client.get("/api/health", headers={"X-Profile": "cprofile"})
+                    stats = pstats.Stats(response.headers["X-Profile-Path"])
+                    self.assertTrue(any(function[2] == "health_check" for function in stats.stats))
+
+                    response = self.client.get("/api/health?profile=sample")
+                    with open(response.headers["X-Profile-Path"], encoding="utf-8") as handle:
+                        speedscope = json.load(handle)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(speedscope["profiles"][0]["type"], "sampled")
+        self.assertEqual(speedscope["$schema"], profiling.SPEEDSCOPE_SCHEMA)
+
+
+class TestRequestCoalescingAndRateLimits(unittest.TestCase):
+    def test_single_flight_shares_errors_and_forgets_finished_calls(self):
+        flights = SingleFlight()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flights.do("key", fail)
+        self.assertEqual(flights.do("key", lambda: 42), 42)
+        self.assertEqual((flights.leaders, flights.shared, flights.in_flight()), (2, 0, 0))
+
+    def test_token_buckets_refill_and_custom_backends_load(self):
+        now = [0.0]
+        store = MemoryBucketStore(max_clients=2, clock=lambda: now[0])
+
+        self.assertEqual([store.take("a", 2, 2)[0] for _ in range(3)], [True, True, False])
+        self.assertEqual(store.take("a", 2, 2), (False, 0.5))
+        now[0] = 0.5
+        self.assertEqual(store.take("a", 2, 2), (True, 0.0))
+        store.take("b", 2, 2)
+        store.take("c", 2, 2)
+        self.assertEqual(len(store), 2)
+        self.assertIsInstance(load_backend("rate_limit:MemoryBucketStore"), MemoryBucketStore)
+        with self.assertRaises(ValueError):
+            load_backend("redis")
+
+    def test_followers_raise_their_own_copy_of_the_leaders_error(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = {}
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise HTTPException(status_code=503, detail="busy")
+
+        def run(name):
+            try:
+                flights.do("key", fail)
+            except HTTPException as exc:
+                errors[name] = exc
+
+        leader = threading.Thread(target=run, args=("leader",))
+        follower = threading.Thread(target=run, args=("follower",))
+        leader.start()
+        started.wait(5)
+        follower.start()
+        while flights.shared == 0 and follower.is_alive():
+            follower.join(0.001)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertIsNot(errors["follower"], errors["leader"])
+        self.assertIs(errors["follower"].__cause__, errors["leader"])
+        self.assertEqual((errors["follower"].status_code, errors["follower"].detail), (503, "busy"))
+
 
 if __name__ == "__main__":
-    suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestApiEndpoints)
+    suite = unittest.defaultTestLoader.loadTestsFromModule(__import__(__name__))
     result = unittest.TextTestRunner(verbosity=2).run(suite)
     passed = result.testsRun - len(result.failures) - len(result.errors)
     failed = len(result.failures) + len(result.errors)
@@ -0,0 +1,44 @@
+import unittest
+
+from bench_suite import compare_to_baseline, percentile
+from ci_seed_db import build_synthetic_graph
+
+
+class TestBenchSuite(unittest.TestCase):
+    def test_synthetic_graph_is_deterministic_and_heavy_tailed_under_powerlaw(self):
+        first = build_synthetic_graph(400, 200, mean_cast_size=6, distribution="powerlaw", seed=3)
+        self.assertEqual(first, build_synthetic_graph(400, 200, mean_cast_size=6, distribution="powerlaw", seed=3))
+        uniform = build_synthetic_graph(400, 200, mean_cast_size=6, distribution="uniform", seed=3)
+
+        def max_filmography(relationships):
+            counts = {}
+            for _movie_id, actor_id in relationships:
+                counts[actor_id] = counts.get(actor_id, 0) + 1
+            return max(counts.values())
+
+        self.assertEqual(len(set(first[2])), len(first[2]))
+        self.assertGreater(max_filmography(first[2]), 3 * max_filmography(uniform[2]))
+        with self.assertRaises(ValueError):
+            build_synthetic_graph(10, 5, distribution="zipf")
+
+    def test_baseline_comparison_ignores_noise_and_other_graphs(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 99), 4)
+        graph = {"actors": 10, "movies": 5}
+        baseline = {"meta": {"graph": graph}, "benchmarks": {"path": {"p50_ms": 2.0, "peak_kib": 100}}}
+        noisy = {"meta": {"graph": graph}, "benchmarks": {"path": {"p50_ms": 2.9, "peak_kib": 300}}}
+        slower = {"meta": {"graph": graph}, "benchmarks": {"path": {"p50_ms": 9.0, "peak_kib": 100}}}
+
+        self.assertEqual(compare_to_baseline(noisy, baseline)[0], [])
+        self.assertEqual(compare_to_baseline(slower, baseline)[0], ["path: p50_ms 2.0 ms -> 9.0 ms"])
+        regressions, notes = compare_to_baseline(dict(slower, meta={"graph": {"actors": 20}}), baseline)
+        self.assertEqual(regressions, [])
+        self.assertIn("different synthetic graph", notes[0])
+
+
+if __name__ == "__main__":
+    suite = unittest.defaultTestLoader.loadTestsFromModule(__import__(__name__))
+    result = unittest.TextTestRunner(verbosity=2).run(suite)
+    passed = result.testsRun - len(result.failures) - len(result.errors)
+    failed = len(result.failures) + len(result.errors)
+    print(f"\nSummary: {passed} passed, {failed} failed, {result.testsRun} total")
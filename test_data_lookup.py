@@ -1,13 +1,27 @@
+import json
 import os
+import random
+import shutil
 import sqlite3
 import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 
+import ci_seed_db
 import db
 import db_helper
+import graph_cache
+import graph_index
+import metrics
+import neighbor_orders
 import populate_db
+import publish_db
+import query_log
+import synthetic_dataset
+import versus_game
 from frontend_snapshot import build_frontend_manifest, build_frontend_snapshot
+from search_index import SearchIndex, load_search_index
 
 
 def initialize_legacy_db(db_path):
@@ -116,6 +130,130 @@ class TestDbHelperLookups(unittest.TestCase):
         self.assertEqual(db_helper.get_actor_by_id(1892), (1892, "Matt Damon", 51.25))
         self.assertEqual(db_helper.get_movie_by_id(161), (161, "Ocean's Eleven", "2001-12-07"))
 
+    def test_write_in_resolves_through_catalog_search_index(self):
+        index = load_search_index(self.db_path)
+        self.assertEqual(index.search("oceans elevn", limit=1)[0]["id"], 161)
+
+        with patch.object(versus_game, "DB_FILE", self.db_path):
+            match = versus_game.find_write_in_match(
+                "mat damon",
+                [(1461, "George Clooney"), (1892, "Matt Damon")],
+                "actor",
+            )
+            no_match = versus_game.find_write_in_match("Keanu Reeves", [(1461, "George Clooney")], "actor")
+
+        self.assertEqual(match, (1892, "Matt Damon"))
+        self.assertIsNone(no_match)
+
+    def test_precomputed_orders_slice_and_follow_incremental_writes(self):
+        orders = neighbor_orders.get_neighbor_orders(self.db_path)
+        self.assertEqual(
+            [row[0] for row in db_helper.get_actors_in_movie(161, order="popularity")],
+            [1892, 287, 1461],
+        )
+        self.assertEqual(
+            db_helper.get_actors_in_movie(161, ["Matt Damon"], order="popularity", limit=1),
+            [(287, "Brad Pitt", 37.0)],
+        )
+
+        db_helper.insert_actor(1461, "George Clooney", 99.0)
+        db_helper.insert_movie(162, "A Later Heist", "2004-12-10")
+        db_helper.insert_relationship(162, 1892)
+
+        self.assertIs(neighbor_orders.get_neighbor_orders(self.db_path), orders)
+        self.assertEqual(
+            db_helper.get_actors_in_movie(161, order="popularity", limit=1),
+            [(1461, "George Clooney", 99.0)],
+        )
+        self.assertEqual(
+            [row[0] for row in db_helper.get_movies_for_actor(1892, order="release_date")],
+            [161, 162, 910001],
+        )
+        self.assertEqual(db_helper.get_movies_for_actor(1892, limit=1), [(162, "A Later Heist", "2004-12-10")])
+        self.assertEqual(orders.movie_cast(161), neighbor_orders.load_neighbor_orders(self.db_path).movie_cast(161))
+
+    def test_compaction_publishes_a_new_layout_in_one_swap(self):
+        orders = neighbor_orders.NeighborOrders(
+            [(1, "Ada", 5.0), (2, "Bo", 3.0), (3, "Cy", 1.0)],
+            [(10, "Heist", "2001-12-07")],
+            [(10, 1), (10, 2), (10, 3)],
+        )
+        before = orders.casts.layout
+        for popularity in range(2, 6):
+            orders.update_actor((3, "Cy", float(popularity) + 0.5))
+
+        self.assertIsNot(orders.casts.layout, before)
+        # A reader still holding the old layout sees a whole, consistent cast.
+        old_orders, old_ranges = before
+        start, stop = old_ranges[10]
+        self.assertEqual(sorted(old_orders["name"][start:stop]), [0, 1, 2])
+        self.assertEqual([row[0] for row in orders.movie_cast(10, order="popularity")], [3, 1, 2])
+
+    def test_versus_sampling_reads_the_graph_instead_of_order_by_random(self):
+        with patch.object(versus_game, "DB_FILE", self.db_path):
+            movies = versus_game.get_movies_for_actor(1892, rng=random.Random(0))
+            costars = versus_game.get_ranked_costars_for_movie(161, ["Matt Damon"], rng=random.Random(0))
+            replay = versus_game.get_ranked_costars_for_movie(161, ["Matt Damon"], rng=random.Random(0))
+
+        self.assertEqual(sorted(movies), [(161, "Ocean's Eleven"), (910001, "Fixture Bridge Line")])
+        self.assertEqual(costars, [(287, "Brad Pitt", 37.0), (1461, "George Clooney", 33.1)])
+        self.assertEqual(costars, replay)
+
+    def test_connection_factory_counts_connections_and_statements_per_request(self):
+        token = metrics.start_request()
+        try:
+            self.assertTrue(db_helper.actor_exists(1892))
+            self.assertFalse(db_helper.actor_exists(424242))
+        finally:
+            counts = metrics.finish_request(token)
+
+        self.assertEqual(counts["sqlite_connections_total"], 2)
+        self.assertEqual(counts["sqlite_queries_total"], 2)
+        self.assertIsNone(metrics._request_counts.get())
+
+    def test_query_log_times_statements_and_logs_slow_ones_with_plans(self):
+        query_log.QUERY_STATS.reset()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            slow_log = Path(temp_dir) / "slow.jsonl"
+            with patch.object(query_log, "QUERY_LOG_ENABLED", True), patch.object(
+                query_log, "SLOW_QUERY_MS", 0.0
+            ), patch.object(query_log, "SLOW_QUERY_LOG", slow_log):
+                self.assertTrue(db_helper.movie_exists_by_title("ocean's eleven"))
+                self.assertTrue(db_helper.movie_exists_by_title("Fixture Bridge Line"))
+                self.assertEqual(len(db_helper.get_all_movies()), 2)
+
+            with open(slow_log, encoding="utf-8") as handle:
+                logged = [json.loads(line) for line in handle]
+
+        entries = {entry["sql"]: entry for entry in query_log.QUERY_STATS.snapshot()}
+        by_title = entries["SELECT ? FROM movies WHERE title = ? COLLATE NOCASE"]
+        self.assertEqual(by_title["count"], 2)
+        self.assertEqual(by_title["slow_count"], 2)
+
+        self.assertEqual(len(logged), 3)
+        self.assertEqual(logged[0]["params"], ["ocean's eleven"])
+        self.assertEqual(logged[0]["full_scans"], [])
+        self.assertIn("idx_movies_title_nocase", logged[0]["plan"][0])
+
+        report = {entry["sql"]: entry for entry in query_log.build_report(list(entries.values()), self.db_path)}
+        self.assertEqual(report["SELECT ? FROM movies WHERE title = ? COLLATE NOCASE"]["full_scans"], [])
+        listing = report["SELECT id, title, release_date FROM movies ORDER BY title COLLATE NOCASE ASC"]
+        self.assertEqual(listing["full_scans"], ["SCAN movies USING INDEX idx_movies_title_nocase"])
+        self.assertEqual(listing["temp_sorts"], [])
+        query_log.QUERY_STATS.reset()
+
+    def test_query_log_workload_runs_on_the_given_database(self):
+        enabled = query_log.QUERY_LOG_ENABLED
+        with patch.object(db_helper, "DB_FILE", "missing.db"):
+            entries = query_log.run_workload(samples=2, db_file=self.db_path)
+            self.assertEqual(db_helper.DB_FILE, "missing.db")
+
+        by_sql = {entry["sql"]: entry["count"] for entry in entries}
+        self.assertEqual(by_sql["SELECT id, title, release_date FROM movies ORDER BY title COLLATE NOCASE ASC"], 1)
+        self.assertEqual(by_sql["SELECT ? FROM movies WHERE title = ? COLLATE NOCASE"], 2)
+        self.assertIs(query_log.QUERY_LOG_ENABLED, enabled)
+        query_log.QUERY_STATS.reset()
+
     def test_insert_movie_upserts_enriched_metadata(self):
         db_helper.insert_movie(
             161,
@@ -179,6 +317,37 @@ class TestDbHelperLookups(unittest.TestCase):
         )
 
 
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex(
+            [
+                (1461, "actor", "George Clooney", 33.1),
+                (1462, "actor", "George Clinton", 4.0),
+                (1892, "actor", "Matt Damon", 51.25),
+                (2000, "actor", "Amélie Dupont", 2.0),
+                (161, "movie", "Ocean's Eleven", 40.0),
+                (162, "movie", "Ocean's Twelve", 45.0),
+            ]
+        )
+
+    def test_fuzzy_search_tolerates_typos_and_accents(self):
+        self.assertEqual(self.index.search("gorge cloony", limit=1)[0]["label"], "George Clooney")
+        self.assertEqual(self.index.search("amelie", limit=1)[0]["id"], 2000)
+
+    def test_prefix_autocomplete_ranks_by_popularity_and_filters_type(self):
+        results = self.index.search("geo", node_type="actor")
+        movies = self.index.search("ocean", node_type="movie")
+
+        self.assertEqual([result["id"] for result in results], [1461, 1462])
+        self.assertEqual([result["label"] for result in movies], ["Ocean's Twelve", "Ocean's Eleven"])
+        self.assertEqual(self.index.search("damon", limit=1)[0]["label"], "Matt Damon")
+
+    def test_restricted_search_only_ranks_given_candidates(self):
+        results = self.index.search("george", restrict_to=[(1462, "actor"), (1892, "actor")], min_score=0.4)
+
+        self.assertEqual([result["id"] for result in results], [1462])
+
+
 class TestSchemaMigration(unittest.TestCase):
     def setUp(self):
         temp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
@@ -212,6 +381,163 @@ class TestSchemaMigration(unittest.TestCase):
             {"birthday", "deathday", "place_of_birth", "biography", "profile_path", "known_for_department"}.issubset(actor_columns)
         )
 
+    def test_migrations_rebuild_movie_actors_and_add_indexes_once(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("INSERT INTO movie_actors (movie_id, actor_id) VALUES (?, ?)", [(161, 1892), (161, 1461), (27, 1892)])
+        conn.commit()
+        conn.close()
+
+        applied = db.ensure_schema()
+        self.assertEqual([entry["version"] for entry in applied], [1, 2, 3])
+        self.assertEqual(db.ensure_schema(), [])
+
+        conn = sqlite3.connect(self.db_path)
+        table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'movie_actors'").fetchone()[0]
+        rows = conn.execute("SELECT movie_id, actor_id FROM movie_actors ORDER BY movie_id, actor_id").fetchall()
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT movie_id FROM movie_actors WHERE actor_id = ?", (1892,)).fetchall()
+        name_plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM actors WHERE name = ? COLLATE NOCASE", ("x",)).fetchall()
+        version = db.get_schema_version(conn)
+        conn.close()
+
+        self.assertIn("WITHOUT ROWID", table_sql)
+        self.assertEqual(rows, [(27, 1892), (161, 1461), (161, 1892)])
+        self.assertIn("USING COVERING INDEX idx_movie_actors_actor_movie", plan[0][3])
+        self.assertIn("idx_actors_name_nocase", name_plan[0][3])
+        self.assertEqual(version, db.SCHEMA_VERSION)
+
+
+class TestSyntheticDataset(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def read_rows(self, db_path):
+        conn = sqlite3.connect(db_path)
+        rows = {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+            for table in ("actors", "movies", "movie_actors")
+        }
+        conn.close()
+        return rows
+
+    def test_generator_is_deterministic_with_unique_labels_and_full_metadata(self):
+        first = os.path.join(self.temp_dir, "first.db")
+        second = os.path.join(self.temp_dir, "second.db")
+        summary = synthetic_dataset.generate_dataset(first, 2000, seed=7, batch_size=100)
+        synthetic_dataset.generate_dataset(second, 2000, seed=7)
+
+        rows = self.read_rows(first)
+        self.assertEqual(rows, self.read_rows(second))
+        self.assertEqual((summary["actors"], summary["movies"]), (1600, 400))
+        self.assertEqual(summary["links"], len(rows["movie_actors"]))
+        self.assertEqual(len({row[1] for row in rows["actors"]}), 1600)
+        self.assertEqual(len({row[1] for row in rows["movies"]}), 400)
+
+        cast_sizes = {}
+        for movie_id, _actor_id in rows["movie_actors"]:
+            cast_sizes[movie_id] = cast_sizes.get(movie_id, 0) + 1
+        self.assertGreater(max(cast_sizes.values()), 4 * synthetic_dataset.MEAN_CAST_SIZE)
+        self.assertTrue(all(row[3].startswith("[") and row[6] for row in rows["movies"]))
+        self.assertTrue(any(len(row[6]) > 500 for row in rows["actors"]))
+
+
+class TestPublishedDatabase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "ingest.db")
+        self.publish_dir = os.path.join(self.temp_dir, "published")
+        ci_seed_db.seed_synthetic_db(
+            self.source, [(1, "Ada", 1.0), (2, "Bo", 2.0)], [(10, "Film", "2001-01-01")], [(10, 1), (10, 2)]
+        )
+
+    def tearDown(self):
+        db.serve_published_db(False)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_publish_serves_an_immutable_copy_and_hot_swaps_versions(self):
+        first = publish_db.publish(self.source, self.publish_dir, keep=1)
+        self.assertEqual(os.stat(os.path.join(self.publish_dir, first["file"])).st_mode & 0o222, 0)
+        self.assertEqual((first["actors"], first["movies"], first["links"]), (2, 1, 2))
+
+        with patch.object(db, "DB_FILE", self.source):
+            db.serve_published_db(publish_dir=self.publish_dir)
+            self.assertEqual(db.get_content_version(self.source), ("published", first["version"]))
+            self.assertEqual(graph_cache.get_graph(self.source).actor_count, 2)
+            conn = db.connect()
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO actors (id, name) VALUES (3, 'Cy')")
+            conn.close()
+
+            # Ingest keeps writing to the source; players only see it once it is published.
+            source = sqlite3.connect(self.source)
+            source.execute("INSERT INTO actors (id, name, popularity) VALUES (3, 'Cy', 3.0)")
+            source.execute("INSERT INTO movie_actors (movie_id, actor_id) VALUES (10, 3)")
+            source.commit()
+            source.close()
+            self.assertEqual(graph_cache.get_graph(self.source).actor_count, 2)
+
+            second = publish_db.publish(self.source, self.publish_dir, keep=1)
+            self.assertEqual(db.get_content_version(self.source), ("published", second["version"]))
+            self.assertEqual(graph_cache.get_graph(self.source).actor_count, 3)
+
+        self.assertEqual(second["pruned"], [first["file"]])
+        self.assertEqual([path.name for path in publish_db.list_published_versions(self.publish_dir)], [second["file"]])
+
+
+class TestGraphCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "movies.db")
+        ci_seed_db.seed_synthetic_db(
+            self.db_path,
+            [(1, "Ada", 1.0), (2, "Bo", 2.0), (3, "Cy", 3.0)],
+            [(10, "Film", "2001-01-01"), (11, "Sequel", "2004-05-06")],
+            [(10, 1), (10, 2), (11, 2), (11, 3)],
+        )
+
+    def tearDown(self):
+        graph_cache.clear_graph_cache()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_cached_graph_matches_the_build_until_the_database_changes(self):
+        graph = graph_index.load_graph(self.db_path)
+        graph_cache.save_graph_cache(graph, self.db_path)
+        cached = graph_cache.load_graph_cache(self.db_path, graph.version)
+
+        self.assertEqual(cached.fingerprint(), graph.fingerprint())
+        bo = graph.node_index(2, "actor")
+        self.assertEqual(list(cached.neighbors_of(bo)), list(graph.neighbors_of(bo)))
+        self.assertEqual(cached.movie_mask(min_year=2003), graph.movie_mask(min_year=2003))
+        self.assertEqual(cached.component_sizes, graph.component_sizes)
+
+        # A touched but unchanged database still matches by content hash, once: the
+        # header is restamped with the new stat token, so the next load skips the hash.
+        os.utime(self.db_path, ns=(1, 1))
+        self.assertIsNotNone(graph_cache.load_graph_cache(self.db_path))
+        graph_cache.wait_for_background_writes()
+        with patch.object(graph_cache, "content_hash", side_effect=AssertionError("hashed again")):
+            self.assertIsNotNone(graph_cache.load_graph_cache(self.db_path))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO movie_actors (movie_id, actor_id) VALUES (11, 1)")
+        conn.commit()
+        conn.close()
+        self.assertIsNone(graph_cache.load_graph_cache(self.db_path))
+
+    def test_get_graph_writes_a_stale_cache_back_and_then_maps_it(self):
+        built = graph_cache.get_graph(self.db_path)
+        graph_cache.wait_for_background_writes()
+        graph_cache.clear_graph_cache()
+
+        with patch.object(graph_cache, "load_graph", side_effect=AssertionError("rebuilt from SQL")):
+            loaded = graph_cache.get_graph(self.db_path)
+        self.assertEqual(loaded.fingerprint(), built.fingerprint())
+        self.assertEqual(loaded.version, db.get_content_version(self.db_path))
+
 
 class TestPopulateDbHelpers(unittest.TestCase):
     def test_load_seed_movie_ids_reads_tmdb_ids(self):
@@ -1,5 +1,71 @@
+import os
+import random
+import shutil
+import tempfile
+import time
 import unittest
-from path_utils import generate_path, normalize_path, pretty_print_path, validate_named_path, get_connection
+from unittest.mock import patch
+
+import db_helper
+from ci_seed_db import build_synthetic_graph
+from component_index import ComponentIndex, get_component_index
+from game_sessions import GameSession, SessionStore, choose_option, go_back, shuffle_options, start_session, write_in
+
+from graph_analytics import compute_graph_analytics
+from graph_index import GraphIndex, load_graph
+from landmark_oracle import alt_bidirectional_search, build_landmark_oracle, load_landmark_oracle, save_landmark_oracle
+from level_generator import generate_levels, iter_candidate_pairs, load_actor_rows
+from path_cache import PathCache
+from neighbor_sampling import (
+    AliasTable,
+    NeighborSampler,
+    sample_without_replacement,
+    weighted_sample_without_replacement,
+)
+from search_index import SearchIndex
+from path_utils import (
+    BUDGET_CLOCK_INTERVAL,
+    PathBudgetExceeded,
+    SearchBudget,
+    bidirectional_search,
+    build_path_constraints,
+    build_path_hint,
+    count_shortest_paths,
+    count_typed_shortest_paths,
+    enumerate_typed_shortest_paths,
+    generate_path,
+    generate_typed_path,
+    generate_typed_paths_from_source,
+    get_connection,
+    hydrate_node_labels,
+    iter_batch_typed_paths,
+    normalize_path,
+    pretty_print_path,
+    serialize_typed_path,
+    validate_named_path,
+)
+
+def build_diamond_chain_graph(diamonds):
+    """Actors 0..diamonds joined by two parallel movies per hop: 2 ** diamonds shortest paths."""
+    links = []
+    for hop in range(diamonds):
+        for movie_id in (hop * 2, hop * 2 + 1):
+            links.append((movie_id, hop))
+            links.append((movie_id, hop + 1))
+    return GraphIndex(range(diamonds + 1), range(diamonds * 2), links)
+
+
+def build_filtered_routes_graph():
+    """Actor 1 reaches actor 4 via old PG movies in 2 hops or via newer R movies in 3 hops."""
+    links = [(10, 1), (10, 4), (20, 1), (20, 2), (21, 2), (21, 3), (22, 3), (22, 4)]
+    movie_attributes = {
+        10: ("1995-05-01", '["Drama"]', "PG", "en"),
+        20: ("2004-01-01", '["Crime", "Drama"]', "R", "en"),
+        21: ("2008-01-01", '["Crime"]', "R", "fr"),
+        22: ("2012-01-01", '["Crime"]', "R", "en"),
+    }
+    return GraphIndex([1, 2, 3, 4], list(movie_attributes), links, movie_attributes=movie_attributes)
+
 
 def get_actor_id_by_name(name):
     conn = get_connection()
@@ -95,11 +161,525 @@ class TestGeneratePath(unittest.TestCase):
         self.assertEqual(result["normalized_path"], ["Ocean's Eleven"])
         self.assertEqual(result["repeated_node"], {"type": "movie", "label": "Ocean's Eleven"})
 
+    def test_batch_paths_share_source_bfs_and_match_single_paths(self):
+        damon = get_actor_id_by_name("Matt Damon")
+        craig = get_actor_id_by_name("Daniel Craig")
+        clooney = get_actor_id_by_name("George Clooney")
+        departed = get_movie_id_by_title("The Departed")
+        pairs = [
+            ((damon, "actor"), (craig, "actor")),
+            ((clooney, "actor"), (departed, "movie")),
+            ((damon, "actor"), (clooney, "actor")),
+            ((damon, "actor"), (-999999, "actor")),
+        ]
+
+        results = dict(iter_batch_typed_paths(pairs))
+
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        for index, (source, target) in enumerate(pairs[:3]):
+            expected = generate_typed_path(source[0], source[1], target[0], target[1])
+            self.assertEqual(len(results[index]), len(expected))
+            self.assertEqual(results[index][0], source)
+            self.assertEqual(results[index][-1], target)
+        self.assertEqual(results[3], -1)
+
+    def test_hydrated_labels_are_shared_by_serialize_and_pretty_print(self):
+        damon = get_actor_id_by_name("Matt Damon")
+        oceans = get_movie_id_by_title("Ocean's Eleven")
+        typed_path = [(damon, "actor"), (oceans, "movie"), (-999999, "actor")]
+
+        labels = hydrate_node_labels(typed_path)
+
+        self.assertEqual(labels[(damon, "actor")], "Matt Damon")
+        self.assertEqual(labels[(oceans, "movie")], "Ocean's Eleven")
+        self.assertEqual(labels[(-999999, "actor")], "Actor -999999")
+        self.assertEqual(
+            [node["label"] for node in serialize_typed_path(typed_path, labels=labels)],
+            ["Matt Damon", "Ocean's Eleven", "Actor -999999"],
+        )
+        self.assertEqual(
+            pretty_print_path([damon, oceans, -999999], start_type="actor", labels=labels),
+            pretty_print_path([damon, oceans, -999999], start_type="actor"),
+        )
+
+    def test_path_cache_answers_reverse_pair_and_evicts_by_size(self):
+        cache = PathCache(max_entries=2, max_bytes=10_000)
+        path = [(1, "actor"), (11, "movie"), (2, "actor")]
+        cache.put("v1", (1, "actor"), (2, "actor"), path)
+
+        self.assertEqual(cache.get("v1", (2, "actor"), (1, "actor")), (True, list(reversed(path))))
+        self.assertEqual(cache.get("v1", (1, "actor"), (2, "actor")), (True, path))
+        self.assertEqual(cache.get("v2", (1, "actor"), (2, "actor")), (False, None))
+
+        cache.put("v1", (3, "actor"), (4, "actor"), -1)
+        cache.put("v1", (5, "actor"), (6, "actor"), -1)
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["reversed_hits"], 1)
+        self.assertEqual(cache.get("v1", (1, "actor"), (2, "actor")), (False, None))
+
+    def test_generate_typed_path_reuses_cached_reverse_result(self):
+        damon = get_actor_id_by_name("Matt Damon")
+        craig = get_actor_id_by_name("Daniel Craig")
+
+        forward = generate_typed_path(damon, "actor", craig, "actor")
+        backward = generate_typed_path(craig, "actor", damon, "actor")
+
+        self.assertEqual(backward, list(reversed(forward)))
+        self.assertEqual(generate_typed_path(craig, "actor", damon, "actor", use_cache=False)[-1], (damon, "actor"))
+
+    def test_count_shortest_paths_scales_without_materializing_paths(self):
+        graph = build_diamond_chain_graph(40)
+        with patch("path_utils.get_graph", return_value=graph):
+            result = count_typed_shortest_paths(0, "actor", 40, "actor")
+
+        self.assertEqual(result, {"steps": 80, "count": 2 ** 40})
+        self.assertEqual(count_shortest_paths(graph, graph.node_index(0, "actor"), graph.node_index(3, "actor")), (6, 8))
+
+    def test_enumerate_shortest_paths_returns_distinct_first_and_sampled_paths(self):
+        with patch("path_utils.get_graph", return_value=build_diamond_chain_graph(3)):
+            first = enumerate_typed_shortest_paths(0, "actor", 3, "actor", k=5)
+            sampled = enumerate_typed_shortest_paths(0, "actor", 3, "actor", k=8, mode="sample", seed=7)
+            repeat = enumerate_typed_shortest_paths(0, "actor", 3, "actor", k=8, mode="sample", seed=7)
+
+        self.assertEqual(first["count"], 8)
+        self.assertEqual(len(first["paths"]), 5)
+        self.assertEqual(first["paths"][0], [(0, "actor"), (0, "movie"), (1, "actor"), (2, "movie"), (2, "actor"), (4, "movie"), (3, "actor")])
+        self.assertEqual(len({tuple(path) for path in first["paths"]}), 5)
+        self.assertEqual(len({tuple(path) for path in sampled["paths"]}), len(sampled["paths"]))
+        self.assertEqual(sampled, repeat)
+
+    def test_enumerate_shortest_paths_on_fixture_db(self):
+        damon = get_actor_id_by_name("Matt Damon")
+        craig = get_actor_id_by_name("Daniel Craig")
+
+        result = enumerate_typed_shortest_paths(damon, "actor", craig, "actor", k=3)
+
+        self.assertEqual(result["steps"], 4)
+        self.assertEqual(result["count"], 1)
+        self.assertEqual(result["paths"], [generate_typed_path(damon, "actor", craig, "actor")])
+        self.assertEqual(count_typed_shortest_paths(damon, "actor", -999999, "actor"), {"steps": None, "count": 0})
+
+    def test_constrained_paths_respect_movie_bitset_filters(self):
+        with patch("path_utils.get_graph", return_value=build_filtered_routes_graph()):
+            unfiltered = generate_typed_path(1, "actor", 4, "actor", use_cache=False)
+            modern = generate_typed_path(
+                1, "actor", 4, "actor", use_cache=False, constraints=build_path_constraints(min_year=2000)
+            )
+            crime = generate_typed_path(
+                1, "actor", 4, "actor", use_cache=False, constraints=build_path_constraints(genres=["crime"])
+            )
+            english_only = generate_typed_path(
+                1, "actor", 4, "actor", use_cache=False,
+                constraints=build_path_constraints(min_year=2000, languages=["EN"]),
+            )
+            pg_only = generate_typed_path(
+                1, "actor", 4, "actor", use_cache=False, constraints=build_path_constraints(content_ratings=["PG"])
+            )
+
+        self.assertEqual(unfiltered, [(1, "actor"), (10, "movie"), (4, "actor")])
+        self.assertEqual(modern[1], (20, "movie"))
+        self.assertEqual(len(modern), 7)
+        self.assertEqual(crime, modern)
+        self.assertEqual(english_only, -1)
+        self.assertEqual(pg_only, unfiltered)
+
+    def test_constrained_path_excludes_nodes_on_fixture_db(self):
+        damon = get_actor_id_by_name("Matt Damon")
+        craig = get_actor_id_by_name("Daniel Craig")
+        wahlberg = get_actor_id_by_name("Mark Wahlberg")
+
+        constraints = build_path_constraints(exclude_nodes=[(wahlberg, "actor")])
+
+        self.assertIsNone(build_path_constraints())
+        self.assertEqual(generate_typed_path(damon, "actor", craig, "actor", constraints=constraints), -1)
+        self.assertNotEqual(generate_typed_path(damon, "actor", craig, "actor"), -1)
+
+    def test_bidirectional_search_is_shortest_with_and_without_hub_ordering(self):
+        actors, movies, links = build_synthetic_graph(300, 150, mean_cast_size=5, seed=4)
+        graph = GraphIndex([row[0] for row in actors], [row[0] for row in movies], links)
+        rng = random.Random(1)
+
+        with patch("path_utils.get_graph", return_value=graph):
+            for _ in range(40):
+                source, target = rng.randrange(graph.node_count), rng.randrange(graph.node_count)
+                steps = count_typed_shortest_paths(*graph.node_key(source), *graph.node_key(target))["steps"]
+                for hub_aware in (False, True):
+                    path = bidirectional_search(graph, source, target, hub_aware=hub_aware)
+                    if steps is None:
+                        self.assertIsNone(path)
+                        continue
+                    self.assertEqual(len(path) - 1, steps)
+                    self.assertEqual((path[0], path[-1]), (source, target))
+                    for node, neighbor in zip(path, path[1:]):
+                        self.assertIn(neighbor, list(graph.neighbors_of(node)))
+
+    def test_search_budget_stops_oversized_searches(self):
+        with patch("path_utils.get_graph", return_value=build_diamond_chain_graph(40)):
+            with self.assertRaises(PathBudgetExceeded) as caught:
+                generate_typed_path(0, "actor", 40, "actor", use_cache=False, budget=SearchBudget(max_nodes=10))
+            with patch("path_utils.PATH_MAX_EXPANDED_NODES", 10), patch(
+                "path_utils.get_landmark_oracle", return_value=None
+            ):
+                hint = build_path_hint(0, "actor", 40, "actor")
+                distance_hint = build_path_hint(0, "actor", 40, "actor", distance_only=True)
+                legacy_path = generate_path(0, "actor", 40, "actor")
+                batch = list(iter_batch_typed_paths([((0, "actor"), (40, "actor"))]))
+            budget = SearchBudget()
+            path = generate_typed_path(0, "actor", 40, "actor", use_cache=False, budget=budget)
+
+        self.assertEqual((caught.exception.limit, caught.exception.nodes_expanded), ("max_nodes", 11))
+        self.assertEqual(hint, {"reachable": False, "steps_to_target": None, "path": [], "budget_exceeded": True})
+        self.assertEqual(
+            distance_hint,
+            {
+                "reachable": False,
+                "steps_to_target": None,
+                "steps_lower_bound": None,
+                "steps_upper_bound": None,
+                "budget_exceeded": True,
+                "path": [],
+            },
+        )
+        self.assertEqual(legacy_path, -1)
+        self.assertEqual(batch, [(0, None)])
+        self.assertEqual(len(path) - 1, 80)
+        self.assertGreater(budget.stats()["nodes_expanded"], 0)
+
+        expired = SearchBudget(time_budget_ms=1e-6)
+        with self.assertRaises(PathBudgetExceeded) as caught:
+            expired.charge(BUDGET_CLOCK_INTERVAL)
+        self.assertEqual(caught.exception.limit, "time")
+
+    def test_one_budget_bounds_every_search_of_a_request(self):
+        pairs = [((0, "actor"), (3, "actor")), ((40, "actor"), (37, "actor"))]
+        with patch("path_utils.get_graph", return_value=build_diamond_chain_graph(40)), patch(
+            "path_utils.get_landmark_oracle", return_value=None
+        ), patch("path_utils._cache_version", return_value=None):
+            batch = dict(iter_batch_typed_paths(pairs, budget=SearchBudget(max_nodes=12)))
+            hint_budget = SearchBudget(max_nodes=12)
+            hints = [build_path_hint(*source, *target, budget=hint_budget) for source, target in pairs]
+
+        self.assertEqual(len(batch[0]) - 1, 6)
+        self.assertIsNone(batch[1])
+        self.assertEqual(hints[0]["steps_to_target"], 6)
+        self.assertTrue(hints[1]["budget_exceeded"])
+
+    def test_batch_keeps_what_a_group_found_before_the_budget_ran_out(self):
+        chain = build_diamond_chain_graph(40)
+        graph = GraphIndex(
+            list(range(41)) + [100, 101],
+            list(range(80)) + [200],
+            [(chain.node_key(movie)[0], actor) for actor in range(41) for movie in chain.neighbors_of(actor)]
+            + [(200, 100), (200, 101)],
+        )
+        pairs = [
+            ((0, "actor"), (3, "actor")),
+            ((0, "actor"), (40, "actor")),
+            ((0, "actor"), (100, "actor")),
+            ((0, "actor"), (999, "actor")),
+            ((40, "actor"), (37, "actor")),
+            ((40, "actor"), (101, "actor")),
+        ]
+        with patch("path_utils.get_graph", return_value=graph), patch("path_utils._cache_version", return_value=None):
+            batch = dict(iter_batch_typed_paths(pairs, budget=SearchBudget(max_nodes=12)))
+
+        self.assertEqual(len(batch[0]) - 1, 6)
+        self.assertIsNone(batch[1])
+        self.assertEqual((batch[2], batch[3]), (-1, -1))
+        self.assertIsNone(batch[4])
+        self.assertEqual(batch[5], -1)
+
     def test_validate_named_path_supports_movie_start(self):
         self.assertTrue(validate_named_path(["Ocean's Eleven", "Matt Damon"], start_type="movie"))
 
+class TestGraphAnalytics(unittest.TestCase):
+    def test_analytics_reports_components_degrees_and_level_distances(self):
+        graph = GraphIndex([0, 1, 2, 3, 4, 9], [0, 1, 2, 7], [(0, 0), (0, 1), (1, 1), (1, 2), (2, 2), (2, 3), (7, 4)])
+        levels = [
+            {"actor_a": "Zero", "actor_b": "Three", "stars": 2},
+            {"actor_a": "Zero", "actor_b": "Four", "stars": 5},
+        ]
+        names = {0: "Zero", 1: "One", 2: "Two", 3: "Three", 4: "Four", 9: "Nine"}
+
+        analytics = compute_graph_analytics(graph, levels=levels, actor_names=names, sample_count=4, workers=1)
+
+        self.assertEqual(analytics["components"]["count"], 3)
+        self.assertEqual(analytics["components"]["largest_size"], 7)
+        self.assertEqual(analytics["components"]["isolated_node_count"], 1)
+        self.assertEqual(analytics["degrees"]["movie_cast_sizes"]["max"], 2)
+        self.assertEqual(analytics["eccentricity"]["sampled_diameter_lower_bound"], 6)
+        self.assertEqual(analytics["levels"][0]["steps"], 6)
+        self.assertEqual(analytics["levels"][0]["actor_hops"], 3)
+        self.assertEqual(analytics["levels"][0]["shortest_path_count"], 1)
+        self.assertIsNone(analytics["levels"][1]["steps"])
+        self.assertEqual(len(analytics["nodes"]["ids"]), graph.node_count)
+
+
+
+class TestLevelGenerator(unittest.TestCase):
+    def test_generated_levels_hit_target_distance_and_stars(self):
+        graph = load_graph("movies.db")
+        actor_rows = load_actor_rows("movies.db")
+
+        levels = generate_levels(graph, actor_rows, count=10, min_hops=2, max_hops=3)
+
+        pairs = {frozenset((level["actor_a"], level["actor_b"])): level for level in levels}
+        self.assertEqual(len(levels), 5)
+        self.assertTrue(all(2 <= level["actor_hops"] <= 3 for level in levels))
+        self.assertEqual(pairs[frozenset(("Matt Damon", "Daniel Craig"))]["stars"], 3)
+        self.assertEqual(pairs[frozenset(("George Clooney", "Daniel Craig"))]["stars"], 4)
+
+    def test_generator_skips_existing_pairs_and_balances_star_quota(self):
+        graph = load_graph("movies.db")
+        actor_rows = load_actor_rows("movies.db")
+        existing = [{"actor_a": "Daniel Craig", "actor_b": "Matt Damon", "stars": 3}]
+
+        levels = generate_levels(graph, actor_rows, count=2, stars=[3, 4], existing_levels=existing, min_hops=2, max_hops=3)
+
+        self.assertEqual(sorted(level["stars"] for level in levels), [3, 4])
+        self.assertNotIn(frozenset(("Matt Damon", "Daniel Craig")), {frozenset((level["actor_a"], level["actor_b"])) for level in levels})
+
+    def test_each_source_scores_every_target_in_the_window_thousands_per_second(self):
+        actors, movies, relationships = build_synthetic_graph(4000, 2000, seed=0)
+        graph = GraphIndex([row[0] for row in actors], [row[0] for row in movies], relationships)
+
+        started = time.perf_counter()
+        candidates = list(iter_candidate_pairs(graph, actors, min_hops=2, max_hops=3, source_count=3))
+        elapsed = time.perf_counter() - started
+
+        per_source = {}
+        for candidate in candidates:
+            per_source[candidate["actor_a"]] = per_source.get(candidate["actor_a"], 0) + 1
+        self.assertEqual(len(per_source), 3)
+        self.assertGreater(min(per_source.values()), 1000)
+        self.assertTrue(all(2 <= candidate["actor_hops"] <= 3 for candidate in candidates))
+        self.assertGreater(len(candidates) / elapsed, 2000)
+
+        capped = list(iter_candidate_pairs(graph, actors, min_hops=2, max_hops=3, source_count=3, pairs_per_source=20))
+        self.assertLessEqual(len(capped), 60)
+
+
+
+class TestComponentIndex(unittest.TestCase):
+    def test_components_come_from_the_graph_labels(self):
+        graph = GraphIndex([1, 2, 3], [10, 20], [(10, 1), (10, 2), (20, 3)])
+        components = ComponentIndex(graph)
+
+        self.assertFalse(components.connected((1, "actor"), (3, "actor")))
+        self.assertTrue(components.connected((2, "actor"), (10, "movie")))
+        self.assertIsNone(components.connected((1, "actor"), (99, "actor")))
+        self.assertEqual(components.component_size((3, "actor")), 2)
+        self.assertEqual(components.stats()["top_component_sizes"], [3, 2])
+
+    def test_disconnected_nodes_skip_the_search(self):
+        graph = GraphIndex([1, 2, 3], [10, 20], [(10, 1), (10, 2), (20, 3)])
+
+        with patch("path_utils.get_graph", return_value=graph), patch("path_utils._search_typed_path") as mock_search:
+            self.assertEqual(generate_typed_path(1, "actor", 3, "actor", use_cache=False), -1)
+            self.assertEqual(generate_typed_paths_from_source(1, "actor", {(3, "actor")}), {(3, "actor"): -1})
+            with patch("path_utils._shortest_path_layers") as mock_layers:
+                self.assertEqual(count_typed_shortest_paths(1, "actor", 3, "actor"), {"steps": None, "count": 0})
+                self.assertEqual(enumerate_typed_shortest_paths(1, "actor", 3, "actor")["paths"], [])
+
+        mock_search.assert_not_called()
+        mock_layers.assert_not_called()
+
+    def test_cached_index_follows_the_graph_instance(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        db_path = os.path.join(temp_dir, "movies.db")
+        shutil.copyfile("movies.db", db_path)
+        components = get_component_index(db_path)
+        self.assertIs(get_component_index(db_path), components)
+
+        with patch.object(db_helper, "DB_FILE", db_path):
+            db_helper.insert_actor(990001, "Component Test Actor")
+            db_helper.insert_movie(990002, "Component Test Movie", "2020-01-01")
+            db_helper.insert_relationship(990002, 990001)
+            db_helper.insert_relationship(990002, 1461)
+
+        rebuilt = get_component_index(db_path)
+        self.assertIsNot(rebuilt, components)
+        self.assertIsNone(components.connected((990001, "actor"), (8784, "actor")))
+        self.assertTrue(rebuilt.connected((990001, "actor"), (8784, "actor")))
+        self.assertEqual(rebuilt.component_size((990001, "actor")), 10)
+
+
+
+class TestLandmarkOracle(unittest.TestCase):
+    def test_bounds_bracket_exact_distances_and_alt_search_is_shortest(self):
+        graph = build_diamond_chain_graph(6)
+        oracle = build_landmark_oracle(graph, count=3, min_separation=2)
+
+        for source in range(graph.actor_count):
+            for target in range(graph.actor_count):
+                exact = abs(source - target) * 2
+                lower, upper = oracle.bounds(source, target)
+                self.assertLessEqual(lower, exact)
+                self.assertGreaterEqual(upper, exact)
+                for hub_aware in (False, True):
+                    path = alt_bidirectional_search(graph, oracle, source, target, hub_aware=hub_aware)
+                    self.assertEqual(len(path) - 1, exact)
+                    self.assertEqual((path[0], path[-1]), (source, target))
+
+    def test_oracle_round_trips_and_rejects_other_graphs(self):
+        graph = build_diamond_chain_graph(4)
+        oracle = build_landmark_oracle(graph, count=2)
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, "landmarks.bin")
+        save_landmark_oracle(oracle, path)
+
+        loaded = load_landmark_oracle(path, fingerprint=graph.fingerprint())
+
+        self.assertEqual(loaded.landmarks, oracle.landmarks)
+        self.assertEqual(loaded.bounds(0, 4), oracle.bounds(0, 4))
+        self.assertIsNone(load_landmark_oracle(path, fingerprint=build_diamond_chain_graph(5).fingerprint()))
+
+    def test_distance_only_hint_uses_landmark_bounds(self):
+        graph = GraphIndex([1, 2, 3, 4], [10, 20, 30], [(10, 1), (10, 2), (20, 2), (20, 3), (30, 3), (30, 4)])
+        oracle = build_landmark_oracle(graph, count=1)
+
+        with patch("path_utils.get_graph", return_value=graph), patch(
+            "path_utils.get_landmark_oracle", return_value=oracle
+        ), patch("path_utils.generate_typed_path") as mock_generate:
+            hint = build_path_hint(1, "actor", 4, "actor", distance_only=True)
+
+        mock_generate.assert_not_called()
+        self.assertTrue(hint["reachable"])
+        self.assertEqual(hint["path"], [])
+        self.assertLessEqual(hint["steps_lower_bound"], 6)
+        self.assertGreaterEqual(hint["steps_upper_bound"], 6)
+
+
+class TestNeighborSampling(unittest.TestCase):
+    def test_partial_fisher_yates_is_distinct_seeded_and_skips_excluded(self):
+        population = list(range(100))
+
+        first = sample_without_replacement(population, 10, random.Random(5), exclude={0, 1, 2})
+        second = sample_without_replacement(population, 10, random.Random(5), exclude={0, 1, 2})
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(set(first)), 10)
+        self.assertFalse({0, 1, 2} & set(first))
+        self.assertEqual(sorted(sample_without_replacement(population[:4], 10, random.Random(1))), [0, 1, 2, 3])
+
+    def test_alias_draws_follow_weights(self):
+        table = AliasTable([1.0, 2.0, 7.0])
+        rng = random.Random(3)
+        counts = [0, 0, 0]
+        for _ in range(20000):
+            counts[table.draw(rng)] += 1
+
+        for count, expected in zip(counts, (0.1, 0.2, 0.7)):
+            self.assertAlmostEqual(count / 20000, expected, delta=0.02)
+
+    def test_weighted_sample_prefers_popular_costars_and_exhausts_small_rows(self):
+        graph = GraphIndex(range(1, 21), [10], [(10, actor_id) for actor_id in range(1, 21)])
+        sampler = NeighborSampler(graph, {20: 500.0})
+        movie = graph.node_index(10, "movie")
+        star = graph.node_index(20, "actor")
+
+        hits = sum(star in sampler.sample_weighted(movie, 1, random.Random(seed)) for seed in range(200))
+        self.assertGreater(hits, 150)
+        full_cast = sampler.sample_weighted(movie, 30, random.Random(0), exclude={star})
+        self.assertEqual(sorted(full_cast), [index for index in range(20) if index != star])
+
+        table = AliasTable([1.0, 1.0])
+        self.assertEqual(weighted_sample_without_replacement(["a", "b"], table, 1, random.Random(0), exclude={"a"}), ["b"])
+
+
+class TestGameSessions(unittest.TestCase):
+    def setUp(self):
+        self.graph = GraphIndex(
+            [1, 2, 3, 4],
+            [10, 20, 30, 40],
+            [(10, 1), (10, 2), (20, 2), (20, 3), (30, 3), (30, 4), (40, 1), (40, 3)],
+        )
+        labels = {1: "Ann Lee", 2: "Bo Chan", 3: "Cy Park", 4: "Di Moss", 10: "Alpha", 20: "Bravo", 30: "Charlie", 40: "Delta"}
+        index = SearchIndex(
+            [(node_id, "actor" if node_id < 10 else "movie", label, float(node_id)) for node_id, label in labels.items()]
+        )
+        sampler = NeighborSampler(self.graph, {actor_id: float(actor_id) for actor_id in (1, 2, 3, 4)})
+        self.store = SessionStore(ttl_seconds=60, max_sessions=10)
+        for name, value in (("get_neighbor_sampler", sampler), ("get_search_index", index)):
+            patcher = patch(f"game_sessions.{name}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_moves_are_validated_and_rewound_until_the_target_is_reached(self):
+        state = start_session(1, 4, seed=7, store=self.store)
+        session_id = state["session_id"]
+        self.assertEqual(state["phase"], "movie")
+        self.assertEqual(sorted(option["id"] for option in state["options"]), [10, 40])
+
+        with self.assertRaises(ValueError):
+            choose_option(session_id, 30, store=self.store)
+
+        choose_option(session_id, 10, store=self.store)
+        state = choose_option(session_id, 2, store=self.store)
+        self.assertEqual(sorted(option["id"] for option in state["options"]), [10, 20])
+        choose_option(session_id, 20, store=self.store)
+        choose_option(session_id, 3, store=self.store)
+        state = choose_option(session_id, 40, store=self.store)
+        # Both cast members of Delta are already on the path, so no costar is offered.
+        self.assertEqual(state["options"], [])
+
+        state = go_back(session_id, store=self.store)
+        self.assertEqual(state["phase"], "movie")
+        state = write_in(session_id, "bravo", store=self.store)
+        self.assertEqual([node["id"] for node in state["path"]], [1, 10, 2, 20])
+
+        choose_option(session_id, 3, store=self.store)
+        shuffle_options(session_id, store=self.store)
+        write_in(session_id, "charly", store=self.store)
+        state = choose_option(session_id, 4, store=self.store)
+
+        self.assertEqual(state["status"], "won")
+        self.assertEqual(state["connections"], 3)
+        self.assertEqual((state["turn_count"], state["back_count"], state["shuffle_count"]), (10, 1, 1))
+        with self.assertRaises(ValueError):
+            shuffle_options(session_id, store=self.store)
+
+    def test_failed_option_draw_leaves_the_session_unchanged(self):
+        session_id = start_session(1, 4, seed=7, store=self.store)["session_id"]
+        choose_option(session_id, 10, store=self.store)
+        before = choose_option(session_id, 2, store=self.store)
+
+        moves = (
+            lambda: go_back(session_id, store=self.store),
+            lambda: choose_option(session_id, 20, store=self.store),
+        )
+        with patch("game_sessions._sample_options", side_effect=ValueError("Movie 10 is no longer in the graph")):
+            for move in moves:
+                with self.assertRaises(ValueError):
+                    move()
+
+        session = self.store.get(session_id)
+        self.assertEqual(session.path, [(1, "actor"), (10, "movie"), (2, "actor")])
+        self.assertEqual([option["id"] for option in before["options"]], session.options)
+        self.assertEqual((session.turn_count, session.back_count), (2, 0))
+
+    def test_store_expires_idle_sessions_and_evicts_least_recently_used(self):
+        now = [0.0]
+        store = SessionStore(ttl_seconds=10, max_sessions=2, clock=lambda: now[0])
+        for session_id in ("a", "b", "c"):
+            store.add(GameSession(session_id, 1, 4, seed=0))
+            now[0] += 1
+
+        self.assertIsNone(store.get("a"))
+        self.assertIsNotNone(store.get("b"))
+        now[0] += 9.5
+        self.assertIsNone(store.get("c"))
+        self.assertIsNotNone(store.get("b"))
+        self.assertEqual(store.stats()["active"], 1)
+        self.assertEqual((store.stats()["evicted"], store.stats()["expired"]), (1, 1))
+
+
 if __name__ == "__main__":
-    suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestGeneratePath)
+    suite = unittest.defaultTestLoader.loadTestsFromModule(__import__(__name__))
     result = unittest.TextTestRunner(verbosity=2).run(suite)
     passed = result.testsRun - len(result.failures) - len(result.errors)
     failed = len(result.failures) + len(result.errors)
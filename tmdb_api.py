@@ -4,11 +4,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Imported after load_dotenv so image settings in .env apply; re-exported for existing callers.
+from tmdb_images import build_poster_url, build_profile_url, build_tmdb_image_url
+
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 BASE_URL = "https://api.themoviedb.org/3"
-IMAGE_BASE_URL = os.getenv("TMDB_IMAGE_BASE_URL", "https://image.tmdb.org/t/p")
-POSTER_IMAGE_SIZE = os.getenv("TMDB_POSTER_SIZE", "w500")
-PROFILE_IMAGE_SIZE = os.getenv("TMDB_PROFILE_SIZE", "w500")
 
 def tmdb_get(endpoint, params=None):
     headers = {
@@ -29,22 +29,6 @@ def get_movie_details(movie_id):
     return tmdb_get(f"/movie/{movie_id}")
 
 
-def build_tmdb_image_url(image_path, size):
-    if not image_path:
-        return None
-
-    normalized_path = image_path if image_path.startswith("/") else f"/{image_path}"
-    return f"{IMAGE_BASE_URL}/{size}{normalized_path}"
-
-
-def build_poster_url(poster_path):
-    return build_tmdb_image_url(poster_path, POSTER_IMAGE_SIZE)
-
-
-def build_profile_url(profile_path):
-    return build_tmdb_image_url(profile_path, PROFILE_IMAGE_SIZE)
-
-
 def get_movie_release_dates(movie_id):
     return tmdb_get(f"/movie/{movie_id}/release_dates")
 
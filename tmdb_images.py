@@ -0,0 +1,28 @@
+"""TMDB image URL builders.
+
+Kept out of tmdb_api so the API and snapshot export can build poster and
+profile URLs without importing requests or reading TMDB credentials. The image
+settings are read at import, so entry points load .env before importing this module.
+"""
+
+import os
+
+IMAGE_BASE_URL = os.getenv("TMDB_IMAGE_BASE_URL", "https://image.tmdb.org/t/p")
+POSTER_IMAGE_SIZE = os.getenv("TMDB_POSTER_SIZE", "w500")
+PROFILE_IMAGE_SIZE = os.getenv("TMDB_PROFILE_SIZE", "w500")
+
+
+def build_tmdb_image_url(image_path, size):
+    if not image_path:
+        return None
+
+    normalized_path = image_path if image_path.startswith("/") else f"/{image_path}"
+    return f"{IMAGE_BASE_URL}/{size}{normalized_path}"
+
+
+def build_poster_url(poster_path):
+    return build_tmdb_image_url(poster_path, POSTER_IMAGE_SIZE)
+
+
+def build_profile_url(profile_path):
+    return build_tmdb_image_url(profile_path, PROFILE_IMAGE_SIZE)
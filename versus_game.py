@@ -7,49 +7,51 @@ def get_movie_by_title(title):
         (title,)
     )
     return row[0] if row else None
-import sqlite3
-import difflib
-import unicodedata
+import random
+
+import metrics
+from neighbor_sampling import get_neighbor_sampler
+from search_index import get_search_index
 
 DB_FILE = "movies.db"
+WRITE_IN_MIN_SCORE = 0.45
 
 
 # -----------------------------
 # DB Helpers
 # -----------------------------
 def run_query(sql, params=()):
-    conn = sqlite3.connect(DB_FILE)
+    conn = metrics.connect(DB_FILE)
     cursor = conn.cursor()
     cursor.execute(sql, params)
     rows = cursor.fetchall()
     conn.close()
     return rows
 
-def normalize_text(text):
-    return ''.join(
-        c for c in unicodedata.normalize('NFKD', text)
-        if not unicodedata.combining(c)
-    ).lower()
-
-
-def find_closest_match(user_input, valid_options, cutoff=0.6):
-    normalized_map = {
-        normalize_text(option): option for option in valid_options
-    }
-
-    normalized_input = normalize_text(user_input)
+def run_query_by_ids(sql, ids):
+    """Runs ``sql ... WHERE id IN (...)`` and returns the rows in the order of ids."""
+    if not ids:
+        return []
+    placeholders = ",".join("?" * len(ids))
+    rows = {row[0]: row for row in run_query(f"{sql} WHERE id IN ({placeholders})", tuple(ids))}
+    return [rows[node_id] for node_id in ids if node_id in rows]
 
-    matches = difflib.get_close_matches(
-        normalized_input,
-        normalized_map.keys(),
-        n=1,
-        cutoff=cutoff
+def find_write_in_match(user_input, candidates, node_type, cutoff=WRITE_IN_MIN_SCORE):
+    """
+    Resolves a write-in against the shared catalog search index, ranking only the
+    legal (id, label) candidates for this move. Returns the matching candidate or None.
+    """
+    index = get_search_index(DB_FILE)
+    matches = index.search(
+        user_input,
+        node_type=node_type,
+        limit=1,
+        restrict_to=[(candidate_id, node_type) for candidate_id, _label in candidates],
+        min_score=cutoff,
     )
-
-    if matches:
-        return normalized_map[matches[0]]
-
-    return None
+    if not matches:
+        return None
+    return matches[0]["id"], matches[0]["label"]
 
 # -----------------------------
 # Lookups
@@ -70,16 +72,15 @@ def get_actor_details_by_name(name):
     return row[0] if row else None
 
 
-def get_movies_for_actor(actor_id):
-    # Always return 6 random movies
-    return run_query("""
-        SELECT m.id, m.title
-        FROM movies m
-        JOIN movie_actors ma ON m.id = ma.movie_id
-        WHERE ma.actor_id = ?
-        ORDER BY RANDOM()
-        LIMIT 6
-    """, (actor_id,))
+def get_movies_for_actor(actor_id, rng=None):
+    # Always return 6 random movies, drawn from the in-memory graph instead of ORDER BY RANDOM()
+    sampler = get_neighbor_sampler(DB_FILE)
+    graph = sampler.graph
+    index = graph.node_index(actor_id, "actor")
+    if index is None:
+        return []
+    picked = sampler.sample(index, 6, rng or random)
+    return run_query_by_ids("SELECT id, title FROM movies", [graph.node_key(movie)[0] for movie in picked])
 
 def get_all_movies_for_actor(actor_id):
     return run_query("""
@@ -116,29 +117,25 @@ def get_all_costars_for_movie_with_popularity(movie_id, exclude_names):
     return run_query(base_sql, tuple(params))
 
 
-def get_ranked_costars_for_movie(movie_id, exclude_names, pool_size=20, limit=6):
-    base_sql = """
-        SELECT a.id, a.name, a.popularity
-        FROM actors a
-        JOIN movie_actors ma ON a.id = ma.actor_id
-        WHERE ma.movie_id = ?
+def get_ranked_costars_for_movie(movie_id, exclude_names, limit=6, rng=None):
     """
-
-    params = [movie_id]
-
-    if exclude_names:
-        placeholders = ",".join("?" * len(exclude_names))
-        base_sql += f" AND a.name NOT IN ({placeholders})"
-        params.extend(exclude_names)
-
-    base_sql += """
-        ORDER BY RANDOM()
-        LIMIT ?
+    Draws up to ``limit`` costars with probability proportional to popularity, then
+    orders them by popularity for display. Over-samples by len(exclude_names) so
+    dropping excluded names still leaves a full hand.
     """
-    params.append(pool_size)
-
-    random_pool = run_query(base_sql, tuple(params))
-    return sort_actor_rows_by_popularity(random_pool)[:limit]
+    sampler = get_neighbor_sampler(DB_FILE)
+    graph = sampler.graph
+    index = graph.node_index(movie_id, "movie")
+    if index is None:
+        return []
+    exclude_names = set(exclude_names or ())
+    picked = sampler.sample_weighted(index, limit + len(exclude_names), rng or random)
+    rows = run_query_by_ids(
+        "SELECT id, name, popularity FROM actors",
+        [graph.node_key(actor)[0] for actor in picked],
+    )
+    rows = [row for row in rows if row[1] not in exclude_names][:limit]
+    return sort_actor_rows_by_popularity(rows)
 
 def get_costars_for_movie(movie_id, exclude_names):
     ranked_costars = get_ranked_costars_for_movie(movie_id, exclude_names)
@@ -306,14 +303,11 @@ def play_vs_game(actor1_name, actor2_name):
                     print("No movies found.")
                     continue
                 
-                valid_titles = [title for _, title in full_filmography]
-
-                closest = find_closest_match(user_text, valid_titles)
+                closest = find_write_in_match(user_text, full_filmography, "movie")
 
                 if closest:
-                    print(f"\n🎯 Interpreting as: {closest}")
-                    movie_index = valid_titles.index(closest)
-                    movie_id, movie_title = full_filmography[movie_index]
+                    movie_id, movie_title = closest
+                    print(f"\n🎯 Interpreting as: {movie_title}")
 
                     path.append(movie_title)
                     turn_count += 1
@@ -377,13 +371,11 @@ def play_vs_game(actor1_name, actor2_name):
                     print("No additional actors found.")
                     continue
 
-                valid_names = [name for _, name in full_cast]
-                closest = find_closest_match(user_text, valid_names)
+                closest = find_write_in_match(user_text, full_cast, "actor")
 
                 if closest:
-                    print(f"\n🎯 Interpreting as: {closest}")
-                    actor_index = valid_names.index(closest)
-                    next_actor_id, next_actor_name = full_cast[actor_index]
+                    next_actor_id, next_actor_name = closest
+                    print(f"\n🎯 Interpreting as: {next_actor_name}")
                     
                     path.append(next_actor_name)
                     turn_count += 1